@@ -0,0 +1,103 @@
+-- Адмін-панель: агрегати та сторінки рахуються в БД (RPC для /admin/dashboard, /admin/users_list, /admin/api/*).
+-- Email береться з auth.users лише для рядків поточної сторінки — без list_users() по всіх користувачах.
+-- Потребує daily_nutrition_rollup.sql. Виконайте у Supabase SQL Editor.
+-- Функції SECURITY DEFINER (читають auth.users), тож доступні лише service_role.
+
+CREATE INDEX IF NOT EXISTS idx_meal_history_created
+  ON public.meal_history (created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_user_profiles_created
+  ON public.user_profiles (created_at DESC, id);
+
+-- Підсумки за останні p_days днів: кількість користувачів, активні, по днях — ккал, страви, активні
+CREATE OR REPLACE FUNCTION public.admin_dashboard_stats(p_days integer DEFAULT 7)
+RETURNS jsonb
+LANGUAGE sql STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH days AS (
+    SELECT r.local_day, SUM(r.calories)::bigint AS calories, SUM(r.meal_count)::bigint AS meals,
+           COUNT(*) FILTER (WHERE r.meal_count > 0)::int AS active_users
+    FROM public.daily_nutrition_rollup r
+    WHERE r.local_day > public.nutrition_local_day(now()) - p_days
+    GROUP BY r.local_day
+  )
+  SELECT jsonb_build_object(
+    'total_users', (SELECT COUNT(*) FROM public.user_profiles),
+    'active_users', (
+      SELECT COUNT(DISTINCT r.user_id)
+      FROM public.daily_nutrition_rollup r
+      WHERE r.local_day > public.nutrition_local_day(now()) - p_days AND r.meal_count > 0
+    ),
+    'meals_today', COALESCE((SELECT d.meals FROM days d WHERE d.local_day = public.nutrition_local_day(now())), 0),
+    'daily', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object(
+        'day', d.local_day, 'calories', d.calories, 'meals', d.meals, 'active_users', d.active_users
+      ) ORDER BY d.local_day)
+      FROM days d
+    ), '[]'::jsonb)
+  );
+$$;
+
+-- Останні страви (сторінка) з email автора
+CREATE OR REPLACE FUNCTION public.admin_recent_meals(p_limit integer DEFAULT 15, p_offset integer DEFAULT 0)
+RETURNS SETOF jsonb
+LANGUAGE sql STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT to_jsonb(m) || jsonb_build_object('user_email', COALESCE(u.email, 'Невідомий'))
+  FROM (
+    SELECT * FROM public.meal_history
+    ORDER BY created_at DESC
+    LIMIT p_limit OFFSET p_offset
+  ) m
+  LEFT JOIN auth.users u ON u.id = m.user_id
+  ORDER BY m.created_at DESC;
+$$;
+
+-- Сторінка користувачів (новіші першими) з email, ціллю та вагою; p_search — підрядок email
+CREATE OR REPLACE FUNCTION public.admin_list_users(
+  p_limit integer DEFAULT 50,
+  p_offset integer DEFAULT 0,
+  p_search text DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE sql STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH matched AS (
+    SELECT p.id, p.created_at
+    FROM public.user_profiles p
+    LEFT JOIN auth.users u ON u.id = p.id
+    WHERE p_search IS NULL OR p_search = '' OR u.email ILIKE '%' || p_search || '%'
+  ),
+  page AS (
+    SELECT id FROM matched
+    ORDER BY created_at DESC NULLS LAST, id
+    LIMIT p_limit OFFSET p_offset
+  )
+  SELECT jsonb_build_object(
+    'total', (SELECT COUNT(*) FROM matched),
+    'users', COALESCE((
+      SELECT jsonb_agg(
+        to_jsonb(p) || COALESCE(to_jsonb(n) - 'id' - 'user_id', '{}'::jsonb)
+          || jsonb_build_object('email', COALESCE(u.email, 'Немає в Auth'))
+        ORDER BY p.created_at DESC NULLS LAST, p.id
+      )
+      FROM page
+      JOIN public.user_profiles p ON p.id = page.id
+      LEFT JOIN public.user_nutrition n ON n.user_id = p.id
+      LEFT JOIN auth.users u ON u.id = p.id
+    ), '[]'::jsonb)
+  );
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.admin_dashboard_stats(integer) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.admin_recent_meals(integer, integer) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.admin_list_users(integer, integer, text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.admin_dashboard_stats(integer) TO service_role;
+GRANT EXECUTE ON FUNCTION public.admin_recent_meals(integer, integer) TO service_role;
+GRANT EXECUTE ON FUNCTION public.admin_list_users(integer, integer, text) TO service_role;
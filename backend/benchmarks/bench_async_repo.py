@@ -0,0 +1,100 @@
+"""
+Навантажувальний бенчмарк: sync supabase клієнт vs async репозиторії.
+
+Піднімає локальний PostgREST-замінник (postgrest_stub) з мережевою затримкою
+та імітує N одночасних опитувань /user_status у межах одного event loop
+(як один uvicorn worker).
+
+Запуск (з директорії backend):
+    python -m benchmarks.bench_async_repo --concurrency 100 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import time
+
+PORT = 54329
+os.environ.setdefault("SUPABASE_URL", f"http://127.0.0.1:{PORT}")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-service-key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret")
+os.environ.setdefault("OPENAI_API_KEY", "bench-openai-key")
+
+from supabase import create_client
+from benchmarks.postgrest_stub import PostgrestStub, serve_in_process
+from benchmarks.supabase_stub import daily_status_rpc
+from config import settings
+from database import init_async_supabase, close_async_supabase
+from repositories.meal_repo import MealRepository
+from repositories.user_repo import UserRepository
+from services.nutrition_service import NutritionService
+from utils import get_now_poland
+
+
+def seed(stub: PostgrestStub, users: int):
+    now = get_now_poland().isoformat()
+    for i in range(users):
+        uid = f"user-{i}"
+        stub.tables.setdefault("user_profiles", []).append({"id": uid, "name": f"User {i}", "email": f"u{i}@example.com"})
+        stub.tables.setdefault("user_nutrition", []).append({"user_id": uid, "weight": 70, "daily_calories_target": 2200, "goal": "Підтримка ваги"})
+        for j in range(4):
+            stub.tables.setdefault("meal_history", []).append({"id": f"{uid}-m{j}", "user_id": uid, "meal_name": "Страва", "calories": 500, "protein": 20, "fat": 10, "carbs": 60, "created_at": now})
+        stub.tables.setdefault("water_logs", []).append({"user_id": uid, "amount": 250, "created_at": now})
+    stub.tables["app_stories"] = [{"id": "s1", "title": "Story", "image_url": "", "is_active": True}]
+    stub.rpcs["get_daily_status"] = daily_status_rpc
+
+
+def sync_daily_status(client, user_id: str, today: str):
+    """Той самий набір запитів, що й get_daily_status до переходу на async."""
+    client.table("user_profiles").select("*").eq("id", user_id).single().execute()
+    client.table("user_nutrition").select("*").eq("user_id", user_id).single().execute()
+    client.table("meal_history").select("*").eq("user_id", user_id).gte("created_at", today).execute()
+    client.table("water_logs").select("amount, created_at").eq("user_id", user_id).gte("created_at", today).execute()
+    client.table("app_stories").select("*").eq("is_active", True).execute()
+
+
+async def run_sync(concurrency: int, users: int, today: str) -> float:
+    client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+
+    async def handler(i):
+        sync_daily_status(client, f"user-{i % users}", today)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(i) for i in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run_async(concurrency: int, users: int) -> float:
+    client = await init_async_supabase()
+    service = NutritionService(MealRepository(client), UserRepository(client))
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(service.get_daily_status(f"user-{i % users}") for i in range(concurrency)))
+        return time.perf_counter() - start
+    finally:
+        await close_async_supabase()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="затримка stub-сервера на запит, с")
+    args = parser.parse_args()
+
+    stub = PostgrestStub(latency=args.latency)
+    seed(stub, args.users)
+    server = serve_in_process(stub.app(), PORT)
+
+    today = get_now_poland().replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+    sync_time = asyncio.run(run_sync(args.concurrency, args.users, today))
+    async_time = asyncio.run(run_async(args.concurrency, args.users))
+    server.terminate()
+
+    print(f"requests: {args.concurrency} concurrent /user_status, stub latency {args.latency * 1000:.0f} ms")
+    print(f"sync client : {sync_time:8.2f} s  ({args.concurrency / sync_time:8.1f} req/s)")
+    print(f"async repo  : {async_time:8.2f} s  ({args.concurrency / async_time:8.1f} req/s)")
+    print(f"speedup     : {sync_time / async_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
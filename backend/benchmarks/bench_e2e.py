@@ -0,0 +1,341 @@
+"""
+Наскрізний бенчмарк бекенда: справжній main:app (uvicorn) проти локальних замінників
+Supabase (supabase_stub: PostgREST + GoTrue + Storage), OpenAI (openai_stub) та OFF (off_stub).
+
+Кожен stub і бекенд працюють в окремих процесах, клієнт — у цьому. Віртуальні користувачі
+(--concurrency) у замкненому циклі виконують сценарії з суміші трафіку:
+  user_status   — опитування GET /user_status/{user_id};
+  add_meal      — POST /add_meal;
+  search_food   — набір слова в пошуку: GET /search_food для кожного префікса від 2 літер;
+  analyze_meal  — POST /analyze_meal з фото з пулу (--photos; повтор фото = влучання в кеш AI).
+Після --warmup секунд --duration секунд збираються p50/p95/p99 та RPS по маршрутах;
+результат пишеться в JSON (--output), а з --baseline порівнюється з попереднім запуском
+(код виходу 1, якщо p95 або RPS гірші за --max-regression).
+
+Запуск (з директорії backend):
+    python -m benchmarks.bench_e2e --mix default --concurrency 50 --duration 30
+    python -m benchmarks.bench_e2e --mix user_status=70,search_food=30 --baseline benchmarks/results/base.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import pathlib
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+import httpx
+from PIL import Image, ImageDraw
+from benchmarks.off_stub import OffStub
+from benchmarks.openai_stub import OpenAIStub
+from benchmarks.postgrest_stub import serve_in_process, wait_for_port
+from benchmarks.supabase_stub import SupabaseStub, FOOD_NAMES, seed
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+JWT_SECRET = "bench-secret"
+
+MIXES = {
+    "default": {"user_status": 60, "search_food": 20, "add_meal": 15, "analyze_meal": 5},
+    "polling": {"user_status": 100},
+    "logging": {"add_meal": 70, "user_status": 30},
+    "typing": {"search_food": 100},
+    "photo": {"analyze_meal": 80, "user_status": 20},
+}
+
+SEARCH_WORDS = [name.split()[0] for name in FOOD_NAMES] + ["молоко", "twarożek", "pasta"]
+
+
+# ---- Сценарії: один крок віртуального користувача ----
+
+async def user_status(bench, user_id: str, rng: random.Random):
+    await bench.request("/user_status/{user_id}", "GET", f"/user_status/{user_id}")
+
+async def add_meal(bench, user_id: str, rng: random.Random):
+    await bench.request("/add_meal", "POST", "/add_meal", json={
+        "user_id": user_id, "meal_name": "Бенчмарк", "calories": rng.randint(150, 900),
+        "protein": rng.randint(5, 50), "fat": rng.randint(2, 40), "carbs": rng.randint(10, 120)
+    })
+
+async def search_food(bench, user_id: str, rng: random.Random):
+    word = rng.choice(SEARCH_WORDS)
+    for end in range(2, len(word) + 1):
+        await bench.request("/search_food", "GET", "/search_food", params={"query": word[:end]})
+
+async def analyze_meal(bench, user_id: str, rng: random.Random):
+    photo = rng.choice(bench.photos)
+    await bench.request(
+        "/analyze_meal", "POST", "/analyze_meal",
+        data={"user_id": user_id}, files={"file": ("meal.jpg", photo, "image/jpeg")}
+    )
+
+SCENARIOS = {
+    "user_status": user_status,
+    "add_meal": add_meal,
+    "search_food": search_food,
+    "analyze_meal": analyze_meal,
+}
+
+
+def parse_mix(raw: str) -> dict:
+    """Назва з MIXES або "сценарій=вага,..."."""
+    if raw in MIXES:
+        return MIXES[raw]
+    mix = {}
+    for item in raw.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}', available: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def make_photos(count: int, seed_value: int = 42) -> list:
+    """Синтетичні фото 1280x960 (різні — інакше кожен аналіз після першого влучав би в кеш)."""
+    rng = random.Random(seed_value)
+    photos = []
+    for _ in range(count):
+        image = Image.new("RGB", (1280, 960), tuple(rng.randint(0, 255) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(40):
+            x, y = rng.randint(0, 1200), rng.randint(0, 900)
+            draw.ellipse((x, y, x + rng.randint(20, 300), y + rng.randint(20, 300)), fill=tuple(rng.randint(0, 255) for _ in range(3)))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=85)
+        photos.append(buffer.getvalue())
+    return photos
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def summarize(timings: list, errors: int, elapsed: float) -> dict:
+    if not timings:
+        return {"count": 0, "errors": errors, "rps": 0.0}
+    ms = lambda v: round(v * 1000, 2)
+    return {
+        "count": len(timings),
+        "errors": errors,
+        "rps": round(len(timings) / elapsed, 2),
+        "p50_ms": ms(percentile(timings, 0.50)),
+        "p95_ms": ms(percentile(timings, 0.95)),
+        "p99_ms": ms(percentile(timings, 0.99)),
+        "mean_ms": ms(sum(timings) / len(timings)),
+        "max_ms": ms(max(timings))
+    }
+
+
+class Bench:
+    def __init__(self, base_url: str, concurrency: int, photos: list):
+        self.client = httpx.AsyncClient(
+            base_url=base_url, timeout=120.0,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        )
+        self.photos = photos
+        self.recording = False
+        self.timings = {}
+        self.errors = {}
+
+    async def request(self, route: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        if self.recording:
+            self.timings.setdefault(route, []).append(time.perf_counter() - started)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    async def run(self, mix: dict, user_ids: list, concurrency: int, warmup: float, duration: float) -> float:
+        names, weights = list(mix), list(mix.values())
+        loop = asyncio.get_running_loop()
+        end = loop.time() + warmup + duration
+
+        async def virtual_user(index: int):
+            rng = random.Random(index)
+            user_id = user_ids[index % len(user_ids)]
+            while loop.time() < end:
+                await SCENARIOS[rng.choices(names, weights)[0]](self, user_id, rng)
+
+        async def start_recording():
+            await asyncio.sleep(warmup)
+            self.recording = True
+            return loop.time()
+
+        recorder = asyncio.create_task(start_recording())
+        await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+        elapsed = loop.time() - await recorder
+        self.recording = False
+        return elapsed
+
+    def report(self, elapsed: float) -> dict:
+        routes = {route: summarize(values, self.errors.get(route, 0), elapsed) for route, values in sorted(self.timings.items())}
+        everything = [v for values in self.timings.values() for v in values]
+        return {"routes": routes, "total": summarize(everything, sum(self.errors.values()), elapsed)}
+
+    async def close(self):
+        await self.client.aclose()
+
+
+async def control(port: int, **mode) -> dict:
+    async with httpx.AsyncClient() as client:
+        return (await client.post(f"http://127.0.0.1:{port}/_control", json=mode)).json()
+
+
+def start_backend(args, ports: dict) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SUPABASE_URL": f"http://127.0.0.1:{ports['supabase']}",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench-service-key",
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        "OPENAI_API_KEY": "bench-openai-key",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{ports['openai']}/v1",
+        "OFF_BASE_URL": f"http://127.0.0.1:{ports['off']}",
+        "LOG_FORMAT": "json",
+        "LOG_LEVEL": args.log_level,
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(ports["app"]),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        wait_for_port(ports["app"], timeout=60)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def print_report(result: dict):
+    print(f"{'route':<26}{'count':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for route, s in [*result["routes"].items(), ("TOTAL", result["total"])]:
+        if not s["count"]:
+            continue
+        print(f"{route:<26}{s['count']:>8}{s['errors']:>6}{s['rps']:>9.1f}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> list:
+    """Маршрути, де p95 зросла або RPS впав більше ніж на threshold (частка)."""
+    regressions = []
+    print(f"\nvs baseline {baseline['meta'].get('git_commit', '?')} ({baseline['meta'].get('started_at', '?')}):")
+    for route, current in [*result["routes"].items(), ("TOTAL", result["total"])]:
+        base = baseline["total"] if route == "TOTAL" else baseline["routes"].get(route)
+        if not base or not base.get("count") or not current.get("count"):
+            continue
+        p95 = current["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rps = current["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        worse = p95 > threshold or rps < -threshold
+        if worse:
+            regressions.append(route)
+        print(f"{route:<26} p95 {p95:+7.1%}   rps {rps:+7.1%}{'   REGRESSION' if worse else ''}")
+    return regressions
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    ports = {"supabase": args.port, "openai": args.port + 1, "off": args.port + 2, "app": args.port + 3}
+
+    supabase = SupabaseStub(latency=args.supabase_latency, jwt_secret=JWT_SECRET)
+    user_ids = seed(supabase, args.users)
+    stubs = [
+        serve_in_process(supabase.app(), ports["supabase"]),
+        serve_in_process(OpenAIStub(latency=args.openai_latency, jitter=args.openai_jitter).app(), ports["openai"]),
+        serve_in_process(OffStub(latency=args.off_latency).app(), ports["off"]),
+    ]
+    backend = None
+    bench = None
+    try:
+        backend = start_backend(args, ports)
+        bench = Bench(f"http://127.0.0.1:{ports['app']}", args.concurrency, make_photos(args.photos) if "analyze_meal" in mix else [])
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        before = {name: (await control(ports[name]))["requests"] for name in ("supabase", "openai")}
+        elapsed = await bench.run(mix, user_ids, args.concurrency, args.warmup, args.duration)
+        after = {name: (await control(ports[name]))["requests"] for name in ("supabase", "openai")}
+        after["off"] = (await control(ports["off"]))["requests"]
+    finally:
+        if bench is not None:
+            await bench.close()
+        if backend is not None:
+            backend.terminate()
+            backend.wait(timeout=30)
+        for process in stubs:
+            process.terminate()
+
+    return {
+        "meta": {
+            "started_at": started_at,
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "mix": args.mix,
+            "weights": mix,
+            "concurrency": args.concurrency,
+            "warmup_s": args.warmup,
+            "duration_s": round(elapsed, 2),
+            "workers": args.workers,
+            "users": args.users,
+            "photos": args.photos,
+            "latency_s": {"supabase": args.supabase_latency, "openai": args.openai_latency, "openai_jitter": args.openai_jitter, "off": args.off_latency}
+        },
+        **bench.report(elapsed),
+        # Запити до замінників за весь прогін (з розігрівом) — скільки викликів зовнішніх сервісів коштує трафік
+        "upstream_requests": {
+            "supabase": after["supabase"] - before["supabase"],
+            "openai": after["openai"] - before["openai"],
+            "off": after["off"]
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default="default", help=f"{' | '.join(MIXES)} або сценарій=вага,...")
+    parser.add_argument("--concurrency", type=int, default=50, help="віртуальних користувачів")
+    parser.add_argument("--duration", type=float, default=30.0, help="тривалість вимірювання, с")
+    parser.add_argument("--warmup", type=float, default=5.0, help="розігрів без запису, с")
+    parser.add_argument("--users", type=int, default=200, help="користувачів у stub-базі")
+    parser.add_argument("--photos", type=int, default=20, help="різних фото для analyze_meal")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers бекенда")
+    parser.add_argument("--supabase-latency", type=float, default=0.01)
+    parser.add_argument("--openai-latency", type=float, default=1.5)
+    parser.add_argument("--openai-jitter", type=float, default=0.5)
+    parser.add_argument("--off-latency", type=float, default=0.2)
+    parser.add_argument("--log-level", default="WARNING", help="LOG_LEVEL бекенда під час прогону")
+    parser.add_argument("--port", type=int, default=54340, help="перший з 4 портів (supabase, openai, off, app)")
+    parser.add_argument("--output", help="JSON з результатом (за замовчуванням benchmarks/results/e2e_<час>.json)")
+    parser.add_argument("--baseline", help="JSON попереднього запуску для порівняння")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="допустиме погіршення p95/RPS (частка)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    output = pathlib.Path(args.output) if args.output else \
+        BACKEND_DIR / "benchmarks" / "results" / f"e2e_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"\nsaved: {output}")
+
+    if args.baseline:
+        regressions = compare(result, json.loads(pathlib.Path(args.baseline).read_text()), args.max_regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
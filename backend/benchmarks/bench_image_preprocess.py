@@ -0,0 +1,99 @@
+"""
+Бенчмарк препроцесингу фото перед vision-запитом.
+
+Для кожного фото порівнює старий шлях (PIL decode + JPEG з якістю за
+замовчуванням у повній роздільності) з preprocess_image: розмір base64
+payload, час підготовки та оцінку часу передачі при заданому аплінку.
+Без --folder генерує синтетичні фото 4000x3000.
+
+Запуск (з директорії backend):
+    python -m benchmarks.bench_image_preprocess --folder ~/meal_photos --uplink-mbit 20
+"""
+import argparse
+import base64
+import io
+import os
+import pathlib
+import random
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54329")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-service-key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret")
+os.environ.setdefault("OPENAI_API_KEY", "bench-openai-key")
+
+from PIL import Image, ImageDraw, ImageFilter
+from services.image_service import preprocess_image
+
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".heic"}
+
+
+def synthetic_photos(count: int) -> list:
+    """Фото-подібні JPEG (градієнт + кола + шум), щоб стиснення було реалістичним."""
+    photos = []
+    for i in range(count):
+        rnd = random.Random(i)
+        img = Image.radial_gradient("L").resize((4000, 3000)).convert("RGB")
+        draw = ImageDraw.Draw(img)
+        for _ in range(40):
+            x, y, r = rnd.randint(0, 4000), rnd.randint(0, 3000), rnd.randint(50, 600)
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=(rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255)))
+        img = img.filter(ImageFilter.GaussianBlur(3))
+        noise = Image.effect_noise((4000, 3000), 25).convert("RGB")
+        img = Image.blend(img, noise, 0.15)
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=92)
+        photos.append((f"synthetic_{i}.jpg", buffer.getvalue()))
+    return photos
+
+
+def legacy_payload(contents: bytes) -> bytes:
+    """Старий шлях: повна роздільність, JPEG з якістю за замовчуванням."""
+    image = Image.open(io.BytesIO(contents)).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG")
+    return base64.b64encode(buffer.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folder", help="папка з фото страв")
+    parser.add_argument("--count", type=int, default=5, help="кількість синтетичних фото без --folder")
+    parser.add_argument("--max-edge", type=int, default=None)
+    parser.add_argument("--quality", type=int, default=None)
+    parser.add_argument("--uplink-mbit", type=float, default=20.0, help="швидкість каналу до OpenAI для оцінки часу передачі")
+    args = parser.parse_args()
+
+    if args.folder:
+        files = sorted(p for p in pathlib.Path(args.folder).expanduser().iterdir() if p.suffix.lower() in EXTENSIONS)
+        photos = [(p.name, p.read_bytes()) for p in files]
+    else:
+        photos = synthetic_photos(args.count)
+
+    bytes_per_sec = args.uplink_mbit * 1_000_000 / 8
+    totals = {"old": 0, "new": 0, "old_t": 0.0, "new_t": 0.0}
+    print(f"{'photo':<28}{'old KB':>10}{'new KB':>10}{'old ms':>10}{'new ms':>10}")
+    for name, contents in photos:
+        t0 = time.perf_counter()
+        old = legacy_payload(contents)
+        t1 = time.perf_counter()
+        new = base64.b64encode(preprocess_image(contents, args.max_edge, args.quality).data)
+        t2 = time.perf_counter()
+        totals["old"] += len(old)
+        totals["new"] += len(new)
+        totals["old_t"] += t1 - t0
+        totals["new_t"] += t2 - t1
+        print(f"{name[:27]:<28}{len(old) / 1024:>10.0f}{len(new) / 1024:>10.0f}{(t1 - t0) * 1000:>10.0f}{(t2 - t1) * 1000:>10.0f}")
+
+    n = len(photos) or 1
+    old_send = totals["old"] / n / bytes_per_sec
+    new_send = totals["new"] / n / bytes_per_sec
+    print()
+    print(f"avg payload   : {totals['old'] / n / 1024:8.0f} KB -> {totals['new'] / n / 1024:8.0f} KB "
+          f"({100 * (1 - totals['new'] / max(totals['old'], 1)):.0f}% smaller)")
+    print(f"avg prep time : {totals['old_t'] / n * 1000:8.0f} ms -> {totals['new_t'] / n * 1000:8.0f} ms")
+    print(f"avg upload @{args.uplink_mbit:g} Mbit/s: {old_send * 1000:8.0f} ms -> {new_send * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Глобальний пошук OpenFoodFacts: кеш + circuit breaker проти деградованого OFF.
+
+Піднімає off_stub в окремому процесі та проганяє фази:
+  healthy   — OFF відповідає за --latency;
+  degraded  — OFF відповідає довше за OFF_TIMEOUT (breaker має відкритись);
+  failing   — OFF повертає 503;
+  recovered — OFF знову здоровий (після OFF_BREAKER_RESET breaker закривається).
+Для кожної фази — p50/p95/max затримки search() та кількість запитів, що дійшли до OFF.
+
+Запуск (з директорії backend):
+    python -m benchmarks.bench_off_search --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import time
+
+PORT = 54331
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54329")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-service-key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret")
+os.environ.setdefault("OPENAI_API_KEY", "bench-openai-key")
+os.environ["OFF_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ.setdefault("OFF_TIMEOUT", "1.0")
+os.environ.setdefault("OFF_SLOW_THRESHOLD", "0.8")
+os.environ.setdefault("OFF_BREAKER_RESET", "2.0")
+
+import httpx
+from benchmarks.off_stub import OffStub
+from benchmarks.postgrest_stub import serve_in_process
+from services.off_client import OpenFoodFactsClient
+from config import settings
+
+WORDS = ["гречка", "kurczak", "milk", "борщ", "jabłko", "yogurt", "chleb", "сир", "banana", "łosoś"]
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def control(**mode) -> dict:
+    async with httpx.AsyncClient() as client:
+        res = await client.post(f"http://127.0.0.1:{PORT}/_control", json=mode)
+        return res.json()
+
+
+async def run_phase(client: OpenFoodFactsClient, name: str, requests: int, concurrency: int, unique: bool):
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+    before = (await control())["requests"]
+
+    async def one(i: int):
+        query = f"{WORDS[i % len(WORDS)]} {i}" if unique else WORDS[i % len(WORDS)]
+        async with semaphore:
+            started = time.perf_counter()
+            await client.search(query)
+            timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    total = time.perf_counter() - started
+    upstream = (await control())["requests"] - before
+    print(
+        f"{name:<10} p50={percentile(timings, 0.5) * 1000:7.1f} ms  p95={percentile(timings, 0.95) * 1000:7.1f} ms  "
+        f"max={max(timings) * 1000:7.1f} ms  total={total:5.2f} s  upstream={upstream:4d}  breaker={client.breaker.state}"
+    )
+
+
+async def main(args):
+    process = serve_in_process(OffStub(latency=args.latency).app(), PORT)
+    client = OpenFoodFactsClient(settings.OFF_BASE_URL)
+    await client.start()
+    try:
+        await control(latency=args.latency, status=200)
+        await run_phase(client, "healthy", args.requests, args.concurrency, unique=True)
+        await run_phase(client, "cached", args.requests, args.concurrency, unique=False)
+
+        client.cache.clear()
+        await control(latency=settings.OFF_TIMEOUT * 3, status=200)
+        await run_phase(client, "degraded", args.requests, args.concurrency, unique=True)
+
+        await control(latency=args.latency, status=503)
+        await run_phase(client, "failing", args.requests, args.concurrency, unique=True)
+
+        await control(latency=args.latency, status=200)
+        await asyncio.sleep(settings.OFF_BREAKER_RESET)
+        await run_phase(client, "recovered", args.requests, args.concurrency, unique=True)
+        print(client.stats())
+    finally:
+        await client.close()
+        process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
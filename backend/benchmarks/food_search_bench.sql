@@ -0,0 +1,98 @@
+-- Бенчмарк пошуку продуктів на синтетичній таблиці з 1M рядків.
+-- Порівнює старий ilike '%query%' (seq scan) з триграмним пошуком із food_search.sql.
+-- Потрібна БД з уже виконаним food_search.sql (функція food_search_key та pg_trgm).
+-- Працює в окремій схемі food_bench, public.food_products не чіпає.
+--
+-- Запуск:
+--   psql "$DATABASE_URL" -f benchmarks/food_search_bench.sql
+-- Прибрати: DROP SCHEMA food_bench CASCADE;
+
+\timing on
+
+CREATE SCHEMA IF NOT EXISTS food_bench;
+DROP TABLE IF EXISTS food_bench.food_products;
+
+CREATE TABLE food_bench.food_products (
+  id bigint PRIMARY KEY,
+  name text NOT NULL,
+  calories integer,
+  protein numeric,
+  fat numeric,
+  carbs numeric,
+  created_at timestamptz DEFAULT now(),
+  search_key text GENERATED ALWAYS AS (public.food_search_key(name)) STORED
+);
+
+-- Назви з українських, польських та англійських слів + бренд + номер партії
+INSERT INTO food_bench.food_products (id, name, calories, protein, fat, carbs)
+SELECT
+  i,
+  base[1 + i % array_length(base, 1)] || ' '
+    || kind[1 + (i / array_length(base, 1)) % array_length(kind, 1)] || ' ('
+    || brand[1 + (i / 7) % array_length(brand, 1)] || ') ' || (i % 997),
+  (50 + random() * 550)::int,
+  round((random() * 30)::numeric, 1),
+  round((random() * 30)::numeric, 1),
+  round((random() * 60)::numeric, 1)
+FROM generate_series(1, 1000000) AS i,
+LATERAL (SELECT
+  ARRAY['Куряче філе', 'Курчак', 'Kurczak', 'Chicken breast', 'Шинка', 'Szynka', 'Ham', 'Сир', 'Ser żółty',
+        'Cheese', 'Хліб', 'Chleb', 'Bread', 'Яблуко', 'Jabłko', 'Apple', 'Йогурт', 'Jogurt', 'Yogurt',
+        'Борщ', 'Barszcz', 'Вареники', 'Pierogi', 'Dumplings', 'Гречка', 'Kasza gryczana', 'Buckwheat',
+        'Молоко', 'Mleko', 'Milk', 'Сьомга', 'Łosoś', 'Salmon', 'Банан', 'Banan', 'Banana', 'Журек', 'Żurek'] AS base,
+  ARRAY['класичний', 'копчений', 'wędzony', 'smoked', 'світлий', 'pełnoziarnisty', 'wholegrain', 'домашній',
+        'domowy', 'homemade', 'знежирений', 'light', 'органічний', 'bio', 'organic', 'грильований',
+        'grillowany', 'grilled', 'запечений', 'pieczony', 'baked'] AS kind,
+  ARRAY['Наша Ряба', 'Галичина', 'Biedronka', 'Lidl', 'Tesco', 'Żabka', 'Сільпо', 'АТБ', 'Auchan',
+        'Carrefour', 'Kaufland', 'Rud', 'Yagotynske', 'Mlekovita', 'Sokołów'] AS brand
+) AS words;
+
+CREATE INDEX idx_food_bench_search_key_trgm ON food_bench.food_products USING gin (search_key gin_trgm_ops);
+ANALYZE food_bench.food_products;
+
+SELECT pg_size_pretty(pg_total_relation_size('food_bench.food_products')) AS table_size;
+
+-- 1) Старий шлях: ilike '%query%' по name (seq scan, без ранжування)
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM food_bench.food_products WHERE name ILIKE '%kurcz%' LIMIT 5;
+
+-- Рідкісний запит: seq scan проходить усю таблицю
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM food_bench.food_products WHERE name ILIKE '%sokołów) 996%' LIMIT 5;
+
+-- 2) Новий шлях: тіло search_food_products над food_bench (транслітерація + ранжування)
+SET pg_trgm.word_similarity_threshold = 0.4;
+
+PREPARE food_search(text, int) AS
+  WITH q AS (
+    SELECT public.food_search_key($1) AS key
+  ),
+  ranked AS (
+    SELECT
+      f,
+      word_similarity(q.key, f.search_key)
+        + CASE
+            WHEN f.search_key LIKE q.key || '%' THEN 0.5
+            WHEN ' ' || f.search_key LIKE '% ' || q.key || '%' THEN 0.25
+            ELSE 0
+          END AS score
+    FROM food_bench.food_products f, q
+    WHERE q.key <> ''
+      AND (q.key <% f.search_key OR f.search_key LIKE '%' || q.key || '%')
+  )
+  SELECT (to_jsonb(r.f) - 'search_key') || jsonb_build_object('score', round(r.score::numeric, 3))
+  FROM ranked r
+  ORDER BY r.score DESC, length((r.f).name)
+  LIMIT $2;
+
+-- Кирилиця знаходить польські/англійські написання і навпаки
+EXPLAIN (ANALYZE, BUFFERS) EXECUTE food_search('курчак', 10);
+EXPLAIN (ANALYZE, BUFFERS) EXECUTE food_search('kurczak', 10);
+EXPLAIN (ANALYZE, BUFFERS) EXECUTE food_search('журек', 10);
+-- Рідкісний запит та опечатка
+EXPLAIN (ANALYZE, BUFFERS) EXECUTE food_search('sokolow 996', 10);
+EXPLAIN (ANALYZE, BUFFERS) EXECUTE food_search('barszc', 10);
+
+EXECUTE food_search('курчак', 5);
+
+DEALLOCATE food_search;
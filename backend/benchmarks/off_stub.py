@@ -0,0 +1,60 @@
+"""
+Локальний замінник OpenFoodFacts (/cgi/search.pl) для бенчмарків.
+
+Режим змінюється на льоту через POST /_control {"latency": 0.05, "status": 200, "results": 5},
+бо stub працює в окремому процесі (див. postgrest_stub.serve_in_process).
+"""
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+import asyncio
+
+
+class OffStub:
+    def __init__(self, latency: float = 0.05, status: int = 200, results: int = 5):
+        self.latency = latency
+        self.status = status
+        self.results = results
+        self.request_count = 0
+
+    @staticmethod
+    def products_for(query: str, count: int = 5) -> list:
+        return [
+            {
+                "product_name": f"{query.title()} {i}",
+                "product_name_pl": f"{query.title()} {i} PL",
+                "brands": "StubBrand",
+                "nutriments": {
+                    "energy-kcal_100g": 100 + i * 10,
+                    "proteins_100g": 5 + i,
+                    "fat_100g": 2.5,
+                    "carbohydrates_100g": 12
+                }
+            }
+            for i in range(count)
+        ]
+
+    async def search(self, request: Request) -> JSONResponse:
+        self.request_count += 1
+        await asyncio.sleep(self.latency)
+        if self.status != 200:
+            return JSONResponse({"error": "stub failure"}, status_code=self.status)
+        query = request.query_params.get("search_terms", "")
+        return JSONResponse({"count": self.results, "products": self.products_for(query, self.results)})
+
+    async def control(self, request: Request) -> JSONResponse:
+        body = await request.json()
+        self.latency = float(body.get("latency", self.latency))
+        self.status = int(body.get("status", self.status))
+        self.results = int(body.get("results", self.results))
+        return JSONResponse({"latency": self.latency, "status": self.status, "results": self.results, "requests": self.request_count})
+
+    def routes(self) -> list:
+        return [
+            Route("/cgi/search.pl", self.search, methods=["GET"]),
+            Route("/_control", self.control, methods=["POST"]),
+        ]
+
+    def app(self) -> Starlette:
+        return Starlette(routes=self.routes())
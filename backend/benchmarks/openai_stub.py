@@ -0,0 +1,102 @@
+"""
+Локальний замінник OpenAI API (/v1/chat/completions, /v1/images/generations) для бенчмарків.
+
+Відповідає одним JSON-об'єктом з полями всіх промптів бекенда (аналіз страви, поради, рецепт),
+тож будь-який виклик AIService парситься без змін. Затримка — latency ± jitter секунд
+(для stream=True розподіляється між чанками). Режим змінюється через POST /_control.
+Бекенд спрямовується сюди змінною OPENAI_BASE_URL.
+"""
+import asyncio
+import json
+import random
+import time
+import uuid
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+CONTENT = {
+    "meal_name": "Курка з гречкою",
+    "calories": 520,
+    "protein": 38,
+    "fat": 14,
+    "carbs": 58,
+    "food_items": ["курка", "гречка", "огірок"],
+    "tips": ["Додайте овочів до вечері.", "Пийте більше води вдень."],
+    "title": "Гречка з куркою",
+    "ingredients": ["гречка 80 г", "куряче філе 150 г"],
+    "instructions": ["Відваріть гречку.", "Запечіть філе."],
+    "image_prompt": "buckwheat with chicken"
+}
+
+
+class OpenAIStub:
+    def __init__(self, latency: float = 1.0, jitter: float = 0.2, chunks: int = 8):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunks = chunks
+        self.request_count = 0
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    @staticmethod
+    def _completion(model: str, content: str) -> dict:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 80, "total_tokens": 180}
+        }
+
+    async def _stream(self, model: str, content: str, delay: float):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        size = max(1, len(content) // self.chunks + 1)
+        pieces = [content[i:i + size] for i in range(0, len(content), size)]
+        for i, piece in enumerate(pieces):
+            await asyncio.sleep(delay / len(pieces))
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece} if i == 0 else {"content": piece}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        last = {
+            "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        }
+        yield f"data: {json.dumps(last)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    async def chat_completions(self, request: Request):
+        self.request_count += 1
+        body = await request.json()
+        model = body.get("model", "gpt-4o")
+        content = json.dumps(CONTENT, ensure_ascii=False)
+        if body.get("stream"):
+            return StreamingResponse(self._stream(model, content, self._delay()), media_type="text/event-stream")
+        await asyncio.sleep(self._delay())
+        return JSONResponse(self._completion(model, content))
+
+    async def images_generations(self, request: Request) -> JSONResponse:
+        self.request_count += 1
+        await asyncio.sleep(self._delay())
+        return JSONResponse({"created": int(time.time()), "data": [{"url": f"https://images.invalid/{uuid.uuid4().hex}.png"}]})
+
+    async def control(self, request: Request) -> JSONResponse:
+        body = json.loads(await request.body() or b"{}")
+        self.latency = float(body.get("latency", self.latency))
+        self.jitter = float(body.get("jitter", self.jitter))
+        return JSONResponse({"latency": self.latency, "jitter": self.jitter, "requests": self.request_count})
+
+    def routes(self) -> list:
+        return [
+            Route("/v1/chat/completions", self.chat_completions, methods=["POST"]),
+            Route("/v1/images/generations", self.images_generations, methods=["POST"]),
+            Route("/_control", self.control, methods=["POST"]),
+        ]
+
+    def app(self) -> Starlette:
+        return Starlette(routes=self.routes())
@@ -0,0 +1,47 @@
+-- Мінімальна схема для локального Postgres-контейнера (docker compose --profile local-db up postgres):
+-- лише таблиці та колонки, які читають гарячі запити MealRepository / UserRepository.
+-- У Supabase ці таблиці вже є — там цей файл не потрібен.
+-- Після нього контейнер виконує daily_status_rpc.sql (див. docker-compose.yml).
+
+CREATE TABLE IF NOT EXISTS public.user_profiles (
+  id uuid PRIMARY KEY,
+  name text,
+  email text,
+  avatar_url text,
+  target_weight numeric,
+  weekly_change_goal numeric,
+  estimated_end_date timestamptz,
+  created_at timestamptz DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS public.user_nutrition (
+  id bigserial PRIMARY KEY,
+  user_id uuid UNIQUE REFERENCES public.user_profiles (id) ON DELETE CASCADE,
+  weight numeric,
+  height numeric,
+  age integer,
+  gender text,
+  activity_level text,
+  goal text,
+  daily_calories_target integer
+);
+
+CREATE TABLE IF NOT EXISTS public.meal_history (
+  id bigserial PRIMARY KEY,
+  user_id uuid NOT NULL,
+  meal_name text,
+  calories numeric,
+  protein numeric,
+  fat numeric,
+  carbs numeric,
+  food_items jsonb,
+  image_url text,
+  created_at timestamptz DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS public.water_logs (
+  id bigserial PRIMARY KEY,
+  user_id uuid NOT NULL,
+  amount integer,
+  created_at timestamptz DEFAULT now()
+);
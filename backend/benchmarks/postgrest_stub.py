@@ -0,0 +1,179 @@
+"""
+Локальний in-memory замінник PostgREST для бенчмарків.
+
+Підтримує підмножину API, яку використовують репозиторії:
+фільтри eq/gte/lte/lt/gt/ilike, select колонок, order, limit, offset, count=exact,
+.single() (Accept: application/vnd.pgrst.object+json), insert/update/delete.
+Кожна відповідь затримується на LATENCY секунд, щоб імітувати мережу.
+"""
+import asyncio
+import json
+import re
+import multiprocessing
+import socket
+import time
+import uuid
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, JSONResponse
+from starlette.routing import Route
+
+SINGLE_MIME = "application/vnd.pgrst.object+json"
+
+
+class PostgrestStub:
+    def __init__(self, latency: float = 0.02, tables: dict = None):
+        self.latency = latency
+        self.tables = tables or {}
+        self.rpcs = {}
+        self.request_count = 0
+
+    # ---- фільтри ----
+    @staticmethod
+    def _match(row: dict, column: str, expr: str) -> bool:
+        op, _, value = expr.partition(".")
+        current = row.get(column)
+        if op == "eq":
+            return str(current).lower() == value.lower() if isinstance(current, bool) else str(current) == value
+        if op == "neq":
+            return str(current) != value
+        if op == "in":
+            return str(current) in value.strip("()").split(",")
+        if op == "is":
+            return current is None if value == "null" else str(current).lower() == value
+        if op in ("gte", "gt", "lte", "lt"):
+            if current is None:
+                return False
+            a, b = str(current), value
+            try:
+                a, b = float(a), float(b)
+            except ValueError:
+                pass
+            return {"gte": a >= b, "gt": a > b, "lte": a <= b, "lt": a < b}[op]
+        if op == "ilike":
+            pattern = re.escape(value).replace("%", ".*").replace("\\*", ".*")
+            return re.fullmatch(pattern, str(current or ""), re.IGNORECASE) is not None
+        return True
+
+    def _filter(self, rows: list, params) -> list:
+        for column, expr in params.multi_items():
+            if column in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+                continue
+            rows = [r for r in rows if self._match(r, column, expr)]
+        return rows
+
+    @staticmethod
+    def _project(rows: list, select: str) -> list:
+        if not select or select == "*":
+            return rows
+        cols = [c.strip() for c in select.split(",")]
+        return [{c: r.get(c) for c in cols} for r in rows]
+
+    @staticmethod
+    def _order(rows: list, order: str) -> list:
+        for part in reversed(order.split(",")):
+            col, *mods = part.split(".")
+            rows = sorted(rows, key=lambda r: (r.get(col) is None, r.get(col)), reverse="desc" in mods)
+        return rows
+
+    def _respond(self, request: Request, rows: list, status: int = 200, total: int = None) -> Response:
+        if request.headers.get("accept", "").startswith(SINGLE_MIME):
+            if len(rows) != 1:
+                return JSONResponse({"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned", "details": None, "hint": None}, status_code=406)
+            return JSONResponse(rows[0], status_code=status)
+        headers = {}
+        if "count=exact" in request.headers.get("prefer", ""):
+            # select(..., count="exact"): загальна кількість у Content-Range, як у PostgREST
+            headers["content-range"] = f"*/{len(rows) if total is None else total}"
+        return JSONResponse(rows, status_code=status, headers=headers)
+
+    # ---- HTTP ----
+    async def table_endpoint(self, request: Request) -> Response:
+        self.request_count += 1
+        await asyncio.sleep(self.latency)
+        name = request.path_params["table"]
+        table = self.tables.setdefault(name, [])
+        params = request.query_params
+
+        if request.method == "GET":
+            rows = self._filter(list(table), params)
+            if "order" in params:
+                rows = self._order(rows, params["order"])
+            total = len(rows)
+            offset = int(params.get("offset", 0))
+            if "limit" in params:
+                rows = rows[offset:offset + int(params["limit"])]
+            return self._respond(request, self._project(rows, params.get("select", "*")), total=total)
+
+        if request.method == "POST":
+            payload = json.loads(await request.body() or b"[]")
+            items = payload if isinstance(payload, list) else [payload]
+            created = []
+            for item in items:
+                row = {"id": str(uuid.uuid4()), **item}
+                table.append(row)
+                created.append(row)
+            return self._respond(request, created, status=201)
+
+        if request.method == "PATCH":
+            patch = json.loads(await request.body() or b"{}")
+            rows = self._filter(table, params)
+            for row in rows:
+                row.update(patch)
+            return self._respond(request, rows)
+
+        if request.method == "DELETE":
+            rows = self._filter(table, params)
+            self.tables[name] = [r for r in table if r not in rows]
+            return self._respond(request, rows)
+
+        return Response(status_code=405)
+
+    async def rpc_endpoint(self, request: Request) -> Response:
+        self.request_count += 1
+        await asyncio.sleep(self.latency)
+        fn = self.rpcs.get(request.path_params["fn"])
+        if fn is None:
+            return JSONResponse({"code": "PGRST202", "message": "function not found"}, status_code=404)
+        body = json.loads(await request.body() or b"{}")
+        return JSONResponse(fn(self.tables, **body))
+
+    def routes(self) -> list:
+        return [
+            Route("/rest/v1/rpc/{fn}", self.rpc_endpoint, methods=["POST", "GET"]),
+            Route("/rest/v1/{table}", self.table_endpoint, methods=["GET", "POST", "PATCH", "DELETE"]),
+        ]
+
+    def app(self) -> Starlette:
+        return Starlette(routes=self.routes())
+
+
+def serve_in_process(app, port: int) -> multiprocessing.Process:
+    """
+    Запускає ASGI додаток в окремому процесі: stub не ділить GIL з клієнтом,
+    який ми міряємо, інакше бенчмарк міряв би конкуренцію потоків.
+    """
+    def run():
+        uvicorn.run(app, host="127.0.0.1", port=port, log_level="critical", lifespan="off")
+
+    process = multiprocessing.get_context("fork").Process(target=run, daemon=True)
+    process.start()
+    try:
+        wait_for_port(port)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
+
+
+def wait_for_port(port: int, timeout: float = 10.0):
+    """Чекає, доки на 127.0.0.1:port почнуть приймати з'єднання."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Server on port {port} did not start")
@@ -0,0 +1,195 @@
+"""
+Локальний замінник Supabase для наскрізних бенчмарків: PostgREST (postgrest_stub),
+GoTrue (signup / password-токен / user / JWKS) та Storage (upload / remove / public).
+
+Усе в пам'яті процесу stub-сервера; токени підписуються HS256 тим самим SUPABASE_JWT_SECRET,
+що й у бекенда, тож jwt_verifier перевіряє їх локально.
+Затримка змінюється на льоту через POST /_control {"latency": 0.02}.
+"""
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from jose import jwt
+from starlette.requests import Request
+from starlette.responses import Response, JSONResponse
+from starlette.routing import Route
+from benchmarks.postgrest_stub import PostgrestStub
+
+FOOD_NAMES = [
+    "Гречка варена", "Гречана каша з молоком", "Курка запечена", "Куряче філе", "Борщ український",
+    "Сир кисломолочний", "Сирники", "Банан", "Яблуко", "Вівсянка на воді",
+    "Kurczak pieczony", "Chleb żytni", "Jabłko", "Łosoś wędzony", "Twaróg półtłusty",
+    "Milk 2%", "Greek yogurt", "Banana", "Chicken breast", "Oatmeal",
+]
+
+
+def daily_status_rpc(tables: dict, p_user_id: str, p_date_from: str) -> dict:
+    """Python-відповідник public.get_daily_status з daily_status_rpc.sql."""
+    profile = next((p for p in tables.get("user_profiles", []) if p["id"] == p_user_id), None)
+    nutrition = next((n for n in tables.get("user_nutrition", []) if n["user_id"] == p_user_id), {})
+    meals = [m for m in tables.get("meal_history", []) if m["user_id"] == p_user_id and m["created_at"] >= p_date_from]
+    water = [w for w in tables.get("water_logs", []) if w["user_id"] == p_user_id and w["created_at"] >= p_date_from]
+    return {
+        "profile": {**profile, **nutrition} if profile else None,
+        "totals": {
+            "eaten": sum(int(m["calories"] or 0) for m in meals),
+            "protein": sum(m.get("protein") or 0 for m in meals),
+            "fat": sum(m.get("fat") or 0 for m in meals),
+            "carbs": sum(m.get("carbs") or 0 for m in meals),
+            "meal_count": len(meals),
+            "water": sum(w["amount"] for w in water)
+        }
+    }
+
+
+def search_food_products_rpc(tables: dict, p_query: str, p_limit: int = 10) -> list:
+    """Спрощений public.search_food_products (food_search.sql): префікс вище за входження."""
+    key = p_query.strip().lower()
+    if not key:
+        return []
+    ranked = []
+    for row in tables.get("food_products", []):
+        name = row["name"].lower()
+        if name.startswith(key):
+            score = 1.5
+        elif f" {key}" in f" {name}":
+            score = 1.25
+        elif key in name:
+            score = 1.0
+        else:
+            continue
+        ranked.append({**row, "score": score})
+    ranked.sort(key=lambda r: (-r["score"], len(r["name"])))
+    return ranked[:max(1, min(p_limit, 50))]
+
+
+class SupabaseStub(PostgrestStub):
+    def __init__(self, latency: float = 0.02, tables: dict = None, jwt_secret: str = "bench-secret"):
+        super().__init__(latency, tables)
+        self.jwt_secret = jwt_secret
+        self.users = {}
+        self.objects = {}
+        self.rpcs["get_daily_status"] = daily_status_rpc
+        self.rpcs["search_food_products"] = search_food_products_rpc
+
+    # ---- GoTrue ----
+    def _session(self, user: dict) -> dict:
+        now = int(time.time())
+        token = jwt.encode(
+            {"sub": user["id"], "email": user["email"], "aud": "authenticated", "role": "authenticated", "iat": now, "exp": now + 3600},
+            self.jwt_secret, algorithm="HS256"
+        )
+        return {
+            "access_token": token, "token_type": "bearer", "expires_in": 3600, "expires_at": now + 3600,
+            "refresh_token": uuid.uuid4().hex, "user": user
+        }
+
+    @staticmethod
+    def _user(user_id: str, email: str) -> dict:
+        return {"id": user_id, "aud": "authenticated", "role": "authenticated", "email": email,
+                "app_metadata": {}, "user_metadata": {}, "created_at": "2024-01-01T00:00:00Z"}
+
+    def add_user(self, user_id: str, email: str, password: str = "password") -> dict:
+        user = self._user(user_id, email)
+        self.users[email] = (user, password)
+        return user
+
+    def token_for(self, user_id: str) -> str:
+        """Access-токен без запиту до stub (для клієнта бенчмарку)."""
+        return self._session(self._user(user_id, f"{user_id}@example.com"))["access_token"]
+
+    async def auth_signup(self, request: Request) -> Response:
+        self.request_count += 1
+        await asyncio.sleep(self.latency)
+        body = await request.json()
+        user = self.add_user(str(uuid.uuid4()), body["email"], body.get("password", ""))
+        return JSONResponse(self._session(user))
+
+    async def auth_token(self, request: Request) -> Response:
+        self.request_count += 1
+        await asyncio.sleep(self.latency)
+        body = await request.json()
+        entry = self.users.get(body.get("email"))
+        if entry is None or entry[1] != body.get("password"):
+            return JSONResponse({"error": "invalid_grant", "error_description": "Invalid login credentials"}, status_code=400)
+        return JSONResponse(self._session(entry[0]))
+
+    async def auth_user(self, request: Request) -> Response:
+        self.request_count += 1
+        await asyncio.sleep(self.latency)
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        try:
+            claims = jwt.decode(token, self.jwt_secret, algorithms=["HS256"], audience="authenticated")
+        except Exception:
+            return JSONResponse({"msg": "invalid JWT"}, status_code=401)
+        return JSONResponse(self._user(claims["sub"], claims.get("email", "")))
+
+    async def auth_jwks(self, request: Request) -> Response:
+        # Лише HS256 — асиметричних ключів немає
+        return JSONResponse({"keys": []})
+
+    # ---- Storage ----
+    async def storage_upload(self, request: Request) -> Response:
+        self.request_count += 1
+        await asyncio.sleep(self.latency)
+        key = f"{request.path_params['bucket']}/{request.path_params['path']}"
+        self.objects[key] = len(await request.body())
+        return JSONResponse({"Key": key, "Id": str(uuid.uuid4())})
+
+    async def storage_remove(self, request: Request) -> Response:
+        self.request_count += 1
+        await asyncio.sleep(self.latency)
+        bucket = request.path_params["bucket"]
+        removed = [p for p in (await request.json()).get("prefixes", []) if self.objects.pop(f"{bucket}/{p}", None) is not None]
+        return JSONResponse([{"name": p, "bucket_id": bucket} for p in removed])
+
+    async def storage_public(self, request: Request) -> Response:
+        key = f"{request.path_params['bucket']}/{request.path_params['path']}"
+        if key not in self.objects:
+            return JSONResponse({"error": "not_found"}, status_code=404)
+        return Response(b"\0" * self.objects[key], media_type="image/jpeg")
+
+    async def control(self, request: Request) -> JSONResponse:
+        body = json.loads(await request.body() or b"{}")
+        self.latency = float(body.get("latency", self.latency))
+        return JSONResponse({"latency": self.latency, "requests": self.request_count})
+
+    def routes(self) -> list:
+        return [
+            Route("/auth/v1/signup", self.auth_signup, methods=["POST"]),
+            Route("/auth/v1/token", self.auth_token, methods=["POST"]),
+            Route("/auth/v1/user", self.auth_user, methods=["GET"]),
+            Route("/auth/v1/.well-known/jwks.json", self.auth_jwks, methods=["GET"]),
+            Route("/storage/v1/object/public/{bucket}/{path:path}", self.storage_public, methods=["GET"]),
+            Route("/storage/v1/object/{bucket}/{path:path}", self.storage_upload, methods=["POST", "PUT"]),
+            Route("/storage/v1/object/{bucket}", self.storage_remove, methods=["DELETE"]),
+            Route("/_control", self.control, methods=["POST"]),
+            *super().routes(),
+        ]
+
+
+def seed(stub: SupabaseStub, users: int, meals_per_user: int = 4, today: str = None) -> list:
+    """Користувачі з профілем, ціллю, стравами та водою за сьогодні, сторіз і довідник продуктів."""
+    today = today or datetime.now(ZoneInfo("Europe/Warsaw")).isoformat()
+    user_ids = []
+    for i in range(users):
+        uid = str(uuid.UUID(int=i + 1))
+        user_ids.append(uid)
+        stub.add_user(uid, f"u{i}@example.com")
+        stub.tables.setdefault("user_profiles", []).append({"id": uid, "name": f"User {i}", "email": f"u{i}@example.com", "created_at": today})
+        stub.tables.setdefault("user_nutrition", []).append({"user_id": uid, "weight": 70, "daily_calories_target": 2200, "goal": "Підтримка ваги"})
+        for j in range(meals_per_user):
+            stub.tables.setdefault("meal_history", []).append({
+                "id": f"{uid}-m{j}", "user_id": uid, "meal_name": "Страва", "calories": 500,
+                "protein": 20, "fat": 10, "carbs": 60, "created_at": today
+            })
+        stub.tables.setdefault("water_logs", []).append({"user_id": uid, "amount": 250, "created_at": today})
+    stub.tables["app_stories"] = [{"id": "s1", "title": "Story", "image_url": "", "is_active": True}]
+    stub.tables["food_products"] = [
+        {"id": i + 1, "name": name, "calories": 100 + i * 7, "protein": 5.0, "fat": 3.0, "carbs": 12.0}
+        for i, name in enumerate(FOOD_NAMES)
+    ]
+    return user_ids
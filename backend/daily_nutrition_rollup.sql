@@ -0,0 +1,175 @@
+-- Денний rollup харчування: один рядок на (user_id, local_day) за часом Europe/Warsaw.
+-- Підтримується тригерами на meal_history / water_logs, тож кожен insert/update/delete
+-- інкрементально змінює суми. Для наявних даних: SELECT public.rebuild_daily_nutrition_rollup();
+-- (або python rebuild_rollup.py). Потребує public.clean_numeric з daily_status_rpc.sql.
+
+CREATE TABLE IF NOT EXISTS public.daily_nutrition_rollup (
+  user_id     uuid    NOT NULL,
+  local_day   date    NOT NULL,
+  calories    integer NOT NULL DEFAULT 0,
+  protein     numeric NOT NULL DEFAULT 0,
+  fat         numeric NOT NULL DEFAULT 0,
+  carbs       numeric NOT NULL DEFAULT 0,
+  water       integer NOT NULL DEFAULT 0,
+  meal_count  integer NOT NULL DEFAULT 0,
+  updated_at  timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (user_id, local_day)
+);
+
+-- Для агрегатів по всіх користувачах (графік адмін-панелі)
+CREATE INDEX IF NOT EXISTS idx_daily_nutrition_rollup_day
+  ON public.daily_nutrition_rollup (local_day);
+
+CREATE OR REPLACE FUNCTION public.nutrition_local_day(ts timestamptz)
+RETURNS date
+LANGUAGE sql IMMUTABLE
+AS $$
+  SELECT (ts AT TIME ZONE 'Europe/Warsaw')::date;
+$$;
+
+CREATE OR REPLACE FUNCTION public.apply_nutrition_rollup_delta(
+  p_user_id uuid, p_day date,
+  p_calories integer, p_protein numeric, p_fat numeric, p_carbs numeric,
+  p_water integer, p_meal_count integer
+)
+RETURNS void
+LANGUAGE sql
+AS $$
+  INSERT INTO public.daily_nutrition_rollup AS r
+    (user_id, local_day, calories, protein, fat, carbs, water, meal_count, updated_at)
+  VALUES (p_user_id, p_day, p_calories, p_protein, p_fat, p_carbs, p_water, p_meal_count, now())
+  ON CONFLICT (user_id, local_day) DO UPDATE SET
+    calories   = r.calories   + EXCLUDED.calories,
+    protein    = r.protein    + EXCLUDED.protein,
+    fat        = r.fat        + EXCLUDED.fat,
+    carbs      = r.carbs      + EXCLUDED.carbs,
+    water      = r.water      + EXCLUDED.water,
+    meal_count = r.meal_count + EXCLUDED.meal_count,
+    updated_at = now();
+
+  -- День без жодної страви й води (усе видалено або перенесено) — прибираємо рядок
+  DELETE FROM public.daily_nutrition_rollup
+  WHERE user_id = p_user_id AND local_day = p_day
+    AND (p_meal_count < 0 OR p_water < 0)
+    AND meal_count <= 0 AND water <= 0;
+$$;
+
+CREATE OR REPLACE FUNCTION public.meal_history_rollup_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.apply_nutrition_rollup_delta(
+      OLD.user_id, public.nutrition_local_day(OLD.created_at),
+      -trunc(public.clean_numeric(OLD.calories))::int,
+      -public.clean_numeric(OLD.protein), -public.clean_numeric(OLD.fat), -public.clean_numeric(OLD.carbs),
+      0, -1);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.apply_nutrition_rollup_delta(
+      NEW.user_id, public.nutrition_local_day(NEW.created_at),
+      trunc(public.clean_numeric(NEW.calories))::int,
+      public.clean_numeric(NEW.protein), public.clean_numeric(NEW.fat), public.clean_numeric(NEW.carbs),
+      0, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.water_logs_rollup_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.apply_nutrition_rollup_delta(
+      OLD.user_id, public.nutrition_local_day(OLD.created_at), 0, 0, 0, 0, -COALESCE(OLD.amount, 0), 0);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.apply_nutrition_rollup_delta(
+      NEW.user_id, public.nutrition_local_day(NEW.created_at), 0, 0, 0, 0, COALESCE(NEW.amount, 0), 0);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_meal_history_rollup ON public.meal_history;
+CREATE TRIGGER trg_meal_history_rollup
+  AFTER INSERT OR UPDATE OF user_id, created_at, calories, protein, fat, carbs OR DELETE
+  ON public.meal_history
+  FOR EACH ROW EXECUTE FUNCTION public.meal_history_rollup_trigger();
+
+DROP TRIGGER IF EXISTS trg_water_logs_rollup ON public.water_logs;
+CREATE TRIGGER trg_water_logs_rollup
+  AFTER INSERT OR UPDATE OF user_id, created_at, amount OR DELETE
+  ON public.water_logs
+  FOR EACH ROW EXECUTE FUNCTION public.water_logs_rollup_trigger();
+
+-- Повний перерахунок (backfill). p_user_id / p_from обмежують обсяг; NULL = все.
+-- SHARE-блокування meal_history / water_logs на час перерахунку зупиняє записи (і тригери),
+-- тож знімок джерела й rollup узгоджені; читання при цьому не блокуються.
+-- Рядки оновлюються через ON CONFLICT, а дні без даних видаляються.
+CREATE OR REPLACE FUNCTION public.rebuild_daily_nutrition_rollup(
+  p_user_id uuid DEFAULT NULL,
+  p_from date DEFAULT NULL
+)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  affected integer;
+BEGIN
+  LOCK TABLE public.meal_history, public.water_logs IN SHARE MODE;
+
+  WITH src AS (
+    SELECT user_id, local_day,
+           SUM(calories)::int AS calories, SUM(protein) AS protein, SUM(fat) AS fat, SUM(carbs) AS carbs,
+           SUM(water)::int AS water, SUM(meal_count)::int AS meal_count
+    FROM (
+      SELECT m.user_id, public.nutrition_local_day(m.created_at) AS local_day,
+             trunc(public.clean_numeric(m.calories)) AS calories,
+             public.clean_numeric(m.protein) AS protein,
+             public.clean_numeric(m.fat) AS fat,
+             public.clean_numeric(m.carbs) AS carbs,
+             0 AS water, 1 AS meal_count
+      FROM public.meal_history m
+      WHERE (p_user_id IS NULL OR m.user_id = p_user_id)
+        AND (p_from IS NULL OR public.nutrition_local_day(m.created_at) >= p_from)
+      UNION ALL
+      SELECT w.user_id, public.nutrition_local_day(w.created_at),
+             0, 0, 0, 0, COALESCE(w.amount, 0), 0
+      FROM public.water_logs w
+      WHERE (p_user_id IS NULL OR w.user_id = p_user_id)
+        AND (p_from IS NULL OR public.nutrition_local_day(w.created_at) >= p_from)
+    ) per_row
+    GROUP BY user_id, local_day
+    HAVING SUM(meal_count) > 0 OR SUM(water) > 0
+  ),
+  upserted AS (
+    INSERT INTO public.daily_nutrition_rollup AS r
+      (user_id, local_day, calories, protein, fat, carbs, water, meal_count, updated_at)
+    SELECT user_id, local_day, calories, protein, fat, carbs, water, meal_count, now()
+    FROM src
+    ON CONFLICT (user_id, local_day) DO UPDATE SET
+      calories   = EXCLUDED.calories,
+      protein    = EXCLUDED.protein,
+      fat        = EXCLUDED.fat,
+      carbs      = EXCLUDED.carbs,
+      water      = EXCLUDED.water,
+      meal_count = EXCLUDED.meal_count,
+      updated_at = now()
+    RETURNING 1
+  ),
+  removed AS (
+    DELETE FROM public.daily_nutrition_rollup r
+    WHERE (p_user_id IS NULL OR r.user_id = p_user_id)
+      AND (p_from IS NULL OR r.local_day >= p_from)
+      AND NOT EXISTS (SELECT 1 FROM src WHERE src.user_id = r.user_id AND src.local_day = r.local_day)
+    RETURNING 1
+  )
+  SELECT count(*) INTO affected FROM upserted;
+
+  RETURN affected;
+END;
+$$;
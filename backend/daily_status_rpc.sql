@@ -0,0 +1,49 @@
+-- Денний статус користувача одним викликом (RPC для GET /user_status/{user_id}).
+-- Повертає профіль (user_profiles + user_nutrition), суми калорій/БЖВ та воду з p_date_from.
+-- Виконайте у Supabase SQL Editor. Python-сума в NutritionService лишається як fallback.
+
+-- Нечислові значення (напр. '350 ккал') чистимо так само, як utils.clean_to_int / clean_to_float:
+-- лишаємо цифри й крапки; якщо залишок не є числом ('1.2.3', '.', ''), — 0, а не помилка приведення
+CREATE OR REPLACE FUNCTION public.clean_numeric(val anyelement)
+RETURNS numeric
+LANGUAGE sql IMMUTABLE
+AS $$
+  SELECT CASE WHEN c.s ~ '^([0-9]+\.?[0-9]*|\.[0-9]+)$' THEN c.s::numeric ELSE 0 END
+  FROM (SELECT regexp_replace(val::text, '[^0-9.]', '', 'g') AS s) c;
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_meal_history_user_created
+  ON public.meal_history (user_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_water_logs_user_created
+  ON public.water_logs (user_id, created_at DESC);
+
+CREATE OR REPLACE FUNCTION public.get_daily_status(p_user_id uuid, p_date_from timestamptz)
+RETURNS jsonb
+LANGUAGE sql STABLE
+AS $$
+  SELECT jsonb_build_object(
+    'profile', (
+      SELECT to_jsonb(p) || COALESCE(to_jsonb(n) - 'id', '{}'::jsonb)
+      FROM public.user_profiles p
+      LEFT JOIN public.user_nutrition n ON n.user_id = p.id
+      WHERE p.id = p_user_id
+    ),
+    'totals', (
+      SELECT jsonb_build_object(
+        'eaten',      COALESCE(SUM(trunc(public.clean_numeric(m.calories))), 0)::int,
+        'protein',    COALESCE(SUM(public.clean_numeric(m.protein)), 0),
+        'fat',        COALESCE(SUM(public.clean_numeric(m.fat)), 0),
+        'carbs',      COALESCE(SUM(public.clean_numeric(m.carbs)), 0),
+        'meal_count', COUNT(*),
+        'water', (
+          SELECT COALESCE(SUM(w.amount), 0)::int
+          FROM public.water_logs w
+          WHERE w.user_id = p_user_id AND w.created_at >= p_date_from
+        )
+      )
+      FROM public.meal_history m
+      WHERE m.user_id = p_user_id AND m.created_at >= p_date_from
+    )
+  );
+$$;
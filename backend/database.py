@@ -1,10 +1,107 @@
-from supabase import create_client, Client
+import json
+import logging
+from typing import Optional
+import httpx
+from supabase import create_client, acreate_client, Client, AsyncClient, AsyncClientOptions
 from config import settings
+from metrics import instrumented_transport, classify_supabase
+
+logger = logging.getLogger(__name__)
 
 supabase: Client = create_client(
-    settings.SUPABASE_URL, 
+    settings.SUPABASE_URL,
     settings.SUPABASE_SERVICE_ROLE_KEY
 )
 
 url = settings.SUPABASE_URL
-key = settings.SUPABASE_SERVICE_ROLE_KEY
\ No newline at end of file
+key = settings.SUPABASE_SERVICE_ROLE_KEY
+
+# Асинхронний клієнт (створюється в lifespan, один на процес)
+_async_supabase: Optional[AsyncClient] = None
+_http_client: Optional[httpx.AsyncClient] = None
+
+async def init_async_supabase() -> AsyncClient:
+    """Створює async Supabase клієнт поверх спільного httpx пулу з keep-alive."""
+    global _async_supabase, _http_client
+    if _async_supabase is not None:
+        return _async_supabase
+
+    # Транспорт з метриками: кількість і час викликів по таблиці PostgREST / бакету Storage
+    _http_client = httpx.AsyncClient(
+        transport=instrumented_transport(classify_supabase, httpx.Limits(
+            max_connections=settings.SUPABASE_POOL_SIZE,
+            max_keepalive_connections=settings.SUPABASE_POOL_KEEPALIVE
+        )),
+        timeout=httpx.Timeout(settings.SUPABASE_TIMEOUT),
+        follow_redirects=True
+    )
+    _async_supabase = await acreate_client(
+        settings.SUPABASE_URL,
+        settings.SUPABASE_SERVICE_ROLE_KEY,
+        options=AsyncClientOptions(httpx_client=_http_client)
+    )
+    return _async_supabase
+
+async def close_async_supabase():
+    global _async_supabase, _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _async_supabase = None
+    _http_client = None
+
+# Пул asyncpg для гарячих читань (DATABASE_BACKEND=asyncpg), один на процес
+_pg_pool = None
+
+async def _init_pg_connection(conn):
+    # json/jsonb -> dict/list, як у відповідях PostgREST
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+async def init_pg_pool():
+    """
+    Створює пул asyncpg, якщо DATABASE_BACKEND=asyncpg. asyncpg — необов'язкова залежність:
+    без неї, без DATABASE_URL або коли БД недоступна все працює через PostgREST.
+    """
+    global _pg_pool
+    if _pg_pool is not None or settings.DATABASE_BACKEND != "asyncpg":
+        return _pg_pool
+    if not settings.DATABASE_URL:
+        logger.warning("DATABASE_BACKEND=asyncpg but DATABASE_URL is empty, using PostgREST")
+        return None
+    try:
+        import asyncpg
+    except ImportError:
+        logger.warning("asyncpg is not installed, using PostgREST")
+        return None
+
+    try:
+        _pg_pool = await asyncpg.create_pool(
+            settings.DATABASE_URL,
+            min_size=settings.DATABASE_POOL_MIN,
+            max_size=settings.DATABASE_POOL_MAX,
+            command_timeout=settings.DATABASE_TIMEOUT,
+            statement_cache_size=settings.DATABASE_STATEMENT_CACHE_SIZE,
+            # Дати в jsonb — у UTC, як у PostgREST
+            server_settings={"timezone": "UTC", "application_name": "nutritionai-backend"},
+            init=_init_pg_connection
+        )
+        logger.info(f"POSTGRES -> pool ready ({settings.DATABASE_POOL_MIN}-{settings.DATABASE_POOL_MAX} connections)")
+    except Exception as e:
+        logger.error(f"Postgres pool error, using PostgREST: {e}")
+        _pg_pool = None
+    return _pg_pool
+
+async def close_pg_pool():
+    global _pg_pool
+    if _pg_pool is not None:
+        await _pg_pool.close()
+    _pg_pool = None
+
+def get_pg_pool():
+    """Пул asyncpg або None (PostgREST-режим)."""
+    return _pg_pool
+
+def get_async_supabase() -> AsyncClient:
+    if _async_supabase is None:
+        raise RuntimeError("Async Supabase client is not initialized (lifespan not started)")
+    return _async_supabase
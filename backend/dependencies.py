@@ -1,29 +1,39 @@
-from fastapi import Header, HTTPException
-from jose import jwt
-from config import settings
-from database import supabase
+from typing import Optional
+from database import get_async_supabase, get_pg_pool
 from repositories.user_repo import UserRepository
 from repositories.meal_repo import MealRepository
+from repositories.food_repo import FoodRepository
+from repositories.sync_repo import SyncRepository
+from repositories.weight_repo import WeightRepository
+from repositories.admin_repo import AdminRepository
+from repositories.pg_reader import PostgresReader
 from services.nutrition_service import NutritionService
+from services.food_service import FoodService
+from services.sync_service import SyncService
+from services.weight_service import WeightService
+from services.admin_service import AdminService
+from services.auth_service import get_current_user
 
 
-# JWT AUTH
-def get_current_user(authorization: str = Header(...)) -> str:
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing Token")
-    token = authorization.replace("Bearer ", "")
-    try:
-        # Validate via Supabase directly to avoid algorithm mismatch (ES256 vs HS256)
-        user_res = supabase.auth.get_user(token)
-        if not user_res or not user_res.user:
-            raise Exception("User verification failed")
-        return user_res.user.id
-    except Exception as e:
-        print(f"Auth Error: {e}")
-        # Fallback for dev: try to decode without verify if manual verify failed (OPTIONAL)
-        # But for now, returning 401 is correct security.
-        raise HTTPException(status_code=401, detail="Invalid Token")
-
 # DI
+def get_pg_reader() -> Optional[PostgresReader]:
+    """Прямі читання з Postgres, якщо пул asyncpg піднято (DATABASE_BACKEND=asyncpg)."""
+    pool = get_pg_pool()
+    return PostgresReader(pool) if pool is not None else None
+
 def get_nutrition_service():
-    return NutritionService(MealRepository(supabase), UserRepository(supabase))
\ No newline at end of file
+    client, pg = get_async_supabase(), get_pg_reader()
+    return NutritionService(MealRepository(client, pg), UserRepository(client, pg))
+
+def get_food_service():
+    return FoodService(FoodRepository(get_async_supabase()))
+
+def get_sync_service():
+    return SyncService(SyncRepository(get_async_supabase()))
+
+def get_weight_service():
+    client = get_async_supabase()
+    return WeightService(WeightRepository(client), UserRepository(client, get_pg_reader()))
+
+def get_admin_service():
+    return AdminService(AdminRepository(get_async_supabase()))
\ No newline at end of file
@@ -0,0 +1,65 @@
+-- Пошук продуктів у food_products (RPC для GET /search_food).
+-- Триграмний GIN індекс замість ilike '%query%' (seq scan), ранжування за схожістю,
+-- бонус за збіг з початку назви/слова та транслітерація uk/pl/en до спільного ключа.
+-- Виконайте у Supabase SQL Editor. ilike у FoodService лишається як fallback.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Спільний пошуковий ключ: "курчак", "kurczak" та "kurchak" дають "kurchak".
+-- 1) польські диграфи -> кирилиця (sz->ш, cz->ч, rz/ż->ж, ch->х, ź->з);
+-- 2) кирилиця -> латиниця в польській манері (щ->shch, ж->zh, ч->ch, ш->sh, я->ja, й->j, ц->c, г/х->h ...);
+-- 3) польські діакритики та w->v; усе, крім [a-z0-9], стає пробілом.
+CREATE OR REPLACE FUNCTION public.food_search_key(val text)
+RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+  SELECT trim(regexp_replace(
+    translate(
+      replace(replace(replace(replace(replace(replace(replace(
+        replace(replace(replace(replace(replace(replace(replace(replace(
+          lower(COALESCE(val, '')),
+          'sz', 'ш'), 'cz', 'ч'), 'rz', 'ж'), 'ch', 'х'), 'ż', 'ж'), 'ź', 'з'),
+        'щ', 'shch'), 'ж', 'zh'), 'ч', 'ch'), 'ш', 'sh'), 'ю', 'ju'), 'я', 'ja'), 'є', 'je'), 'ї', 'ji'), 'й', 'j'),
+      'абвгґдезиіклмнопрстуфхцыэёąćęłńóśwьъ',
+      'abvhgdezyiklmnoprstufhcyeeacelnosv'
+    ),
+    '[^a-z0-9]+', ' ', 'g'
+  ));
+$$;
+
+ALTER TABLE public.food_products
+  ADD COLUMN IF NOT EXISTS search_key text
+  GENERATED ALWAYS AS (public.food_search_key(name)) STORED;
+
+-- Обслуговує і word_similarity (<%), і LIKE '%...%'
+CREATE INDEX IF NOT EXISTS idx_food_products_search_key_trgm
+  ON public.food_products USING gin (search_key gin_trgm_ops);
+
+-- Повертає продукти (без search_key) з полем score, найкращі першими.
+-- score = word_similarity + 0.5 за збіг з початку назви або + 0.25 за збіг з початку слова.
+CREATE OR REPLACE FUNCTION public.search_food_products(p_query text, p_limit integer DEFAULT 10)
+RETURNS SETOF jsonb
+LANGUAGE sql STABLE
+SET pg_trgm.word_similarity_threshold = 0.4
+AS $$
+  WITH q AS (
+    SELECT public.food_search_key(p_query) AS key
+  ),
+  ranked AS (
+    SELECT
+      f,
+      word_similarity(q.key, f.search_key)
+        + CASE
+            WHEN f.search_key LIKE q.key || '%' THEN 0.5
+            WHEN ' ' || f.search_key LIKE '% ' || q.key || '%' THEN 0.25
+            ELSE 0
+          END AS score
+    FROM public.food_products f, q
+    WHERE q.key <> ''
+      AND (q.key <% f.search_key OR f.search_key LIKE '%' || q.key || '%')
+  )
+  SELECT (to_jsonb(r.f) - 'search_key') || jsonb_build_object('score', round(r.score::numeric, 3))
+  FROM ranked r
+  ORDER BY r.score DESC, length((r.f).name)
+  LIMIT LEAST(GREATEST(p_limit, 1), 50);
+$$;
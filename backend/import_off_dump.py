@@ -0,0 +1,101 @@
+import argparse
+import csv
+import gzip
+import json
+import sys
+import time
+from typing import Iterator
+from config import settings
+from services.off_client import normalize_product
+from services.off_index import OffProductIndex
+
+# Колонки CSV дампу OFF (en.openfoodfacts.org.products.csv, розділювач — таб)
+CSV_NUTRIMENTS = ("energy-kcal_100g", "proteins_100g", "fat_100g", "carbohydrates_100g")
+
+def open_dump(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith((".csv", ".tsv")) else "jsonl"
+
+def read_jsonl(path: str) -> Iterator[dict]:
+    with open_dump(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+def read_csv(path: str) -> Iterator[dict]:
+    csv.field_size_limit(sys.maxsize)
+    with open_dump(path) as f:
+        for row in csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            # Приводимо до форми JSONL-дампу / API, щоб нормалізація була одна
+            row["nutriments"] = {key: row.get(key) for key in CSV_NUTRIMENTS if row.get(key)}
+            yield row
+
+def iter_products(path: str, fmt: str) -> Iterator[tuple]:
+    """(code, нормалізований продукт або None) — None означає "прибрати з індексу"."""
+    reader = read_csv if fmt == "csv" else read_jsonl
+    for raw in reader(path):
+        code = str(raw.get("code") or "").strip()
+        if not code:
+            continue
+        try:
+            product = normalize_product(raw)
+        except (TypeError, ValueError):
+            product = None
+        yield code, product
+
+def import_dump(index: OffProductIndex, path: str, fmt: str, batch_size: int, delta: bool):
+    """
+    Потоково читає дамп і пише в індекс пачками. Повний дамп пропускає продукти без ккал;
+    у дельта-файлі такий продукт видаляється з індексу (міг втратити дані після редагування).
+    """
+    started = time.monotonic()
+    seen = upserted = deleted = 0
+    upserts, deletes = [], []
+
+    def flush():
+        nonlocal upserted, deleted
+        upserted += index.upsert_many(upserts)
+        if delta:
+            deleted += index.delete_codes(deletes)
+        upserts.clear()
+        deletes.clear()
+
+    for code, product in iter_products(path, fmt):
+        seen += 1
+        if product:
+            upserts.append({**product, "code": code})
+        else:
+            deletes.append(code)
+        if len(upserts) + len(deletes) >= batch_size:
+            flush()
+            print(f"\r{seen:,} read, {upserted:,} indexed, {deleted:,} removed", end="", flush=True)
+    flush()
+
+    print(f"\r{seen:,} read, {upserted:,} indexed, {deleted:,} removed in {time.monotonic() - started:.1f} s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import of an OpenFoodFacts dump (JSONL/CSV, .gz) into the local search index")
+    parser.add_argument("paths", nargs="+", help="файли дампу; дельти — у хронологічному порядку")
+    parser.add_argument("--format", choices=["auto", "jsonl", "csv"], default="auto")
+    parser.add_argument("--index", default=settings.OFF_INDEX_PATH or "off_products.sqlite3", help="шлях до SQLite індексу")
+    parser.add_argument("--delta", action="store_true", help="дельта-файли: продукти без ккал видаляються з індексу")
+    parser.add_argument("--batch", type=int, default=5000)
+    args = parser.parse_args()
+
+    index = OffProductIndex(args.index)
+    for path in args.paths:
+        fmt = detect_format(path) if args.format == "auto" else args.format
+        print(f"Importing {path} ({fmt}{', delta' if args.delta else ''}) -> {args.index}")
+        import_dump(index, path, fmt, args.batch, args.delta)
+    index.optimize()
+    print(f"Done. Products in index: {index.count():,}")
@@ -0,0 +1,151 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+from config import settings
+
+# Поля LogRecord, які не є "extra" (решта потрапляє в JSON / рядок консолі як key=value)
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+# Бібліотеки, що логують кожен HTTP-запит
+SILENT_LIBRARIES = (
+    "uvicorn", "uvicorn.access", "uvicorn.error", "uvicorn.asgi",
+    "watchfiles", "httpcore", "httpx",
+    "supabase", "postgrest", "gotrue", "openai"
+)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _extras(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS and not k.startswith("_")}
+
+def _parse_mapping(raw: str) -> dict:
+    """"a=WARNING,b.c=DEBUG" -> {"a": "WARNING", "b.c": "DEBUG"}"""
+    pairs = (item.split("=", 1) for item in raw.split(",") if "=" in item)
+    return {name.strip(): value.strip() for name, value in pairs if name.strip()}
+
+
+class JsonFormatter(logging.Formatter):
+    """Один JSON-об'єкт на рядок (prod, Docker json-file / збирачі логів)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_extras(record)
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Dev: повідомлення + extra як key=value (RichHandler додає час і рівень)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        extras = " ".join(f"{k}={v}" for k, v in _extras(record).items())
+        message = f"{record.getMessage()}  {extras}" if extras else record.getMessage()
+        return f"{message}\n{record.exc_text}" if record.exc_text else message
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Як QueueHandler, але traceback лишається окремим полем (exc_text), а не дописується в повідомлення."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_exc_formatter = logging.Formatter()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускає лише частку записів нижче WARNING для заданих логерів (і їхніх нащадків),
+    напр. LOG_SAMPLING="http.requests=0.1". Попередження та помилки — завжди.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name: str) -> float:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+def _output_handler(fmt: str) -> logging.Handler:
+    if fmt == "auto":
+        fmt = "rich" if sys.stderr.isatty() else "json"
+    if fmt == "rich":
+        from rich.console import Console
+        from rich.logging import RichHandler
+        handler = RichHandler(console=Console(stderr=True), show_path=False, markup=False, log_time_format="[%X]")
+        handler.setFormatter(ConsoleFormatter())
+        return handler
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def setup_logging():
+    """
+    Логи через чергу: event loop лише кладе запис у queue (QueueHandler), а форматування
+    та запис у stdout робить окремий потік (QueueListener).
+    LOG_FORMAT: auto (rich у терміналі, інакше JSON) | rich | json.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    for lib in SILENT_LIBRARIES:
+        lib_logger = logging.getLogger(lib)
+        lib_logger.setLevel(logging.CRITICAL)
+        lib_logger.propagate = False
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    rates = {name: float(rate) for name, rate in _parse_mapping(settings.LOG_SAMPLING).items()}
+    if rates:
+        queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in _parse_mapping(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, _output_handler(settings.LOG_FORMAT), respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Дописує записи, що лишились у черзі (виклик при завершенні процесу)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
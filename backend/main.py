@@ -1,46 +1,31 @@
 import logging
+import time
 import pytz
 from datetime import datetime
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from rich.logging import RichHandler
-from rich.console import Console
 from banner import *
 from dotenv import load_dotenv
+from logging_setup import setup_logging
 
 load_dotenv()
 
 # Імпорт роутерів
-from routers import auth, profile, tracking, ai, admin, weight
+from routers import auth, profile, tracking, ai, admin, weight, sync, metrics as metrics_router
+from database import init_async_supabase, close_async_supabase, init_pg_pool, close_pg_pool
+from services.stories_service import stories_service_instance
+from services.job_queue import job_queue
+from services.off_client import off_client
+from metrics import http_requests, http_errors, http_latency, http_in_flight, route_label
 
 # НАЛАШТУВАННЯ
 POLAND_TZ = pytz.timezone('Europe/Warsaw')
-console = Console()
-
-def setup_logging():
-
-    silent_libraries = [
-        "uvicorn", "uvicorn.access", "uvicorn.error", "uvicorn.asgi",
-        "watchfiles", "httpcore", "httpx", 
-        "supabase", "postgrest", "gotrue"
-    ]
-    
-    for lib in silent_libraries:
-        logger = logging.getLogger(lib)
-        logger.setLevel(logging.CRITICAL)
-        logger.propagate = False
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(message)s",
-        datefmt="[%X]",
-        handlers=[RichHandler(console=console, show_path=False, markup=True)]
-    )
 
 setup_logging()
 logger = logging.getLogger("nutritionai-backend")
+request_logger = logging.getLogger("http.requests")
 
 # Дії при старті/перезапуску
 @asynccontextmanager
@@ -51,9 +36,19 @@ async def lifespan(app: FastAPI):
     Великий банер винесено в окремий скрипт (banner.py).
     """
     current_time = datetime.now(POLAND_TZ).strftime("%H:%M:%S")
-    console.print(f"[bold dim green]Backend reloaded ({current_time})[/]")
+    logger.info(f"Backend reloaded ({current_time})")
 
+    await init_async_supabase()
+    await init_pg_pool()
+    await off_client.start()
+    await stories_service_instance.start()
+    await job_queue.start()
     yield
+    await job_queue.stop()
+    await stories_service_instance.stop()
+    await off_client.close()
+    await close_pg_pool()
+    await close_async_supabase()
 
 # ІНІЦІАЛІЗАЦІЯ APP
 app = FastAPI(
@@ -66,7 +61,7 @@ app = FastAPI(
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     error_msg = str(exc)
-    logger.error(f"[bold red]UNHANDLED ERROR:[/bold red] {error_msg}")
+    logger.error(f"Unhandled error: {error_msg}", exc_info=exc, extra={"path": request.url.path})
     return JSONResponse(status_code=500, content={"status": "error", "message": error_msg})
 
 # CORS
@@ -78,23 +73,48 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-# Логування запитів
+# Логування запитів (через чергу logging_setup; частоту можна знизити через LOG_SAMPLING)
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
+    started = time.perf_counter()
     response = await call_next(request)
-    color = "green" if response.status_code < 400 else "red"
-
-    console.print(f"""
-[bold green]{request.method}[/] -> [white]{request.url.path}[/]
-┗━ [status: [{color}]{response.status_code}[/]] for [bold]{request.url.path}[/]
-    """)
-    
+    request_logger.log(
+        logging.WARNING if response.status_code >= 500 else logging.INFO,
+        f"{request.method} {request.url.path} -> {response.status_code}",
+        extra={
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+    )
     return response
 
+# Метрики запитів (GET /metrics): латентність, запити в обробці та помилки по маршруту
+@app.middleware("http")
+async def collect_metrics(request: Request, call_next):
+    method = request.method
+    http_in_flight.inc(method)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_in_flight.dec(method)
+        route = route_label(request.scope)
+        http_latency.observe(method, route, value=time.perf_counter() - started)
+        http_requests.inc(method, route, str(status))
+        if status >= 500:
+            http_errors.inc(method, route)
+
 # ПІДКЛЮЧЕННЯ РОУТЕРІВ
 app.include_router(auth.router)
 app.include_router(profile.router)
 app.include_router(tracking.router)
 app.include_router(ai.router)
 app.include_router(admin.router)
-app.include_router(weight.router)
\ No newline at end of file
+app.include_router(weight.router)
+app.include_router(sync.router)
+app.include_router(metrics_router.router)
\ No newline at end of file
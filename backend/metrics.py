@@ -0,0 +1,262 @@
+import functools
+import re
+import threading
+import time
+from typing import Callable, Iterable
+import httpx
+
+
+# Межі гістограм (секунди): від швидких кеш-відповідей до довгих викликів OpenAI
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [лічильники по кошиках (не кумулятивні), сума, кількість]
+        self._values = {}
+
+    def observe(self, *labels, value: float):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Метрики процесу в текстовому форматі Prometheus (GET /metrics).
+    Колектори — функції, що на кожен scrape повертають поточні значення (кеші, лімітер, черги).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: tuple = ()) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[tuple]]):
+        """collector() -> [(name, kind, help, [(labels: dict, value), ...]), ...]"""
+        self._collectors.append(collector)
+
+    def render(self, extra: Iterable[tuple] = ()) -> str:
+        """extra — сімейства у форматі колектора, зібрані викликачем (напр. асинхронно)."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                continue
+            self._render_families(lines, families)
+        self._render_families(lines, extra)
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_families(lines: list, families: Iterable[tuple]):
+        for name, kind, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                names, values = tuple(labels), tuple(labels.values())
+                lines.append(f"{name}{_format_labels(names, values)} {_format_value(value)}")
+
+
+registry = MetricsRegistry()
+
+# --- HTTP (вхідні запити) ---
+http_requests = registry.counter(
+    "http_requests_total", "Оброблені запити", ("method", "route", "status"))
+http_errors = registry.counter(
+    "http_request_errors_total", "Запити з 5xx або необробленим винятком", ("method", "route"))
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "Час до відповіді (для SSE — до першого байта)", ("method", "route"))
+# Маршрут визначається лише під час роутингу, тому in-flight — за методом
+http_in_flight = registry.gauge(
+    "http_requests_in_flight", "Запити, що виконуються зараз", ("method",))
+
+# --- Зовнішні сервіси ---
+upstream_requests = registry.counter(
+    "upstream_requests_total", "Виклики зовнішніх сервісів", ("service", "target", "status"))
+upstream_latency = registry.histogram(
+    "upstream_request_duration_seconds", "Тривалість викликів зовнішніх сервісів", ("service", "target"))
+
+
+# --- Класифікація upstream-запитів: service + target з обмеженою кардинальністю ---
+
+_MODEL_RE = re.compile(rb'"model"\s*:\s*"([^"]{1,64})"')
+# /storage/v1/object/{public|sign|authenticated|info|list}/bucket/... або /storage/v1/object/bucket/...
+_STORAGE_PREFIXES = ("public", "sign", "authenticated", "info", "list", "upload")
+
+def classify_supabase(request: httpx.Request) -> tuple:
+    parts = [p for p in request.url.path.split("/") if p]
+    if len(parts) >= 3 and parts[0] == "rest":
+        if parts[2] == "rpc" and len(parts) >= 4:
+            return "postgrest", f"rpc:{parts[3]}"
+        return "postgrest", parts[2]
+    if len(parts) >= 3 and parts[0] == "storage":
+        rest = parts[2:]
+        if rest and rest[0] == "object":
+            rest = rest[1:]
+            if rest and rest[0] in _STORAGE_PREFIXES:
+                rest = rest[1:]
+        return "storage", rest[0] if rest else "-"
+    if len(parts) >= 3 and parts[0] == "auth":
+        return "auth", parts[2]
+    return "supabase", parts[0] if parts else "-"
+
+def classify_openai(request: httpx.Request) -> tuple:
+    match = _MODEL_RE.search(request.content[:4096]) if request.method == "POST" else None
+    if match is None and request.method == "POST":
+        # Фото в base64 може йти перед "model" — тоді шукаємо по всьому тілу
+        match = _MODEL_RE.search(request.content)
+    return "openai", match.group(1).decode() if match else request.url.path.rsplit("/", 1)[-1]
+
+def classify_by_path(service: str) -> Callable[[httpx.Request], tuple]:
+    return lambda request: (service, request.url.path or "/")
+
+
+class _MetricsTransportMixin:
+    """
+    Обгортка транспорту: кількість і тривалість кожного виклику (разом з помилками з'єднання)
+    за service/target. Час — до отримання заголовків відповіді.
+    """
+
+    def __init__(self, transport, classify: Callable[[httpx.Request], tuple]):
+        self._transport = transport
+        self._classify = classify
+
+    async def handle_async_request(self, request):
+        service, target = self._classify(request)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            upstream_latency.observe(service, target, value=time.perf_counter() - started)
+            upstream_requests.inc(service, target, status)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+@functools.lru_cache(maxsize=None)
+def metrics_transport_class(http) -> type:
+    """
+    Клас транспорту для HTTP-бібліотеки клієнта: httpx або її форк з тим самим API (httpx2 у openai>=3).
+    Транспорт має наслідувати AsyncBaseTransport саме тієї бібліотеки, що й клієнт.
+    """
+    return type("MetricsTransport", (_MetricsTransportMixin, http.AsyncBaseTransport), {})
+
+
+MetricsTransport = metrics_transport_class(httpx)
+
+
+def instrumented_transport(classify: Callable[[httpx.Request], tuple], limits=None, http=httpx):
+    """
+    Транспорт для спільних клієнтів; limits задаються тут, бо з transport= клієнт їх ігнорує.
+    http — модуль бібліотеки, на якій працює клієнт (типово httpx).
+    """
+    inner = http.AsyncHTTPTransport(limits=limits) if limits else http.AsyncHTTPTransport()
+    return metrics_transport_class(http)(inner, classify)
+
+
+def route_label(scope) -> str:
+    """Шаблон маршруту ("/weight/history/{user_id}") замість фактичного шляху; відомий після роутингу."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
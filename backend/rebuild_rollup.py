@@ -0,0 +1,19 @@
+import argparse
+from database import supabase
+
+def rebuild_rollup(user_id: str = None, since: str = None):
+    """Перераховує daily_nutrition_rollup з meal_history / water_logs."""
+    print(f"Rebuilding daily_nutrition_rollup (user: {user_id or 'all'}, since: {since or 'beginning'})...")
+    try:
+        res = supabase.rpc("rebuild_daily_nutrition_rollup", {"p_user_id": user_id, "p_from": since}).execute()
+        print(f"Done. Rollup rows written: {res.data}")
+    except Exception as e:
+        print(f"Error: {e}")
+        print("Make sure 'daily_nutrition_rollup.sql' was applied in your Supabase SQL Editor.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill / rebuild of the per-day nutrition rollup")
+    parser.add_argument("--user-id", help="перерахувати лише одного користувача")
+    parser.add_argument("--since", help="перерахувати дні починаючи з дати (YYYY-MM-DD)")
+    args = parser.parse_args()
+    rebuild_rollup(args.user_id, args.since)
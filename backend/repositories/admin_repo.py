@@ -0,0 +1,69 @@
+from typing import Optional
+from supabase import AsyncClient
+
+class AdminRepository:
+    """Запити адмін-панелі (див. admin_dashboard.sql); RPC — основний шлях, решта — fallback."""
+
+    def __init__(self, client: AsyncClient):
+        self.supabase = client
+
+    # --- RPC ---
+
+    async def get_dashboard_stats(self, days: int):
+        return await self.supabase.rpc("admin_dashboard_stats", {"p_days": days}).execute()
+
+    async def get_recent_meals(self, limit: int, offset: int):
+        return await self.supabase.rpc("admin_recent_meals", {"p_limit": limit, "p_offset": offset}).execute()
+
+    async def list_users(self, limit: int, offset: int, search: Optional[str]):
+        return await self.supabase.rpc("admin_list_users", {
+            "p_limit": limit,
+            "p_offset": offset,
+            "p_search": search
+        }).execute()
+
+    # --- fallback: прості запити з пагінацією ---
+
+    async def count_users(self):
+        return await self.supabase.table("user_profiles").select("id", count="exact").limit(1).execute()
+
+    async def get_rollup_since(self, day_from: str, limit: int, offset: int):
+        return await self.supabase.table("daily_nutrition_rollup")\
+            .select("user_id, local_day, calories, meal_count")\
+            .gte("local_day", day_from)\
+            .order("local_day")\
+            .order("user_id")\
+            .range(offset, offset + limit - 1)\
+            .execute()
+
+    async def get_meals_since(self, date_from: str, limit: int, offset: int):
+        return await self.supabase.table("meal_history")\
+            .select("user_id, calories, created_at")\
+            .gte("created_at", date_from)\
+            .order("created_at")\
+            .order("id")\
+            .range(offset, offset + limit - 1)\
+            .execute()
+
+    async def get_meals_page(self, limit: int, offset: int):
+        return await self.supabase.table("meal_history")\
+            .select("*")\
+            .order("created_at", desc=True)\
+            .range(offset, offset + limit - 1)\
+            .execute()
+
+    async def get_profiles_page(self, limit: int, offset: int, search: Optional[str]):
+        query = self.supabase.table("user_profiles").select("*", count="exact")
+        if search:
+            query = query.ilike("email", f"%{search}%")
+        return await query\
+            .order("created_at", desc=True)\
+            .order("id")\
+            .range(offset, offset + limit - 1)\
+            .execute()
+
+    async def get_emails(self, user_ids: list):
+        return await self.supabase.table("user_profiles").select("id, email").in_("id", user_ids).execute()
+
+    async def get_nutrition(self, user_ids: list):
+        return await self.supabase.table("user_nutrition").select("*").in_("user_id", user_ids).execute()
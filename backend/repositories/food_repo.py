@@ -0,0 +1,15 @@
+from supabase import AsyncClient
+
+class FoodRepository:
+    def __init__(self, client: AsyncClient):
+        self.supabase = client
+
+    async def search_products(self, query: str, limit: int):
+        """Ранжований триграмний пошук (див. food_search.sql)."""
+        return await self.supabase.rpc("search_food_products", {"p_query": query, "p_limit": limit}).execute()
+
+    async def search_products_ilike(self, query: str, limit: int):
+        return await self.supabase.table("food_products").select("*").ilike("name", f"%{query}%").limit(limit).execute()
+
+    async def add_product(self, product_data: dict):
+        return await self.supabase.table("food_products").insert(product_data).execute()
@@ -1,58 +1,129 @@
-from supabase import Client
-from rich.console import Console
+import logging
+from typing import Optional
+from supabase import AsyncClient
+from repositories.pg_reader import PostgresReader
 
-console = Console()
+logger = logging.getLogger(__name__)
+
+# Гарячі читання для PostgresReader: ті самі вибірки, що й через PostgREST, одним jsonb
+MEALS_FROM_DATE_SQL = """
+SELECT COALESCE(jsonb_agg(to_jsonb(m)), '[]'::jsonb)
+FROM public.meal_history m
+WHERE m.user_id = $1::text::uuid AND m.created_at >= $2::text::timestamptz
+"""
+
+MEALS_FOR_TIPS_SQL = """
+SELECT COALESCE(jsonb_agg(jsonb_build_object(
+  'meal_name', m.meal_name, 'calories', m.calories, 'protein', m.protein,
+  'fat', m.fat, 'carbs', m.carbs, 'created_at', m.created_at
+)), '[]'::jsonb)
+FROM public.meal_history m
+WHERE m.user_id = $1::text::uuid AND m.created_at >= $2::text::timestamptz
+"""
+
+DAILY_SUMMARY_SQL = "SELECT public.get_daily_status($1::text::uuid, $2::text::timestamptz)"
+
+DAILY_ROLLUP_SQL = """
+SELECT COALESCE(jsonb_agg(jsonb_build_object(
+  'local_day', r.local_day, 'calories', r.calories, 'protein', r.protein, 'fat', r.fat,
+  'carbs', r.carbs, 'water', r.water, 'meal_count', r.meal_count
+) ORDER BY r.local_day), '[]'::jsonb)
+FROM public.daily_nutrition_rollup r
+WHERE r.user_id = $1::text::uuid AND r.local_day >= $2::text::date
+"""
+
+WATER_LOGS_SQL = """
+SELECT COALESCE(jsonb_agg(jsonb_build_object('amount', w.amount, 'created_at', w.created_at)), '[]'::jsonb)
+FROM public.water_logs w
+WHERE w.user_id = $1::text::uuid AND w.created_at >= $2::text::timestamptz
+"""
 
 class MealRepository:
-    def __init__(self, client: Client):
+    def __init__(self, client: AsyncClient, pg: Optional[PostgresReader] = None):
         self.supabase = client
+        # Пул asyncpg (DATABASE_BACKEND=asyncpg) для гарячих читань; None — усе через PostgREST
+        self.pg = pg
+
+    async def _read(self, name: str, sql: str, query, *args):
+        if self.pg:
+            return await self.pg.read(name, sql, *args, fallback=query.execute)
+        return await query.execute()
+
+    async def get_meals_from_date(self, user_id: str, date_from: str):
+        query = self.supabase.table("meal_history").select("*").eq("user_id", user_id).gte("created_at", date_from)
+        return await self._read("meals_from_date", MEALS_FROM_DATE_SQL, query, user_id, date_from)
+
+    async def get_meals_for_tips(self, user_id: str, date_from: str):
+        """Лише поля для підсумку порад (без id, image_url, food_items)."""
+        query = self.supabase.table("meal_history")\
+            .select("meal_name, calories, protein, fat, carbs, created_at")\
+            .eq("user_id", user_id)\
+            .gte("created_at", date_from)
+        return await self._read("meals_for_tips", MEALS_FOR_TIPS_SQL, query, user_id, date_from)
+
+    async def add_meal(self, meal_data: dict):
+        logger.info(f"ADD MEAL -> User: {meal_data.get('user_id')} | {meal_data.get('meal_name')}")
+        return await self.supabase.table("meal_history").insert(meal_data).execute()
+
+    async def add_meals(self, meals: list):
+        """Кілька страв одним multi-row INSERT (рядки повертаються в тому ж порядку)."""
+        logger.info(f"ADD MEALS -> {len(meals)} items")
+        return await self.supabase.table("meal_history").insert(meals).execute()
 
-    def get_meals_from_date(self, user_id: str, date_from: str):
-        return self.supabase.table("meal_history").select("*").eq("user_id", user_id).gte("created_at", date_from).execute()
+    async def get_daily_summary(self, user_id: str, date_from: str):
+        """Профіль + суми БЖВ + вода за день одним RPC викликом (див. daily_status_rpc.sql)."""
+        query = self.supabase.rpc("get_daily_status", {"p_user_id": user_id, "p_date_from": date_from})
+        return await self._read("daily_status", DAILY_SUMMARY_SQL, query, user_id, date_from)
 
-    def add_meal(self, meal_data: dict):
-        console.print(f"[bold green]ADD MEAL[/] -> User: {meal_data.get('user_id')} | {meal_data.get('meal_name')}")
-        return self.supabase.table("meal_history").insert(meal_data).execute()
+    async def get_daily_rollup(self, user_id: str, day_from: str):
+        """Готові денні суми з daily_nutrition_rollup (один рядок на день)."""
+        query = self.supabase.table("daily_nutrition_rollup")\
+            .select("local_day, calories, protein, fat, carbs, water, meal_count")\
+            .eq("user_id", user_id)\
+            .gte("local_day", day_from)\
+            .order("local_day")
+        return await self._read("daily_rollup", DAILY_ROLLUP_SQL, query, user_id, day_from)
 
-    def get_water_logs(self, user_id: str, date_from: str):
-        return self.supabase.table("water_logs").select("amount, created_at").eq("user_id", user_id).gte("created_at", date_from).execute()
+    async def get_water_logs(self, user_id: str, date_from: str):
+        query = self.supabase.table("water_logs").select("amount, created_at").eq("user_id", user_id).gte("created_at", date_from)
+        return await self._read("water_logs", WATER_LOGS_SQL, query, user_id, date_from)
 
-    def add_water(self, water_data: dict):
-        console.print(f"[bold cyan]ADD WATER[/] -> User: {water_data.get('user_id')} | Amount: {water_data.get('amount')}ml")
-        return self.supabase.table("water_logs").insert(water_data).execute()
+    async def add_water(self, water_data: dict):
+        logger.info(f"ADD WATER -> User: {water_data.get('user_id')} | Amount: {water_data.get('amount')}ml")
+        return await self.supabase.table("water_logs").insert(water_data).execute()
 
-    def save_recipe(self, recipe_data: dict):
-        console.print(f"[bold yellow]SAVE RECIPE[/] -> User: {recipe_data.get('user_id')} | Title: {recipe_data.get('title')}")
-        return self.supabase.table("saved_recipes").insert(recipe_data).execute()
+    async def save_recipe(self, recipe_data: dict):
+        logger.info(f"SAVE RECIPE -> User: {recipe_data.get('user_id')} | Title: {recipe_data.get('title')}")
+        return await self.supabase.table("saved_recipes").insert(recipe_data).execute()
 
-    def get_saved_recipes(self, user_id: str):
-        return self.supabase.table("saved_recipes").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
+    async def get_saved_recipes(self, user_id: str):
+        return await self.supabase.table("saved_recipes").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
 
-    def delete_recipe(self, recipe_id: str):
-        console.print(f"[bold red]DELETE RECIPE[/] -> ID: {recipe_id}")
-        return self.supabase.table("saved_recipes").delete().eq("id", recipe_id).execute()
+    async def delete_recipe(self, recipe_id: str):
+        logger.info(f"DELETE RECIPE -> ID: {recipe_id}")
+        return await self.supabase.table("saved_recipes").delete().eq("id", recipe_id).execute()
 
-    def get_stories(self):
-        return self.supabase.table('app_stories').select('*').eq('is_active', True).execute()
+    async def get_stories(self):
+        return await self.supabase.table('app_stories').select('*').eq('is_active', True).order('sort_order', desc=False).execute()
 
-    def add_vitamin(self, data: dict):
+    async def add_vitamin(self, data: dict):
         try:
-            console.print(f"[bold magenta]ADD VITAMIN[/] -> User: {data.get('user_id')}")
-            return self.supabase.table("user_vitamins").insert(data).execute()
+            logger.info(f"ADD VITAMIN -> User: {data.get('user_id')}")
+            return await self.supabase.table("user_vitamins").insert(data).execute()
         except Exception as e:
-            console.print(f"   ┗━ [red]Error inserting vitamin: {e}[/]")
+            logger.error(f"Error inserting vitamin: {e}")
             raise e
 
-    def get_user_vitamins(self, user_id: str):
+    async def get_user_vitamins(self, user_id: str):
         try:
-            return self.supabase.table("user_vitamins").select("*").eq("user_id", user_id).execute()
+            return await self.supabase.table("user_vitamins").select("*").eq("user_id", user_id).execute()
         except Exception as e:
-            print(f"Error fetching vitamins: {e}")
+            logger.error(f"Error fetching vitamins: {e}")
             raise e
 
-    def delete_vitamin(self, vitamin_id: str):
+    async def delete_vitamin(self, vitamin_id: str):
         try:
-            return self.supabase.table("user_vitamins").delete().eq("id", vitamin_id).execute()
+            return await self.supabase.table("user_vitamins").delete().eq("id", vitamin_id).execute()
         except Exception as e:
-            print(f"Error deleting vitamin: {e}")
+            logger.error(f"Error deleting vitamin: {e}")
             raise e
\ No newline at end of file
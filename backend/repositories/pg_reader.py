@@ -0,0 +1,36 @@
+import logging
+import time
+from config import settings
+from metrics import upstream_requests, upstream_latency
+
+logger = logging.getLogger(__name__)
+
+class ResponseWrapper:
+    def __init__(self, data):
+        self.data = data
+
+class PostgresReader:
+    """
+    Гарячі читання напряму з Postgres через пул asyncpg (DATABASE_BACKEND=asyncpg).
+    Кожен запит повертає один json/jsonb, тож .data має ту саму форму, що й відповідь PostgREST.
+    asyncpg готує (PREPARE) запит один раз на з'єднання і далі бере його з кешу statement-ів.
+    Будь-яка помилка — запит іде через PostgREST (fallback).
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def read(self, name: str, sql: str, *args, fallback):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            data = await self.pool.fetchval(sql, *args, timeout=settings.DATABASE_TIMEOUT)
+            status = "ok"
+        except Exception as e:
+            logger.warning(f"Postgres read {name} failed, fallback to PostgREST: {e}")
+        finally:
+            upstream_latency.observe("postgres", name, value=time.perf_counter() - started)
+            upstream_requests.inc("postgres", name, status)
+        if status == "ok":
+            return ResponseWrapper(data)
+        return await fallback()
@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+from typing import Optional
+from supabase import AsyncClient
+
+class SyncRepository:
+    """Запити для POST /sync (див. sync_protocol.sql)."""
+
+    def __init__(self, client: AsyncClient):
+        self.supabase = client
+
+    @staticmethod
+    def _after_cursor(query, cursor: Optional[tuple]):
+        # Keyset: (updated_at, id) > (cursor_ts, cursor_id); курсор без id — "все з cursor_ts"
+        if cursor:
+            ts, row_id = cursor
+            if row_id is None:
+                return query.gte("updated_at", ts)
+            query = query.or_(f'updated_at.gt."{ts}",and(updated_at.eq."{ts}",id.gt."{row_id}")')
+        return query
+
+    async def get_changes(self, table: str, user_id: str, cursor: Optional[tuple], until: str, limit: int):
+        query = self.supabase.table(table).select("*").eq("user_id", user_id).lt("updated_at", until)
+        return await self._after_cursor(query, cursor)\
+            .order("updated_at")\
+            .order("id")\
+            .limit(limit)\
+            .execute()
+
+    async def get_tombstones(self, user_id: str, cursor: Optional[tuple], until: str, limit: int):
+        query = self.supabase.table("sync_tombstones")\
+            .select("id, table_name, row_id, updated_at")\
+            .eq("user_id", user_id)\
+            .lt("updated_at", until)
+        return await self._after_cursor(query, cursor)\
+            .order("updated_at")\
+            .order("id")\
+            .limit(limit)\
+            .execute()
+
+    # --- push ---
+
+    async def insert_row(self, table: str, data: dict):
+        return await self.supabase.table(table).insert(data).execute()
+
+    async def update_row(self, table: str, user_id: str, row_id: str, data: dict):
+        return await self.supabase.table(table).update(data).eq("id", row_id).eq("user_id", user_id).execute()
+
+    async def delete_row(self, table: str, user_id: str, row_id: str):
+        return await self.supabase.table(table).delete().eq("id", row_id).eq("user_id", user_id).execute()
+
+    # --- ідемпотентність ---
+
+    async def claim_idempotency_key(self, user_id: str, key: str) -> bool:
+        """True — ключ новий і тепер зайнятий цим запитом; False — вже був."""
+        res = await self.supabase.table("sync_idempotency")\
+            .upsert({"user_id": user_id, "key": key, "status": "pending"}, on_conflict="user_id,key", ignore_duplicates=True)\
+            .execute()
+        return bool(res.data)
+
+    async def take_over_idempotency_key(self, user_id: str, key: str, stale_before: str) -> bool:
+        """
+        Перезахоплює "pending" ключ, взятий раніше за stale_before (lease минув).
+        Умова в WHERE робить це атомарним: з кількох повторів ключ отримує лише один.
+        """
+        res = await self.supabase.table("sync_idempotency")\
+            .update({"created_at": datetime.now(timezone.utc).isoformat()})\
+            .eq("user_id", user_id)\
+            .eq("key", key)\
+            .eq("status", "pending")\
+            .lt("created_at", stale_before)\
+            .execute()
+        return bool(res.data)
+
+    async def get_idempotency_result(self, user_id: str, key: str):
+        return await self.supabase.table("sync_idempotency")\
+            .select("status, response")\
+            .eq("user_id", user_id)\
+            .eq("key", key)\
+            .limit(1)\
+            .execute()
+
+    async def save_idempotency_result(self, user_id: str, key: str, response: dict):
+        return await self.supabase.table("sync_idempotency")\
+            .update({"status": "done", "response": response})\
+            .eq("user_id", user_id)\
+            .eq("key", key)\
+            .execute()
+
+    async def release_idempotency_key(self, user_id: str, key: str):
+        return await self.supabase.table("sync_idempotency").delete().eq("user_id", user_id).eq("key", key).execute()
@@ -1,42 +1,71 @@
-from supabase import Client
-from rich.console import Console
+import logging
+import asyncio
+from typing import Optional
+from supabase import AsyncClient
+from cache import TTLCache
+from config import settings
+from repositories.pg_reader import PostgresReader, ResponseWrapper
 
-console = Console()
+logger = logging.getLogger(__name__)
 
-class ResponseWrapper:
-    def __init__(self, data):
-        self.data = data
+# Кеш merged-профілів (user_profiles + user_nutrition), спільний для всіх запитів процесу
+profile_cache = TTLCache(maxsize=settings.PROFILE_CACHE_SIZE, ttl=settings.PROFILE_CACHE_TTL, name="profiles")
+
+# Профіль одним запитом для PostgresReader (те саме злиття, що й у _load_profile)
+PROFILE_SQL = """
+SELECT to_jsonb(p) || COALESCE(to_jsonb(n) - 'id', '{}'::jsonb)
+FROM public.user_profiles p
+LEFT JOIN public.user_nutrition n ON n.user_id = p.id
+WHERE p.id = $1::text::uuid
+"""
 
 class UserRepository:
-    def __init__(self, client: Client):
+    def __init__(self, client: AsyncClient, pg: Optional[PostgresReader] = None):
         self.db = client
+        self.pg = pg
         self.profile_fields = ['id', 'name', 'email', 'avatar_url', 'created_at']
 
-    def get_profile(self, user_id: str):
+    async def _load_profile(self, user_id: str):
+        """user_profiles + user_nutrition через PostgREST."""
+        # Identity + nutrition data паралельно (два запити, один round trip по часу)
+        p_res, n_res = await asyncio.gather(
+            self.db.table("user_profiles").select("*").eq("id", user_id).single().execute(),
+            self.db.table("user_nutrition").select("*").eq("user_id", user_id).single().execute()
+        )
+        if not p_res.data:
+            return ResponseWrapper(None)
+
+        n_data = n_res.data if n_res and n_res.data else {}
+
+        # Merge (nutrition data overrides profile keys if collision, though keys should be distinct)
+        merged = {**p_res.data, **n_data}
+
+        if 'user_id' in n_data:
+            merged['id'] = n_data['user_id']
+        return ResponseWrapper(merged)
+
+    async def get_profile(self, user_id: str):
+        cached = profile_cache.get(user_id)
+        if cached is not None:
+            return ResponseWrapper(dict(cached))
+
         try:
-            # Fetch identity data
-            p_res = self.db.table("user_profiles").select("*").eq("id", user_id).single().execute()
-            if not p_res.data:
-                console.print(f"[bold red]PROFILE[/] -> User not found: {user_id}")
-                return p_res # Return empty/error as is
-                
-            # Fetch nutrition data
-            n_res = self.db.table("user_nutrition").select("*").eq("user_id", user_id).single().execute()
-            n_data = n_res.data if n_res and n_res.data else {}
-            
-            # Merge (nutrition data overrides profile keys if collision, though keys should be distinct)
-            merged = {**p_res.data, **n_data}
-            
-            if 'user_id' in n_data:
-                merged['id'] = n_data['user_id']
-            
-            return ResponseWrapper(merged)
+            if self.pg:
+                res = await self.pg.read("profile", PROFILE_SQL, user_id, fallback=lambda: self._load_profile(user_id))
+            else:
+                res = await self._load_profile(user_id)
+            if not res.data:
+                logger.warning(f"PROFILE -> User not found: {user_id}")
+                return res
+
+            profile_cache.set(user_id, res.data)
+            return ResponseWrapper(dict(res.data))
         except Exception as e:
-            console.print(f"   ┗━ [red]Repo Get Error: {e}[/]")
+            logger.error(f"Repo Get Error: {e}")
             return ResponseWrapper(None)
 
-    def create_profile(self, profile_data: dict):
-        console.print(f"[bold green]CREATE PROFILE[/] -> User: {profile_data.get('id')}")
+    async def create_profile(self, profile_data: dict):
+        logger.info(f"CREATE PROFILE -> User: {profile_data.get('id')}")
         # Split data
         p_data = {k: v for k, v in profile_data.items() if k in self.profile_fields}
         # Nutrition data is everything else
@@ -48,7 +77,7 @@ class UserRepository:
             n_data['user_id'] = profile_data['id']
             
         try:
-            res1 = self.db.table("user_profiles").insert(p_data).execute()
+            res1 = await self.db.table("user_profiles").insert(p_data).execute()
             # If creating profile, nutrition might be empty or full. 
             # Even if empty, create a row? Yes, to avoid loose ends.
             if not n_data:
@@ -58,15 +87,16 @@ class UserRepository:
             # but profile_data['id'] is surely in profile_fields)
             if 'id' in n_data: del n_data['id'] 
                 
-            self.db.table("user_nutrition").insert(n_data).execute()
+            await self.db.table("user_nutrition").insert(n_data).execute()
+            self.invalidate_profile(profile_data.get('id'))
             return res1
         except Exception as e:
-            console.print(f"   ┗━ [red]Repo Create Error: {e}[/]")
+            logger.error(f"Repo Create Error: {e}")
             raise e
 
-    def update_profile(self, user_id: str, data: dict):
+    async def update_profile(self, user_id: str, data: dict):
         """Оновлює профіль і повертає результат"""
-        console.print(f"[bold yellow]UPDATE PROFILE[/] -> User: {user_id}")
+        logger.info(f"UPDATE PROFILE -> User: {user_id}")
         
         p_update = {k: v for k, v in data.items() if k in self.profile_fields}
         n_update = {k: v for k, v in data.items() if k not in self.profile_fields}
@@ -74,25 +104,40 @@ class UserRepository:
         res = None
         try:
             if p_update:
-                res = self.db.table("user_profiles").update(p_update).eq("id", user_id).execute()
+                res = await self.db.table("user_profiles").update(p_update).eq("id", user_id).execute()
             
             if n_update:
                 # Update nutrition table
                 # Check if record exists first? Or upsert?
                 # Update is safer if we assume creation happened at registration.
-                self.db.table("user_nutrition").update(n_update).eq("user_id", user_id).execute()
+                await self.db.table("user_nutrition").update(n_update).eq("user_id", user_id).execute()
                 
+            self.invalidate_profile(user_id)
             # If we only updated nutrition, res might be None (if p_update was empty).
             # Return something meaningful.
             return res if res else ResponseWrapper(data) 
         except Exception as e:
-             console.print(f"   ┗━ [red]Repo Update Error: {e}[/]")
+             logger.error(f"Repo Update Error: {e}")
              raise e
         
-    def upsert_profile(self, data: dict):
+    async def delete_profile(self, user_id: str):
+        logger.info(f"DELETE PROFILE -> User: {user_id}")
+        try:
+            await self.db.table("user_nutrition").delete().eq("user_id", user_id).execute()
+            return await self.db.table("user_profiles").delete().eq("id", user_id).execute()
+        finally:
+            self.invalidate_profile(user_id)
+
+    @staticmethod
+    def invalidate_profile(user_id: str):
+        """Скидає кеш профілю після будь-якого запису в user_profiles / user_nutrition."""
+        if user_id:
+            profile_cache.invalidate(user_id)
+
+    async def upsert_profile(self, data: dict):
          # Not used much, but let's implement similar logic or warn
          # For simplicity, treat as create
-         return self.create_profile(data)
+         return await self.create_profile(data)
     
-    def update_user_profile(self, user_id: str, data: dict):
-        return self.update_profile(user_id, data)
\ No newline at end of file
+    async def update_user_profile(self, user_id: str, data: dict):
+        return await self.update_profile(user_id, data)
\ No newline at end of file
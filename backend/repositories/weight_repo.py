@@ -0,0 +1,78 @@
+from typing import Optional
+from supabase import AsyncClient
+
+class WeightRepository:
+    # Лише поля, які віддає /weight/history (WeightEntrySchema)
+    history_columns = "id, weight, difference, created_at"
+
+    def __init__(self, client: AsyncClient):
+        self.supabase = client
+
+    async def get_history_page(self, user_id: str, before: Optional[tuple], limit: int):
+        """Сторінка від новіших до старіших; before — (created_at, id) останнього рядка попередньої сторінки."""
+        query = self.supabase.table("weight_history")\
+            .select(self.history_columns)\
+            .eq("user_id", user_id)
+        if before:
+            ts, row_id = before
+            query = query.or_(f'created_at.lt."{ts}",and(created_at.eq."{ts}",id.lt."{row_id}")')
+        return await query\
+            .order("created_at", desc=True)\
+            .order("id", desc=True)\
+            .limit(limit)\
+            .execute()
+
+    async def get_first_entry(self, user_id: str):
+        """Найперший запис (start_weight) — один рядок з індексу, без читання всієї історії."""
+        return await self.supabase.table("weight_history")\
+            .select("weight")\
+            .eq("user_id", user_id)\
+            .order("created_at")\
+            .order("id")\
+            .limit(1)\
+            .execute()
+
+    async def get_buckets(self, user_id: str, bucket: str, date_from: Optional[str], date_to: Optional[str]):
+        return await self.supabase.rpc("get_weight_buckets", {
+            "p_user_id": user_id,
+            "p_bucket": bucket,
+            "p_from": date_from,
+            "p_to": date_to
+        }).execute()
+
+    async def get_weights_in_range(self, user_id: str, date_from: Optional[str], date_to: Optional[str]):
+        query = self.supabase.table("weight_history").select("weight, created_at").eq("user_id", user_id)
+        if date_from:
+            query = query.gte("created_at", date_from)
+        if date_to:
+            query = query.lt("created_at", date_to)
+        return await query.order("created_at").execute()
+
+    # --- запис ---
+
+    async def record_weight(self, user_id: str, weight: float, created_at: Optional[str]):
+        """Один транзакційний виклик: difference, insert, сусідній запис та user_nutrition.weight."""
+        return await self.supabase.rpc("record_weight", {
+            "p_user_id": user_id,
+            "p_weight": weight,
+            "p_created_at": created_at
+        }).execute()
+
+    async def get_neighbour(self, user_id: str, created_at: str, after: bool):
+        """Найближчий запис до created_at: after=False — попередній (включно), True — наступний."""
+        query = self.supabase.table("weight_history").select("id, weight").eq("user_id", user_id)
+        query = query.gt("created_at", created_at) if after else query.lte("created_at", created_at)
+        return await query\
+            .order("created_at", desc=not after)\
+            .order("id", desc=not after)\
+            .limit(1)\
+            .execute()
+
+    async def add_entry(self, entry: dict):
+        return await self.supabase.table("weight_history").insert(entry).execute()
+
+    async def set_difference(self, row_id: str, difference: float):
+        return await self.supabase.table("weight_history").update({"difference": difference}).eq("id", row_id).execute()
+
+    async def set_current_weight(self, user_id: str, weight: float):
+        return await self.supabase.table("user_nutrition").update({"weight": weight}).eq("user_id", user_id).execute()
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Request, Form, UploadFile, File, Body
+from fastapi import APIRouter, Request, Form, UploadFile, File, Body, Depends, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from config import settings
 from database import supabase
-from utils import get_now_poland, safe_parse_datetime, clean_to_int
-from datetime import timedelta
+from dependencies import get_admin_service
+from services.auth_service import require_admin
+from repositories.user_repo import profile_cache
+from services.admin_service import AdminService, admin_cache
+from services.stories_service import stories_service_instance
+from services.ai_cache import ai_result_cache
+from services.jwt_verifier import jwt_verifier
+from services.off_client import off_client
+from utils import safe_parse_datetime
+from typing import Optional
 import uuid
 
 router = APIRouter(tags=["Admin"])
@@ -13,10 +21,15 @@ templates = Jinja2Templates(directory="templates")
 @router.get("/", response_class=HTMLResponse)
 async def admin_login_page(request: Request):
     """Сторінка входу."""
-    return templates.TemplateResponse("login.html", {"request": request})
+    return templates.TemplateResponse(request, "login.html")
 
 @router.api_route("/admin/dashboard", methods=["GET", "POST"], response_class=HTMLResponse)
-async def dashboard(request: Request, username: str = Form(None), password: str = Form(None)):
+async def dashboard(
+    request: Request,
+    username: str = Form(None),
+    password: str = Form(None),
+    service: AdminService = Depends(get_admin_service)
+):
     """Головна панель статистики."""
     is_auth = request.method == "GET" or (username == settings.ADMIN_USERNAME and password == settings.ADMIN_PASSWORD)
     
@@ -24,33 +37,14 @@ async def dashboard(request: Request, username: str = Form(None), password: str
         return HTMLResponse("<h1>⛔ Доступ заборонено</h1><a href='/'>Назад</a>", status_code=403)
 
     try:
-        # 1. Список користувачів для email-мапінгу
-        users_auth = supabase.auth.admin.list_users()
-        users_list = users_auth.users if hasattr(users_auth, 'users') else users_auth
-        user_emails = {u.id: u.email for u in users_list}
-
-        # 2. Останні страви
-        meals_res = supabase.table("meal_history").select("*").order("created_at", desc=True).limit(15).execute()
-        recent_meals = meals_res.data or []
-        for meal in recent_meals:
-            meal['user_email'] = user_emails.get(meal['user_id'], "Невідомий")
-
-        # 3. Графік активності
-        chart_data = []
-        try:
-            week_ago = (get_now_poland().date() - timedelta(days=7)).isoformat()
-            stats_res = supabase.table("meal_history").select("calories, created_at").gte("created_at", week_ago).execute()
-            daily_totals = {}
-            for entry in stats_res.data:
-                day = safe_parse_datetime(entry['created_at']).date().isoformat()
-                daily_totals[day] = daily_totals.get(day, 0) + int(entry['calories'] or 0)
-            chart_data = [{"day": k, "value": v} for k, v in sorted(daily_totals.items())]
-        except:
+        # Агрегати та сторінка страв рахуються в БД; email — лише для показаних рядків
+        stats, recent_meals = await service.get_dashboard()
+        chart_data = [{"day": d["day"], "value": d["calories"]} for d in stats.get("daily") or []]
+        if not chart_data:
             chart_data = [{"day": "Немає даних", "value": 0}]
 
-        return templates.TemplateResponse("dashboard.html", {
-            "request": request, 
-            "users": users_list, 
+        return templates.TemplateResponse(request, "dashboard.html", {
+            "stats": stats,
             "recent_meals": recent_meals,
             "chart_data": chart_data, 
             "docker_url": f"http://{request.client.host}:9000" 
@@ -59,25 +53,49 @@ async def dashboard(request: Request, username: str = Form(None), password: str
         return HTMLResponse(f"<h1>Помилка: {str(e)}</h1>", status_code=500)
 
 @router.get("/admin/users_list", response_class=HTMLResponse)
-async def admin_users_page(request: Request):
-    """Сторінка списку всіх користувачів."""
+async def admin_users_page(
+    request: Request,
+    page: int = Query(1, ge=1),
+    q: Optional[str] = None,
+    service: AdminService = Depends(get_admin_service)
+):
+    """Сторінка списку користувачів (по ADMIN_PAGE_SIZE, пошук за email на сервері)."""
     try:
-        profiles_res = supabase.table("user_profiles").select("*").execute()
-        
-        users_auth = supabase.auth.admin.list_users()
-        auth_list = users_auth.users if hasattr(users_auth, 'users') else users_auth
-        emails_map = {str(u.id).strip().lower(): u.email for u in auth_list}
-
-        users_data = []
-        for p in profiles_res.data:
-            p_id = str(p.get('id', '')).strip().lower()
-            p['email'] = emails_map.get(p_id, "Немає в Auth")
-            users_data.append(p)
-            
-        return templates.TemplateResponse("users_admin.html", {"request": request, "users": users_data})
+        page_size = settings.ADMIN_PAGE_SIZE
+        result = await service.list_users(page_size, (page - 1) * page_size, q)
+        total = result.get("total") or 0
+        return templates.TemplateResponse(request, "users_admin.html", {
+            "users": result.get("users") or [],
+            "total": total,
+            "page": page,
+            "pages": max(1, -(-total // page_size)),
+            "q": q or ""
+        })
     except Exception as e:
         return HTMLResponse(f"Помилка: {e}")
 
+@router.get("/admin/api/stats", dependencies=[Depends(require_admin)])
+async def admin_api_stats(days: int = Query(7, ge=1, le=90), service: AdminService = Depends(get_admin_service)):
+    """Підсумки для дашборда: total_users, active_users, meals_today, daily[] (JSON)."""
+    return await service.get_dashboard_stats(days)
+
+@router.get("/admin/api/recent_meals", dependencies=[Depends(require_admin)])
+async def admin_api_recent_meals(
+    limit: int = Query(15, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    service: AdminService = Depends(get_admin_service)
+):
+    return await service.get_recent_meals(limit, offset)
+
+@router.get("/admin/api/users", dependencies=[Depends(require_admin)])
+async def admin_api_users(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    q: Optional[str] = None,
+    service: AdminService = Depends(get_admin_service)
+):
+    return await service.list_users(limit, offset, q)
+
 @router.get("/admin/user_details/{user_id}")
 async def get_admin_user_details(user_id: str):
     """Детальна історія страв конкретного користувача (JSON)."""
@@ -98,7 +116,7 @@ async def admin_stories_page(request: Request):
     try:
         res = supabase.table('app_stories').select('*').eq('is_active', True).order('sort_order', desc=False).execute()
         stories = res.data if res.data else []
-        return templates.TemplateResponse("stories_admin.html", {"request": request, "stories": stories})
+        return templates.TemplateResponse(request, "stories_admin.html", {"stories": stories})
     except Exception as e:
         return HTMLResponse(f"<h1>Помилка: {str(e)}</h1>", status_code=500)
 
@@ -135,6 +153,7 @@ async def add_story(
             "title": title,
             "is_active": True
         }).execute()
+        stories_service_instance.invalidate()
 
         return RedirectResponse(url="/admin/stories", status_code=303)
 
@@ -149,6 +168,7 @@ async def delete_story(
     """Видалення сторіз."""
     try:
         supabase.table('app_stories').delete().eq('id', story_id).execute()
+        stories_service_instance.invalidate()
         return RedirectResponse(url="/admin/stories", status_code=303)
     except Exception as e:
         return HTMLResponse(f"<h1>Помилка видалення: {str(e)}</h1>", status_code=500)
@@ -179,6 +199,7 @@ async def edit_story(
             update_data["image_url"] = final_image_url
 
         supabase.table('app_stories').update(update_data).eq('id', story_id).execute()
+        stories_service_instance.invalidate()
         return RedirectResponse(url="/admin/stories", status_code=303)
 
     except Exception as e:
@@ -196,6 +217,18 @@ async def reorder_stories(
         for index, story_id in enumerate(new_order):
             supabase.table('app_stories').update({'sort_order': index}).eq('id', story_id).execute()
 
+        stories_service_instance.invalidate()
         return {"status": "ok"}
     except Exception as e:
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
+
+@router.get("/admin/cache_stats", dependencies=[Depends(require_admin)])
+async def cache_stats():
+    """Статистика процесних кешів (hit/miss)."""
+    return {
+        "profiles": profile_cache.stats(),
+        "ai_results": await ai_result_cache.stats(),
+        "jwt_claims": jwt_verifier.stats(),
+        "openfoodfacts": off_client.stats(),
+        "admin": admin_cache.stats()
+    }
\ No newline at end of file
@@ -1,15 +1,18 @@
-import io
+import logging
 import uuid
 import json
-from PIL import Image
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from services.ai_service import ai_service_instance
+from services.job_queue import job_queue, JobQueueFull, FINAL_STATUSES
 from services.nutrition_service import NutritionService
 from dependencies import get_nutrition_service
-from database import supabase
+from database import get_async_supabase
 from utils import is_invalid_user, clean_to_int, clean_to_float, get_now_poland
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["AI"])
 
 @router.post("/analyze_meal")
@@ -19,9 +22,30 @@ async def analyze_meal(file: UploadFile = File(...), user_id: str = Form(...), s
     
     contents = await file.read()
     path = f"{user_id}/{uuid.uuid4()}.jpg"
-    supabase.storage.from_("meal-images").upload(path, contents)
-    
-    res = ai_service_instance.get_calories_from_image(Image.open(io.BytesIO(contents)).convert("RGB"))
+    bucket = get_async_supabase().storage.from_("meal-images")
+
+    async def analyze():
+        image = await ai_service_instance.prepare_image(contents)
+        return await ai_service_instance.get_calories_from_image(image, raise_errors=True)
+
+    async def remove_uploaded():
+        # Компенсація: фото без запису в історії не лишаємо в Storage
+        try:
+            await bucket.remove([path])
+        except Exception as e:
+            logger.warning(f"Failed to remove orphan image {path}: {e}")
+
+    # Завантаження в Storage та AI-аналіз паралельно: час ≈ max(upload, analysis)
+    upload_res, res = await asyncio.gather(bucket.upload(path, contents), analyze(), return_exceptions=True)
+
+    if isinstance(res, BaseException):
+        if not isinstance(upload_res, BaseException):
+            await remove_uploaded()
+        if isinstance(res, HTTPException):
+            raise res
+        raise HTTPException(status_code=502, detail="Не вдалося проаналізувати фото")
+    if isinstance(upload_res, BaseException):
+        raise upload_res
     
     db_data = {
         "user_id": user_id,
@@ -30,24 +54,30 @@ async def analyze_meal(file: UploadFile = File(...), user_id: str = Form(...), s
         "fat": clean_to_float(res.get("fat")),
         "carbs": clean_to_float(res.get("carbs")),
         "food_items": res.get("food_items", []),
-        "image_url": supabase.storage.from_("meal-images").get_public_url(path),
+        "image_url": await bucket.get_public_url(path),
         "created_at": get_now_poland().isoformat()
     }
-    service.meal_repo.add_meal(db_data)
-    return db_data
+    try:
+        await service.meal_repo.add_meal(db_data)
+    except Exception:
+        await remove_uploaded()
+        raise
+    return {**db_data, "cached": res.get("cached", False)}
 
 @router.post("/analyze_image")
 async def analyze_image_only(user_id: str = Form(...), file: UploadFile = File(...)):
     """Тільки аналізує фото (для прев'ю), нічого не зберігає в БД."""
     try:
         contents = await file.read()
-        img = Image.open(io.BytesIO(contents)).convert("RGB")
+        img = await ai_service_instance.prepare_image(contents)
         
-        result = ai_service_instance.get_calories_from_image(img)
+        result = await ai_service_instance.get_calories_from_image(img)
         
-        print(f"AI Result: {json.dumps(result, indent=2, ensure_ascii=False)}")
+        logger.debug(f"AI Result: {json.dumps(result, indent=2, ensure_ascii=False)}")
         
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
@@ -58,50 +88,187 @@ class AnalyzeTextRequest(BaseModel):
     text: str
     save_to_db: bool = False
 
+async def _text_meal_data(request: AnalyzeTextRequest, res: dict, service: NutritionService) -> dict:
+    db_data = {
+        "user_id": request.user_id,
+        "calories": clean_to_int(res.get("calories")),
+        "protein": clean_to_float(res.get("protein")),
+        "fat": clean_to_float(res.get("fat")),
+        "carbs": clean_to_float(res.get("carbs")),
+        "food_items": [res.get("meal_name", "Нова страва")],
+        "image_url": None,
+        "created_at": get_now_poland().isoformat()
+    }
+    
+    if request.save_to_db:
+        await service.meal_repo.add_meal(db_data)
+    
+    # Include meal_name in return specifically for UI
+    db_data['meal_name'] = res.get("meal_name", "Нова страва")
+    db_data['cached'] = res.get("cached", False)
+    return db_data
+
 @router.post("/analyze_text")
 async def analyze_text(request: AnalyzeTextRequest, service: NutritionService = Depends(get_nutrition_service)):
     """Аналізує текст з голосу і зберігає в історію, якщо save_to_db == True."""
     if is_invalid_user(request.user_id): raise HTTPException(status_code=400, detail="Invalid User ID")
     
     try:
-        res = ai_service_instance.analyze_food_text(request.text)
-        
-        db_data = {
-            "user_id": request.user_id,
-            "calories": clean_to_int(res.get("calories")),
-            "protein": clean_to_float(res.get("protein")),
-            "fat": clean_to_float(res.get("fat")),
-            "carbs": clean_to_float(res.get("carbs")),
-            "food_items": [res.get("meal_name", "Нова страва")],
-            "image_url": None,
-            "created_at": get_now_poland().isoformat()
-        }
-        
-        if request.save_to_db:
-            service.meal_repo.add_meal(db_data)
-        
-        # Include meal_name in return specifically for UI
-        db_data['meal_name'] = res.get("meal_name", "Нова страва")
-        
-        return db_data
+        res = await ai_service_instance.analyze_food_text(request.text)
+        return await _text_meal_data(request, res, service)
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
-@router.get("/generate_recipe/{user_id}")
-async def generate_recipe(user_id: str, service: NutritionService = Depends(get_nutrition_service)):
+# --- SSE ---
+# Події: field {key, value} — поле готове; item {key, index, value} — елемент масиву (tips);
+# result — фінальний об'єкт (той самий, що у звичайного ендпоінта); error {detail}.
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def _sse_response(events, finalize=None):
+    """
+    Перша подія отримується до відповіді, щоб 503 від лімітера повернувся звичайним статусом.
+    finalize(result) — опціональна пост-обробка фінального об'єкта (напр. збереження в БД).
+    events закривається в будь-якому разі: після відключення клієнта звільняються слот лімітера
+    і з'єднання з OpenAI.
+    """
+    try:
+        first = await events.__anext__()
+    except BaseException:
+        await events.aclose()
+        raise
+
+    async def body():
+        event = first
+        try:
+            while True:
+                if event[0] == "result":
+                    result = await finalize(event[1]) if finalize else event[1]
+                    yield _sse("result", result)
+                elif event[0] == "field":
+                    yield _sse("field", {"key": event[1], "value": event[2]})
+                else:
+                    yield _sse("item", {"key": event[1], "index": event[2], "value": event[3]})
+                event = await events.__anext__()
+        except StopAsyncIteration:
+            pass
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.post("/analyze_text/stream")
+async def analyze_text_stream(request: AnalyzeTextRequest, service: NutritionService = Depends(get_nutrition_service)):
+    if is_invalid_user(request.user_id): raise HTTPException(status_code=400, detail="Invalid User ID")
+    return await _sse_response(
+        ai_service_instance.stream_food_text(request.text),
+        finalize=lambda res: _text_meal_data(request, res, service)
+    )
+
+@router.get("/get_tips/{user_id}/stream")
+async def get_tips_stream(user_id: str, service: NutritionService = Depends(get_nutrition_service)):
     user_id = user_id.strip()
     if is_invalid_user(user_id): raise HTTPException(status_code=400, detail="User not logged in")
-    
-    status = service.get_daily_status(user_id)
-    rec = ai_service_instance.generate_personalized_recipe(
-        remaining_cal=status.get("remaining", 500), 
-        preferences=[], 
+    days, profile = await service.get_data_for_tips(user_id)
+    return await _sse_response(ai_service_instance.stream_weekly_insights(
+        user_id=user_id,
+        days=days,
+        target=profile.get("daily_calories_target", 2000),
+        goal=profile.get("goal", "maintain")
+    ))
+
+@router.get("/generate_recipe/{user_id}/stream")
+async def generate_recipe_stream(user_id: str, service: NutritionService = Depends(get_nutrition_service)):
+    user_id = user_id.strip()
+    if is_invalid_user(user_id): raise HTTPException(status_code=400, detail="User not logged in")
+    status = await service.get_daily_status(user_id)
+    return await _sse_response(ai_service_instance.stream_recipe(
+        remaining_cal=status.get("remaining", 500),
+        preferences=[],
         goal=status.get("goal", "maintain")
+    ))
+
+async def _recipe_job(params: dict, update):
+    """Фонова генерація: спершу текст (status=text_ready), потім зображення."""
+    recipe = await ai_service_instance.generate_recipe_text(
+        remaining_cal=params["remaining_cal"],
+        preferences=params["preferences"],
+        goal=params["goal"]
     )
+    recipe["image_url"] = None
+    await update(status="text_ready", result=recipe)
+    recipe["image_url"] = await ai_service_instance.generate_recipe_image(recipe.get("title", "Healthy meal"))
+    return recipe
+
+job_queue.register("recipe", _recipe_job)
+
+def _public_job(job: dict) -> dict:
+    return {k: job.get(k) for k in ("id", "status", "result", "error")}
+
+@router.get("/generate_recipe/{user_id}")
+async def generate_recipe(
+    user_id: str,
+    background: bool = Query(False),
+    service: NutritionService = Depends(get_nutrition_service)
+):
+    user_id = user_id.strip()
+    if is_invalid_user(user_id): raise HTTPException(status_code=400, detail="User not logged in")
+    
+    status = await service.get_daily_status(user_id)
+    params = {
+        "remaining_cal": status.get("remaining", 500),
+        "preferences": [],
+        "goal": status.get("goal", "maintain")
+    }
+
+    if background:
+        try:
+            job = await job_queue.enqueue("recipe", params)
+        except JobQueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Черга генерації заповнена, спробуйте пізніше",
+                headers={"Retry-After": "5"}
+            )
+        return JSONResponse(status_code=202, content={"job_id": job["id"], "status": job["status"]})
+
+    rec = await ai_service_instance.generate_personalized_recipe(**params)
     
     if not rec: raise HTTPException(status_code=500, detail="AI failed")
     return rec
 
+@router.get("/recipe_jobs/{job_id}")
+async def get_recipe_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if not job: raise HTTPException(status_code=404, detail="Job not found")
+    return _public_job(job)
+
+@router.get("/recipe_jobs/{job_id}/stream")
+async def stream_recipe_job(job_id: str):
+    """SSE: подія на кожну зміну статусу, закривається після done/failed."""
+    job = await job_queue.get(job_id)
+    if not job: raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        current = job
+        last_status = None
+        while current:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                yield f"event: {last_status}\ndata: {json.dumps(_public_job(current), ensure_ascii=False)}\n\n"
+            if last_status in FINAL_STATUSES:
+                break
+            current = await job_queue.wait_for_change(job_id, last_status, timeout=15.0)
+            if current and current["status"] == last_status:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @router.get("/get_tips/{user_id}")
 async def get_tips(user_id: str, service: NutritionService = Depends(get_nutrition_service)):
     user_id = user_id.strip()
@@ -109,11 +276,14 @@ async def get_tips(user_id: str, service: NutritionService = Depends(get_nutriti
         return {"summary": "", "tips": []}
 
     try:
-        history, profile = service.get_data_for_tips(user_id)
-        return ai_service_instance.get_weekly_insights(
-            history=history,
+        days, profile = await service.get_data_for_tips(user_id)
+        return await ai_service_instance.get_weekly_insights(
+            user_id=user_id,
+            days=days,
             target=profile.get("daily_calories_target", 2000),
             goal=profile.get("goal", "maintain")
         )
+    except HTTPException:
+        raise
     except Exception:
         return {"summary": "Слідкуйте за раціоном!", "tips": []}
\ No newline at end of file
@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends
 from schemas import RegisterSchema, LoginSchema, PasswordResetSchema, ProfileSetupSchema, TokenResponse, RefreshTokenSchema
 from database import supabase
@@ -8,6 +9,8 @@ from datetime import datetime
 from schemas import UpdatePasswordSchema
 from services.auth_service import get_current_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 @router.post("/register")
@@ -41,7 +44,7 @@ async def register(data: RegisterSchema, service: NutritionService = Depends(get
             "created_at": get_now_poland().isoformat(),
             "account_type": "free" # 🆕 Default account type
         }
-        service.user_repo.create_profile(db_profile)
+        await service.user_repo.create_profile(db_profile)
         
         # 🆕 Create initial weight history entry
         # This ensures "Start Weight" is recorded in history immediately
@@ -54,7 +57,7 @@ async def register(data: RegisterSchema, service: NutritionService = Depends(get
             }
             supabase.table("weight_history").insert(initial_history).execute()
         except Exception as e:
-            print(f"Error creating initial weight history: {e}")
+            logger.error(f"Error creating initial weight history: {e}")
             # Non-critical, continue
             
         response_data = {"status": "success", "user_id": user_id}
@@ -99,7 +102,7 @@ async def refresh_token(data: RefreshTokenSchema):
                 "token_type": "bearer"
             }
     except Exception as e:
-        print(f"Refresh error: {e}")
+        logger.error(f"Refresh error: {e}")
         pass
         
     raise HTTPException(status_code=401, detail="Invalid refresh token")
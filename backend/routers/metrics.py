@@ -0,0 +1,46 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from metrics import registry
+from database import get_pg_pool
+from repositories.user_repo import profile_cache
+from services.ai_cache import ai_result_cache
+from services.ai_service import ai_service_instance
+from services.admin_service import admin_cache
+from services.job_queue import job_queue
+from services.jwt_verifier import jwt_verifier
+from services.off_client import off_client
+
+router = APIRouter(tags=["Metrics"])
+
+async def _service_stats():
+    """Поточні значення кешів, лімітера OpenAI, черги задач, circuit breaker OFF та пулу Postgres на момент scrape."""
+    caches = [profile_cache.stats(), await ai_result_cache.stats(), jwt_verifier.stats(), off_client.cache.stats(), admin_cache.stats()]
+    limiter = ai_service_instance.limiter.stats()
+    queue = job_queue.stats()
+    breaker = off_client.breaker.stats()
+    families = [
+        ("cache_entries", "gauge", "Записів у кеші", [({"cache": c["name"]}, c["size"]) for c in caches]),
+        ("cache_hits_total", "counter", "Влучання в кеш", [({"cache": c["name"]}, c["hits"]) for c in caches]),
+        ("cache_misses_total", "counter", "Промахи кешу", [({"cache": c["name"]}, c["misses"]) for c in caches]),
+        ("ai_limiter_in_flight", "gauge", "Запити до OpenAI, що виконуються", [({}, limiter["in_flight"])]),
+        ("ai_limiter_waiting", "gauge", "Запити в черзі лімітера OpenAI", [({}, limiter["waiting"])]),
+        ("ai_limiter_rejected_total", "counter", "Відхилені лімітером запити (503)", [({}, limiter["rejected"])]),
+        ("job_queue_queued", "gauge", "Фонові задачі в черзі", [({}, queue["queued"])]),
+        ("job_queue_workers", "gauge", "Воркери фонових задач", [({}, queue["workers"])]),
+        ("job_queue_rejected_total", "counter", "Задачі, відхилені через заповнену чергу (503)", [({}, queue["rejected"])]),
+        ("off_circuit_state", "gauge", "Стан circuit breaker OpenFoodFacts (1 — поточний)",
+            [({"state": state}, int(breaker["state"] == state)) for state in ("closed", "half_open", "open")]),
+        ("off_short_circuited_total", "counter", "Запити до OFF, відхилені breaker-ом", [({}, breaker["short_circuited"])]),
+    ]
+    pool = get_pg_pool()
+    if pool is not None:
+        families += [
+            ("postgres_pool_connections", "gauge", "З'єднання в пулі asyncpg", [({}, pool.get_size())]),
+            ("postgres_pool_idle", "gauge", "Вільні з'єднання в пулі asyncpg", [({}, pool.get_idle_size())]),
+        ]
+    return families
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Метрики у текстовому форматі Prometheus."""
+    return PlainTextResponse(registry.render(await _service_stats()), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,10 +1,14 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends, Form, UploadFile, File
 from schemas import ProfileUpdateSchema
 from services.nutrition_service import NutritionService
 from dependencies import get_nutrition_service, get_current_user
-from database import supabase
+from database import supabase, get_async_supabase
+import asyncio
 from utils import is_invalid_user, get_now_poland
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/profile", tags=["Profile"])
 
 @router.get("/private_tips")
@@ -24,10 +28,10 @@ async def update_profile(data: ProfileUpdateSchema, service: NutritionService =
         update_data[data.field] = float(data.value)
     
     try:
-        service.user_repo.update_profile(data.user_id, update_data)
+        await service.user_repo.update_profile(data.user_id, update_data)
         return {"status": "success", "updated_fields": update_data}
     except Exception as e:
-        print(f"Database Error: {e}")
+        logger.error(f"Database Error: {e}")
         # Повертаємо 500, щоб Flutter зрозумів, що щось не так
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -35,16 +39,17 @@ async def update_profile(data: ProfileUpdateSchema, service: NutritionService =
 @router.get("/{user_id}")
 async def get_profile(user_id: str, service: NutritionService = Depends(get_nutrition_service)):
     if is_invalid_user(user_id): raise HTTPException(status_code=404)
-    return service.user_repo.get_profile(user_id).data
+    return (await service.user_repo.get_profile(user_id)).data
 
 @router.post("/avatar")
 async def upload_avatar(user_id: str = Form(...), file: UploadFile = File(...), service: NutritionService = Depends(get_nutrition_service)):
     if is_invalid_user(user_id): raise HTTPException(status_code=400)
     contents = await file.read()
     path = f"{user_id}/avatar_{int(get_now_poland().timestamp())}.jpg"
-    supabase.storage.from_("avatars").upload(path, contents, {"content-type": "image/jpeg"})
-    url = supabase.storage.from_("avatars").get_public_url(path)
-    service.user_repo.update_profile(user_id, {"avatar_url": url})
+    bucket = get_async_supabase().storage.from_("avatars")
+    await bucket.upload(path, contents, {"content-type": "image/jpeg"})
+    url = await bucket.get_public_url(path)
+    await service.user_repo.update_profile(user_id, {"avatar_url": url})
     return {"avatar_url": url}
 
 @router.post("/change_password")
@@ -67,24 +72,25 @@ async def change_password(data: dict, service: NutritionService = Depends(get_nu
         # 1. Отримуємо email користувача для верифікації старого пароля
         # Спробуємо отримати з Auth (надійніше)
         try:
-            auth_user = supabase.auth.admin.get_user_by_id(user_id)
+            auth_user = await get_async_supabase().auth.admin.get_user_by_id(user_id)
             if auth_user and auth_user.user:
                 email = auth_user.user.email
             else:
                 raise Exception("User not found in Auth")
         except Exception:
             # Fallback to local DB
-            profile = service.user_repo.get_profile(user_id)
+            profile = await service.user_repo.get_profile(user_id)
             if not profile.data:
                 raise HTTPException(status_code=404, detail="User not found")
             email = profile.data.get('email')
 
         # 2. Верифікуємо старий пароль
         try:
-            auth_response = supabase.auth.sign_in_with_password({
-                "email": email,
-                "password": old_password
-            })
+            # Sign-in на окремому sync клієнті (не чіпає сесію спільного async клієнта)
+            auth_response = await asyncio.to_thread(
+                supabase.auth.sign_in_with_password,
+                {"email": email, "password": old_password}
+            )
             if not auth_response.user or not auth_response.session:
                  raise HTTPException(status_code=401, detail="Невірний старий пароль")
         except Exception:
@@ -114,13 +120,13 @@ async def change_password(data: dict, service: NutritionService = Depends(get_nu
             }
             
         except Exception as e:
-            print(f"Password update error: {e}")
+            logger.error(f"Password update error: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to update password: {str(e)}")
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Change password error: {e}")
+        logger.error(f"Change password error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -139,37 +145,35 @@ async def delete_account(user_id: str, service: NutritionService = Depends(get_n
         # 1. Видалення файлів з Storage
         try:
             # Отримуємо об'єкт StorageFileApi для бакета 'avatars'
-            storage = supabase.storage.from_("avatars")
+            storage = get_async_supabase().storage.from_("avatars")
             # List повертає список об'єктів
-            files = storage.list(user_id)
+            files = await storage.list(user_id)
             
             if files:
                 # Формуємо список шляхів для видалення
                 # files має структуру [{'name': '...', ...}, ...]
                 files_to_remove = [f"{user_id}/{f['name']}" for f in files]
-                storage.remove(files_to_remove)
-                print(f"🗑️ Deleted {len(files_to_remove)} files from storage for {user_id}")
+                await storage.remove(files_to_remove)
+                logger.info(f"Deleted {len(files_to_remove)} files from storage for {user_id}")
                 
         except Exception as e:
-            print(f"⚠️ Storage delete error (non-critical): {e}")
+            logger.warning(f"Storage delete error (non-critical): {e}")
 
         # 2. Видалення профілю з БД
         try:
-            # Використовуємо table().delete()
-            service.user_repo.db.table("user_nutrition").delete().eq("user_id", user_id).execute()
-            service.user_repo.db.table("user_profiles").delete().eq("id", user_id).execute()
-            print(f"✅ Deleted profile from DB for {user_id}")
+            await service.user_repo.delete_profile(user_id)
+            logger.info(f"Deleted profile from DB for {user_id}")
         except Exception as e:
-            print(f"DB delete error: {e}")
+            logger.error(f"DB delete error: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to delete profile: {e}")
 
         # 3. Видалення з Auth (Admin API)
         try:
             # Admin API дозволяє видалити користувача
-            supabase.auth.admin.delete_user(user_id)
-            print(f"✅ Deleted user from Auth for {user_id}")
+            await get_async_supabase().auth.admin.delete_user(user_id)
+            logger.info(f"Deleted user from Auth for {user_id}")
         except Exception as e:
-            print(f"Auth delete error: {e}")
+            logger.error(f"Auth delete error: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to delete auth user: {e}")
 
         return {
@@ -180,5 +184,5 @@ async def delete_account(user_id: str, service: NutritionService = Depends(get_n
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Delete account error: {e}")
+        logger.error(f"Delete account error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
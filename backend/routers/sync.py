@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, Depends
+from schemas import SyncRequestSchema
+from services.sync_service import SyncService
+from dependencies import get_current_user, get_sync_service
+from utils import get_now_poland
+
+router = APIRouter(tags=["Sync"])
+
+@router.post("/sync")
+async def sync(
+    data: SyncRequestSchema,
+    current_user_id: str = Depends(get_current_user),
+    service: SyncService = Depends(get_sync_service)
+):
+    """
+    Офлайн-синхронізація: спершу застосовує push (з ключами ідемпотентності),
+    потім повертає зміни після курсорів клієнта. reset=True — локальні дані треба перезавантажити
+    з порожніми курсорами. has_more=True — повторити запит з новими курсорами.
+    """
+    try:
+        service.validate_cursors(data.cursors)
+        pushed = await service.push(current_user_id, data.push)
+        pulled = await service.pull(current_user_id, data.cursors, data.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"push": pushed, **pulled, "server_time": get_now_poland().isoformat()}
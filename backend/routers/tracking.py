@@ -1,14 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+import logging
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse
 # ДОДАВ: ProfileUpdateSchema в імпорти
-from schemas import WaterLogSchema, ManualMealSchema, SaveRecipeSchema, AddFromRecipeSchema, ProfileUpdateSchema, VitaminSchema
+from schemas import WaterLogSchema, ManualMealSchema, MealBatchSchema, SaveRecipeSchema, AddFromRecipeSchema, ProfileUpdateSchema, VitaminSchema
 from services.nutrition_service import NutritionService
-from dependencies import get_nutrition_service
+from services.food_service import FoodService
+from dependencies import get_nutrition_service, get_food_service
+from services.stories_service import stories_service_instance
+from services.off_client import off_client
+from services.off_index import off_index
+from config import settings
 from utils import is_invalid_user, get_now_poland, clean_to_int, clean_to_float
 from datetime import datetime 
-from database import supabase
-import requests
-import httpx 
 import asyncio
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Tracking"])
 
@@ -18,20 +25,29 @@ async def get_user_status(user_id: str, service: NutritionService = Depends(get_
     user_id = user_id.strip()
     if is_invalid_user(user_id):
         return {"eaten": 0, "target": 2000, "remaining": 0, "goal": "maintain"}
-    return service.get_daily_status(user_id)
+    return await service.get_daily_status(user_id)
+
+@router.get("/stories")
+async def get_stories(request: Request):
+    """Активні сторіз зі спільного знімка. Підтримує ETag / If-None-Match (304)."""
+    stories, etag = await stories_service_instance.get_snapshot()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=stories, headers=headers)
 
 @router.get("/analytics/{user_id}")
-async def get_analytics(user_id: str, service: NutritionService = Depends(get_nutrition_service)):
+async def get_analytics(user_id: str, days: int = Query(7, ge=1, le=365), service: NutritionService = Depends(get_nutrition_service)):
     user_id = user_id.strip()
     if is_invalid_user(user_id): return []
-    return service.get_weekly_analytics(user_id)
+    return await service.get_weekly_analytics(user_id, days)
 
 @router.post("/add_water")
 async def add_water(data: WaterLogSchema, service: NutritionService = Depends(get_nutrition_service)):
     data.user_id = data.user_id.strip()
     if is_invalid_user(data.user_id): raise HTTPException(status_code=400, detail="Invalid User")
     entry = {"user_id": data.user_id, "amount": data.amount, "created_at": data.created_at or get_now_poland().isoformat()}
-    service.meal_repo.add_water(entry)
+    await service.meal_repo.add_water(entry)
     return {"status": "success"}
 
 @router.post("/add_meal")
@@ -45,7 +61,7 @@ async def add_meal(data: ManualMealSchema, service: NutritionService = Depends(g
         "image_url": data.image_url, 
         "created_at": get_now_poland().isoformat()
     }
-    service.meal_repo.add_meal(entry)
+    await service.meal_repo.add_meal(entry)
     return {"status": "success", "data": entry}
 
 @router.post("/save_recipe")
@@ -65,17 +81,17 @@ async def save_recipe(data: SaveRecipeSchema, service: NutritionService = Depend
         "time": data.time,
         "created_at": get_now_poland().isoformat()
     }
-    service.meal_repo.save_recipe(entry)
+    await service.meal_repo.save_recipe(entry)
     return {"status": "success"}
 
 @router.get("/saved_recipes/{user_id}")
 async def get_saved_recipes(user_id: str, service: NutritionService = Depends(get_nutrition_service)):
     if is_invalid_user(user_id): return []
-    return service.meal_repo.get_saved_recipes(user_id).data
+    return (await service.meal_repo.get_saved_recipes(user_id)).data
 
 @router.delete("/delete_recipe/{recipe_id}")
 async def delete_recipe(recipe_id: str, service: NutritionService = Depends(get_nutrition_service)):
-    service.meal_repo.delete_recipe(recipe_id)
+    await service.meal_repo.delete_recipe(recipe_id)
     return {"status": "success"}
 
 @router.post("/add_from_recipe")
@@ -94,7 +110,7 @@ async def add_from_recipe(data: AddFromRecipeSchema, service: NutritionService =
         "created_at": datetime.now().isoformat()
     }
     
-    service.meal_repo.add_meal(entry)
+    await service.meal_repo.add_meal(entry)
     return {"status": "success"}
 
 @router.post("/add_manual_meal")
@@ -111,15 +127,70 @@ async def add_manual_meal(meal: ManualMealSchema, service: NutritionService = De
             "image_url": meal.image_url 
         }
 
-        result = service.meal_repo.add_meal(meal_data)
+        result = await service.meal_repo.add_meal(meal_data)
         return {"status": "success", "data": result.data}
 
     except Exception as e:
-        print(f"Error adding manual meal: {e}")
+        logger.error(f"Error adding manual meal: {e}")
         raise HTTPException(status_code=500, detail=str(e))       
 
+@router.post("/meals/batch")
+async def add_meals_batch(data: MealBatchSchema, service: NutritionService = Depends(get_nutrition_service)):
+    """
+    Кілька страв одним запитом (напр. офлайн-беклог за день) та одним INSERT.
+    results — по одному на кожен елемент items, у тому ж порядку.
+    """
+    results = [None] * len(data.items)
+    entries, positions = [], []
+    for i, raw in enumerate(data.items):
+        try:
+            meal = ManualMealSchema.model_validate(raw)
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            results[i] = {"index": i, "status": "error", "detail": detail}
+            continue
+        if is_invalid_user(meal.user_id):
+            results[i] = {"index": i, "status": "error", "detail": "Invalid User ID"}
+            continue
+        entries.append({
+            "user_id": meal.user_id,
+            "meal_name": meal.meal_name,
+            "calories": meal.calories,
+            "protein": meal.protein,
+            "fat": meal.fat,
+            "carbs": meal.carbs,
+            "created_at": meal.created_at or get_now_poland().isoformat(),
+            "image_url": meal.image_url
+        })
+        positions.append(i)
+
+    if entries:
+        try:
+            res = await service.meal_repo.add_meals(entries)
+            rows = res.data or entries
+            for i, row in zip(positions, rows):
+                results[i] = {"index": i, "status": "success", "data": row}
+        except Exception as e:
+            # БД відхилила пакет цілком — пробуємо поштучно, щоб знайти проблемний запис
+            logger.error(f"Batch insert failed, retrying per item: {e}")
+            outcomes = await asyncio.gather(
+                *(service.meal_repo.add_meal(entry) for entry in entries), return_exceptions=True
+            )
+            for i, entry, outcome in zip(positions, entries, outcomes):
+                if isinstance(outcome, Exception):
+                    results[i] = {"index": i, "status": "error", "detail": str(outcome)}
+                else:
+                    results[i] = {"index": i, "status": "success", "data": (outcome.data or [entry])[0]}
+
+    inserted = sum(1 for r in results if r["status"] == "success")
+    return {
+        "status": "success" if inserted == len(results) else ("partial" if inserted else "error"),
+        "inserted": inserted,
+        "results": results
+    }
+
 @router.post("/add_custom_food_product")
-async def add_custom_food_product(product: dict):
+async def add_custom_food_product(product: dict, food: FoodService = Depends(get_food_service)):
     """
     Додає власний продукт користувача в таблицю food_products.
     """
@@ -140,86 +211,45 @@ async def add_custom_food_product(product: dict):
         }
         
         # Додаємо в таблицю food_products
-        result = await asyncio.to_thread(
-            lambda: supabase.table('food_products')
-            .insert(product_data)
-            .execute()
-        )
+        result = await food.food_repo.add_product(product_data)
         
         return {"status": "success", "data": result.data}
     
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error adding custom product: {e}")
+        logger.error(f"Error adding custom product: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/search_food")
-async def search_food(query: str = Query(..., min_length=1)):
-    # 1. Локальний пошук
+async def search_food(
+    query: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    food: FoodService = Depends(get_food_service)
+):
+    # 1. Локальний пошук (ранжований, див. food_search.sql)
     async def search_local():
         try:
-            res = await asyncio.to_thread(
-                lambda: supabase.table('food_products')
-                .select('*')
-                .ilike('name', f'%{query}%')
-                .limit(5)
-                .execute()
-            )
-            results = []
-            for item in res.data:
+            results = await food.search_local(query, limit)
+            for item in results:
                 item['source'] = 'local'
-                results.append(item)
             return results
         except Exception as e:
-            print(f"Local DB Error: {e}")
+            logger.error(f"Local DB Error: {e}")
             return []
 
-    # 2. Глобальний пошук
+    # 2. Глобальний пошук: локальний індекс дампу OFF, живий OFF (кеш + circuit breaker) — fallback
     async def search_global():
-        url = "https://world.openfoodfacts.org/cgi/search.pl"
-        params = {
-            "search_terms": query,
-            "search_simple": 1,
-            "action": "process",
-            "json": 1,
-            "page_size": 10,
-            "fields": "product_name,product_name_uk,product_name_pl,nutriments,brands"
-        }
-        
-        async with httpx.AsyncClient() as client:
-            try:
-                resp = await client.get(url, params=params, timeout=6.0)
-                if resp.status_code != 200: return []
-
-                data = resp.json()
-                results = []
-                for p in data.get('products', []):
-                    name = p.get('product_name_uk') or p.get('product_name_pl') or p.get('product_name')
-                    if not name: continue
-                    nutri = p.get('nutriments', {})
-                    cal = nutri.get('energy-kcal_100g', 0)
-                    if not cal and name.lower() not in ['water', 'вода', 'woda']: continue
-
-                    brands = p.get('brands', '')
-                    full_name = f"{name} ({brands})".strip() if brands else name
-                    
-                    results.append({
-                        "name": full_name,
-                        "calories": int(cal),
-                        "protein": round(float(nutri.get('proteins_100g', 0) or 0), 1),
-                        "fat": round(float(nutri.get('fat_100g', 0) or 0), 1),
-                        "carbs": round(float(nutri.get('carbohydrates_100g', 0) or 0), 1),
-                        "source": "global"
-                    })
-                return results
-            except httpx.ReadTimeout:
-                print(f"⚠️ OpenFoodFacts TimeOut")
-                return []
-            except Exception as e:
-                print(f"Global Search Error: {e}")
-                return []
+        try:
+            if off_index is not None:
+                results = await off_index.search(query, limit)
+                if results or not settings.OFF_LIVE_FALLBACK:
+                    return results
+            return await off_client.search(query)
+        except Exception as e:
+            logger.error(f"Global Search Error: {e}")
+            return []
 
     local_results, global_results = await asyncio.gather(search_local(), search_global())
     return local_results + global_results
@@ -234,27 +264,27 @@ async def add_vitamin(data: VitaminSchema, service: NutritionService = Depends(g
     
     try:
         vitamin_entry = data.dict() 
-        service.meal_repo.add_vitamin(vitamin_entry)
+        await service.meal_repo.add_vitamin(vitamin_entry)
         return {"status": "success", "message": "Вітамін успішно додано"}
     
     except Exception as e:
-        print(f"Server Error adding vitamin: {e}")
+        logger.error(f"Server Error adding vitamin: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/vitamins/{user_id}")
 async def get_vitamins(user_id: str, service: NutritionService = Depends(get_nutrition_service)):
     try:
-        response = service.meal_repo.get_user_vitamins(user_id)
+        response = await service.meal_repo.get_user_vitamins(user_id)
         return response.data if response and response.data else []
     except Exception as e:
-        print(f"⚠️ Error fetching vitamins (returning empty): {e}")
+        logger.warning(f"Error fetching vitamins (returning empty): {e}")
         # Повертаємо порожній масив замість помилки щоб не крашити frontend
         return []
 
 @router.delete("/vitamins/{vitamin_id}")
 async def delete_vitamin(vitamin_id: str, service: NutritionService = Depends(get_nutrition_service)):
     try:
-        service.meal_repo.delete_vitamin(vitamin_id)
+        await service.meal_repo.delete_vitamin(vitamin_id)
         return {"status": "success", "message": "Вітамін видалено"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
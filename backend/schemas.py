@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List, Union, Dict, Any
+from typing import Optional, List, Union, Dict, Any, Literal
 
 # Response Models
 class DailyStatusResponse(BaseModel):
@@ -97,6 +97,23 @@ class ManualMealSchema(BaseModel):
             return 0.0
 
 
+class MealBatchSchema(BaseModel):
+    # Елементи перевіряються як ManualMealSchema поштучно: один битий запис не відхиляє весь пакет
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=100)
+
+class SyncOperationSchema(BaseModel):
+    idempotency_key: str = Field(..., min_length=1, max_length=128)
+    table: str
+    op: Literal["insert", "update", "delete"]
+    id: Optional[str] = None
+    data: Dict[str, Any] = {}
+
+class SyncRequestSchema(BaseModel):
+    # Непрозорі курсори з попередньої відповіді: {"meal_history": "...", ..., "deleted": "..."}
+    cursors: Dict[str, Optional[str]] = {}
+    push: List[SyncOperationSchema] = Field(default=[], max_length=200)
+    limit: int = Field(default=500, ge=1, le=1000)
+
 class SaveRecipeSchema(BaseModel):
     user_id: str
     title: Optional[str] = None
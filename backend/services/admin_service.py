@@ -0,0 +1,146 @@
+import logging
+import asyncio
+from datetime import timedelta
+from typing import Optional
+from postgrest import APIError as PostgrestAPIError
+from cache import TTLCache
+from config import settings
+from repositories.admin_repo import AdminRepository
+from utils import get_now_poland, safe_parse_datetime, clean_to_int
+
+logger = logging.getLogger(__name__)
+
+# Кеш сторінок/агрегатів адмінки: кілька адмінів та оновлення сторінки не б'ють по БД щоразу
+admin_cache = TTLCache(maxsize=256, ttl=settings.ADMIN_CACHE_TTL, name="admin")
+
+# Сторінка fallback-вибірки: не більше за max-rows PostgREST (типово 1000), інакше відповідь обрізається
+FALLBACK_PAGE_SIZE = 1000
+
+class AdminService:
+    # Чи рахувати адмінку через RPC з admin_dashboard.sql (вимикається, якщо функцій немає)
+    admin_rpc = settings.USE_ADMIN_RPC
+
+    def __init__(self, admin_repo: AdminRepository):
+        self.admin_repo = admin_repo
+
+    async def _cached(self, key: tuple, rpc_loader, fallback_loader):
+        cached = admin_cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = None
+        if AdminService.admin_rpc:
+            try:
+                result = await rpc_loader()
+            except PostgrestAPIError as e:
+                # Функції ще не створено (admin_dashboard.sql) — більше не пробуємо
+                if e.code == "PGRST202":
+                    AdminService.admin_rpc = False
+                logger.warning(f"Admin RPC unavailable, fallback: {e.message}")
+            except Exception as e:
+                logger.warning(f"Admin RPC error, fallback: {e}")
+        if result is None:
+            result = await fallback_loader()
+
+        admin_cache.set(key, result)
+        return result
+
+    async def _emails_for(self, user_ids: set) -> dict:
+        """Email лише для показаних рядків (з user_profiles, без GoTrue list_users)."""
+        if not user_ids:
+            return {}
+        res = await self.admin_repo.get_emails(list(user_ids))
+        return {row["id"]: row.get("email") for row in res.data or []}
+
+    @staticmethod
+    async def _fetch_all(loader) -> list:
+        """Усі рядки сторінками по FALLBACK_PAGE_SIZE; loader(limit, offset)."""
+        rows, offset = [], 0
+        while True:
+            page = (await loader(FALLBACK_PAGE_SIZE, offset)).data or []
+            rows.extend(page)
+            if len(page) < FALLBACK_PAGE_SIZE:
+                return rows
+            offset += FALLBACK_PAGE_SIZE
+
+    # --- Підсумки ---
+
+    async def _stats_fallback(self, days: int) -> dict:
+        today = get_now_poland().date()
+        day_from = today - timedelta(days=days - 1)
+        daily, active = {}, set()
+        try:
+            rows = await self._fetch_all(lambda limit, offset: self.admin_repo.get_rollup_since(day_from.isoformat(), limit, offset))
+            for row in rows:
+                day = daily.setdefault(row["local_day"], {"calories": 0, "meals": 0, "active_users": 0})
+                day["calories"] += int(row["calories"] or 0)
+                day["meals"] += int(row["meal_count"] or 0)
+                if row["meal_count"]:
+                    day["active_users"] += 1
+                    active.add(row["user_id"])
+        except Exception:
+            # Без rollup-таблиці — сирі страви за період
+            rows = await self._fetch_all(lambda limit, offset: self.admin_repo.get_meals_since(day_from.isoformat(), limit, offset))
+            users_by_day = {}
+            for row in rows:
+                key = safe_parse_datetime(row["created_at"]).date().isoformat()
+                day = daily.setdefault(key, {"calories": 0, "meals": 0, "active_users": 0})
+                day["calories"] += clean_to_int(row["calories"])
+                day["meals"] += 1
+                users_by_day.setdefault(key, set()).add(row["user_id"])
+                active.add(row["user_id"])
+            for key, users in users_by_day.items():
+                daily[key]["active_users"] = len(users)
+
+        count_res = await self.admin_repo.count_users()
+        return {
+            "total_users": count_res.count or 0,
+            "active_users": len(active),
+            "meals_today": daily.get(today.isoformat(), {}).get("meals", 0),
+            "daily": [{"day": day, **values} for day, values in sorted(daily.items())]
+        }
+
+    async def get_dashboard_stats(self, days: int = 7) -> dict:
+        """Кількість користувачів, активні за days днів, страви сьогодні та денні суми для графіка."""
+        async def rpc():
+            return (await self.admin_repo.get_dashboard_stats(days)).data
+        return await self._cached(("stats", days), rpc, lambda: self._stats_fallback(days))
+
+    # --- Сторінки ---
+
+    async def _recent_meals_fallback(self, limit: int, offset: int) -> list:
+        meals = (await self.admin_repo.get_meals_page(limit, offset)).data or []
+        emails = await self._emails_for({m["user_id"] for m in meals})
+        return [{**m, "user_email": emails.get(m["user_id"]) or "Невідомий"} for m in meals]
+
+    async def get_recent_meals(self, limit: int = 15, offset: int = 0) -> list:
+        async def rpc():
+            return (await self.admin_repo.get_recent_meals(limit, offset)).data or []
+        return await self._cached(("meals", limit, offset), rpc, lambda: self._recent_meals_fallback(limit, offset))
+
+    async def _users_fallback(self, limit: int, offset: int, search: Optional[str]) -> dict:
+        res = await self.admin_repo.get_profiles_page(limit, offset, search)
+        profiles = res.data or []
+        ids = [p["id"] for p in profiles]
+        nutrition = []
+        if ids:
+            nutrition = (await self.admin_repo.get_nutrition(ids)).data or []
+        by_user = {n["user_id"]: n for n in nutrition}
+        users = []
+        for p in profiles:
+            n_data = {k: v for k, v in by_user.get(p["id"], {}).items() if k not in ("id", "user_id")}
+            users.append({**p, **n_data, "email": p.get("email") or "Немає в Auth"})
+        return {"total": res.count or 0, "users": users}
+
+    async def list_users(self, limit: int = 50, offset: int = 0, search: Optional[str] = None) -> dict:
+        """Сторінка користувачів (новіші першими) з email, ціллю та вагою; {"total", "users"}."""
+        search = (search or "").strip() or None
+
+        async def rpc():
+            return (await self.admin_repo.list_users(limit, offset, search)).data
+        return await self._cached(
+            ("users", limit, offset, search), rpc, lambda: self._users_fallback(limit, offset, search)
+        )
+
+    async def get_dashboard(self, meals_limit: int = 15) -> tuple:
+        return await asyncio.gather(self.get_dashboard_stats(), self.get_recent_meals(meals_limit))
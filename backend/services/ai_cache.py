@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+from cache import TTLCache
+from config import settings
+from services.image_service import PreparedImage
+from utils import get_now_poland
+
+def image_key(image: PreparedImage) -> str:
+    """Ключ за перцептивним хешем: повторне фото тієї ж страви дає той самий ключ."""
+    return f"img:{image.phash}"
+
+def text_key(text: str) -> str:
+    """Ключ за нормалізованим описом: регістр, пунктуація та пробіли не враховуються."""
+    normalized = re.sub(r"[^\w]+", " ", text.lower()).strip()
+    return "txt:" + hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+def tips_key(user_id: str, days: list, target: int, goal: str) -> str:
+    """
+    Порада на день: ключ — користувач, сьогоднішня дата та відбиток даних (підсумок днів, норма, ціль).
+    Нова/видалена/змінена страва змінює підсумок, тож і ключ.
+    """
+    fingerprint = json.dumps([days, target, goal], ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+    return f"tips:{user_id}:{get_now_poland().date().isoformat()}:{digest}"
+
+class MemoryCacheBackend:
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, name="ai_results")
+
+    async def get(self, key: str) -> Optional[dict]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: dict):
+        self._cache.set(key, value)
+
+    async def stats(self) -> dict:
+        return {**self._cache.stats(), "backend": "memory"}
+
+class SQLiteCacheBackend:
+    """
+    Кеш на локальному диску: переживає перезапуск і спільний для воркерів одного хоста.
+    LRU-витіснення за last_access, коли записів більше за maxsize.
+    """
+
+    def __init__(self, path: str, maxsize: int, ttl: float):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ai_results ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_results_access ON ai_results (last_access)")
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM ai_results WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM ai_results WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE ai_results SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def _set(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ai_results (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl, now)
+            )
+            self._conn.execute(
+                "DELETE FROM ai_results WHERE key IN ("
+                " SELECT key FROM ai_results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,)
+            )
+            self._conn.commit()
+
+    async def get(self, key: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: dict):
+        await asyncio.to_thread(self._set, key, value)
+
+    def _size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ai_results").fetchone()[0]
+
+    async def stats(self) -> dict:
+        # COUNT(*) проходить усю таблицю — як і get/set, не на event loop
+        size = await asyncio.to_thread(self._size)
+        total = self.hits + self.misses
+        return {
+            "name": "ai_results",
+            "backend": "sqlite",
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0
+        }
+
+def create_ai_cache():
+    if settings.AI_CACHE_BACKEND == "sqlite":
+        return SQLiteCacheBackend(settings.AI_CACHE_PATH, settings.AI_CACHE_SIZE, settings.AI_CACHE_TTL)
+    return MemoryCacheBackend(settings.AI_CACHE_SIZE, settings.AI_CACHE_TTL)
+
+ai_result_cache = create_ai_cache()
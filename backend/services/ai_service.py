@@ -1,28 +1,137 @@
+import asyncio
 import base64
 import json
-import io
 import os
 import logging
-from openai import OpenAI
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, asynccontextmanager
+from fastapi import HTTPException
+import httpx2
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from config import settings
+from metrics import instrumented_transport, classify_openai
+from services.image_service import PreparedImage, preprocess_image
+from services.ai_cache import ai_result_cache, image_key, text_key, tips_key
+from services.json_stream import IncrementalJSONParser
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Окремий пул для декодування/кодування JPEG, щоб PIL не блокував event loop
+image_executor = ThreadPoolExecutor(max_workers=settings.AI_IMAGE_WORKERS, thread_name_prefix="ai-image")
+
+async def run_image_task(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(image_executor, fn, *args)
+
+# Відповідь, коли фото/текст не вдалося проаналізувати (не кешується)
+FAILED_ANALYSIS = {
+    "meal_name": "Не вдалося розпізнати",
+    "calories": 0,
+    "protein": 0, "fat": 0, "carbs": 0
+}
+
+class AILimiter:
+    """
+    Обмежує кількість одночасних запитів до OpenAI та довжину черги.
+    Якщо черга заповнена (або очікування довше за timeout) — 503 замість безмежного накопичення.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _reject(self):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail="AI сервіс перевантажений, спробуйте пізніше",
+            headers={"Retry-After": "5"}
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        if not self._semaphore.locked():
+            # Є вільний слот — acquire завершується без очікування
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self._reject()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject()
+            finally:
+                self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue
+        }
+
 class AIService:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Транспорт з метриками по моделі; ліміти пулу — як у клієнта OpenAI за замовчуванням.
+        # openai>=3 працює на httpx2, тож транспорт і Limits — з httpx2, а не з httpx
+        self.client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=settings.OPENAI_TIMEOUT,
+            http_client=DefaultAsyncHttpxClient(transport=instrumented_transport(
+                classify_openai, httpx2.Limits(max_connections=1000, max_keepalive_connections=100), http=httpx2
+            ))
+        )
+        self.limiter = AILimiter(settings.AI_MAX_CONCURRENCY, settings.AI_MAX_QUEUE, settings.AI_QUEUE_TIMEOUT)
+        self._image_semaphore = asyncio.Semaphore(settings.AI_MAX_IMAGE_GENERATIONS)
+
+    async def prepare_image(self, contents: bytes) -> PreparedImage:
+        """EXIF-поворот, зменшення та перестиснення фото поза event loop."""
+        return await run_image_task(preprocess_image, contents)
 
-    def get_calories_from_image(self, image: Image.Image):
+    async def _cached_analysis(self, key: str, analyze, raise_errors: bool = False):
+        """
+        Повертає результат з кешу або виконує аналіз (у слоті лімітера) і кешує лише успішний.
+        raise_errors=True — помилку аналізу прокидає далі замість FAILED_ANALYSIS.
+        """
+        cached = await ai_result_cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+        try:
+            async with self.limiter.slot():
+                result = await analyze()
+        except HTTPException:
+            raise
+        except Exception:
+            if raise_errors:
+                raise
+            return {**FAILED_ANALYSIS, "cached": False}
+        await ai_result_cache.set(key, result)
+        return {**result, "cached": False}
+
+    async def get_calories_from_image(self, image: PreparedImage, raise_errors: bool = False):
         """Аналізує зображення страви та повертає JSON з калоріями та БЖВ."""
+        return await self._cached_analysis(image_key(image), lambda: self._get_calories_from_image(image), raise_errors)
+
+    async def _get_calories_from_image(self, image: PreparedImage):
         try:
-            # 1. Підготовка зображення
-            buffer = io.BytesIO()
-            image.save(buffer, format="JPEG")
-            base64_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
+            # 1. Підготовка зображення (вже зменшене та стиснуте в prepare_image)
+            base64_image = base64.b64encode(image.data).decode("utf-8")
 
             # 2. Запит до GPT-4o
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-4o",
                 response_format={"type": "json_object"},
                 messages=[
@@ -43,7 +152,7 @@ class AIService:
                         "role": "user",
                         "content": [
                             {"type": "text", "text": "Оціни цю страву. Дай детальну оцінку Ккал та БЖВ."},
-                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
+                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}", "detail": settings.IMAGE_VISION_DETAIL}}
                         ]
                     }
                 ]
@@ -67,75 +176,99 @@ class AIService:
             if current_calories == 0:
                 calculated_cal = int((p * 4) + (c * 4) + (f * 9))
                 result["calories"] = calculated_cal
-                logger.info(f"DEBUG: Калорії перераховані вручну: {calculated_cal}")
+                logger.debug(f"Калорії перераховані вручну: {calculated_cal}")
 
             return result
 
         except Exception as e:
             logger.error(f"Error analyzing food image: {e}")
-            return {
-                "meal_name": "Не вдалося розпізнати",
-                "calories": 0,
-                "protein": 0, "fat": 0, "carbs": 0
-            }
+            raise
 
-    def analyze_food_text(self, text: str):
+    async def analyze_food_text(self, text: str):
         """Аналізує текстовий опис їжі та повертає JSON з калоріями та БЖВ."""
+        return await self._cached_analysis(text_key(text), lambda: self._analyze_food_text(text))
+
+    @staticmethod
+    def _food_text_messages(text: str) -> list:
+        return [
+            {
+                "role": "system",
+                "content": """Ви — професійний дієтолог. Проаналізуйте опис їжі, який користувач надиктував голосом.
+                ОБОВ'ЯЗКОВО розрахуйте калорійність на основі БЖВ: (білки * 4) + (вуглеводи * 4) + (жири * 9).
+                Поверніть результати у форматі JSON:
+                {
+                    "meal_name": "конкретна назва страви",
+                    "calories": ціле число (НЕ 0),
+                    "protein": число грам білків,
+                    "fat": число грам жирів,
+                    "carbs": число грам вуглеводів
+                }.
+                Якщо текст не стосується їжі або немає достатньо інформації, поверніть нулі, але спробуйте зробити обґрунтоване припущення, якщо це можливо."""
+            },
+            {
+                "role": "user",
+                "content": f"Оціни цю страву: {text}. Дай детальну оцінку Ккал та БЖВ."
+            }
+        ]
+
+    @staticmethod
+    def _finalize_food_text(result: dict) -> dict:
+        p = float(result.get("protein", 0))
+        f = float(result.get("fat", 0))
+        c = float(result.get("carbs", 0))
+        current_calories = result.get("calories", 0)
+        
+        if current_calories == 0:
+            calculated_cal = int((p * 4) + (c * 4) + (f * 9))
+            result["calories"] = calculated_cal
+            logger.debug(f"Калорії з тексту перераховані вручну: {calculated_cal}")
+
+        return result
+
+    async def _analyze_food_text(self, text: str):
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-4o",
                 response_format={"type": "json_object"},
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Ви — професійний дієтолог. Проаналізуйте опис їжі, який користувач надиктував голосом.
-                        ОБОВ'ЯЗКОВО розрахуйте калорійність на основі БЖВ: (білки * 4) + (вуглеводи * 4) + (жири * 9).
-                        Поверніть результати у форматі JSON:
-                        {
-                            "meal_name": "конкретна назва страви",
-                            "calories": ціле число (НЕ 0),
-                            "protein": число грам білків,
-                            "fat": число грам жирів,
-                            "carbs": число грам вуглеводів
-                        }.
-                        Якщо текст не стосується їжі або немає достатньо інформації, поверніть нулі, але спробуйте зробити обґрунтоване припущення, якщо це можливо."""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Оціни цю страву: {text}. Дай детальну оцінку Ккал та БЖВ."
-                    }
-                ]
+                messages=self._food_text_messages(text)
             )
 
             content = response.choices[0].message.content
             if not content:
                 raise ValueError("Отримано порожню відповідь від OpenAI")
             
-            result = json.loads(content)
-            
-            p = float(result.get("protein", 0))
-            f = float(result.get("fat", 0))
-            c = float(result.get("carbs", 0))
-            current_calories = result.get("calories", 0)
-            
-            if current_calories == 0:
-                calculated_cal = int((p * 4) + (c * 4) + (f * 9))
-                result["calories"] = calculated_cal
-                logger.info(f"DEBUG: Калорії з тексту перераховані вручну: {calculated_cal}")
-
-            return result
+            return self._finalize_food_text(json.loads(content))
 
         except Exception as e:
             logger.error(f"Error analyzing food text: {e}")
-            return {
-                "meal_name": "Не вдалося розпізнати",
-                "calories": 0,
-                "protein": 0, "fat": 0, "carbs": 0
-            }
+            raise
 
-    def generate_personalized_recipe(self, remaining_cal: int, preferences: list, goal: str):
+    async def generate_personalized_recipe(self, remaining_cal: int, preferences: list, goal: str):
         """Генерує рецепт та зображення."""
-        recipe_prompt = f"""
+        async with self.limiter.slot():
+            try:
+                recipe_data = await self._generate_recipe_text(remaining_cal, preferences, goal)
+            except Exception as e:
+                logger.error(f"General Recipe AI Error: {e}")
+                return {
+                    "title": "Помилка генерації",
+                    "calories": 0,
+                    "protein": 0, "fat": 0, "carbs": 0,
+                    "ingredients": "Не вдалося отримати дані",
+                    "instructions": "Спробуйте ще раз пізніше.",
+                    "image_url": None
+                }
+            recipe_data["image_url"] = await self.generate_recipe_image(recipe_data.get("title", "Healthy meal"))
+            return recipe_data
+
+    async def generate_recipe_text(self, remaining_cal: int, preferences: list, goal: str):
+        """Лише текст рецепту (без зображення). Помилки прокидаються далі."""
+        async with self.limiter.slot():
+            return await self._generate_recipe_text(remaining_cal, preferences, goal)
+
+    @staticmethod
+    def _recipe_messages(remaining_cal: int, preferences: list, goal: str) -> list:
+        prompt = f"""
         Користувач має {remaining_cal} ккал залишку. Його ціль: {goal}. Вподобання: {', '.join(preferences)}.
         Запропонуй рецепт. ПИШИ ВИКЛЮЧНО УКРАЇНСЬКОЮ МОВОЮ.
         
@@ -151,61 +284,74 @@ class AIService:
             "instructions": "кроки приготування одним текстом"
         }}
         """
-        
-        try:
-            # 1. Генерація тексту рецепту
-            recipe_res = self.client.chat.completions.create(
-                model="gpt-4o",
-                response_format={"type": "json_object"},
-                messages=[
-                    {"role": "system", "content": "Ви — шеф-кухар та нутріціолог. Видавайте дані строго у форматі JSON українською мовою."},
-                    {"role": "user", "content": recipe_prompt}
-                ]
-            )
-            recipe_data = json.loads(recipe_res.choices[0].message.content)
-            
-            # Запобіжник defaults
-            recipe_data.setdefault("title", "Смачна страва")
-            recipe_data.setdefault("protein", 0)
-            recipe_data.setdefault("fat", 0)
-            recipe_data.setdefault("carbs", 0)
-            
-            # 2. Генерація зображення (DALL-E 3)
+        return [
+            {"role": "system", "content": "Ви — шеф-кухар та нутріціолог. Видавайте дані строго у форматі JSON українською мовою."},
+            {"role": "user", "content": prompt}
+        ]
+
+    @staticmethod
+    def _finalize_recipe(recipe_data: dict) -> dict:
+        # Запобіжник defaults
+        recipe_data.setdefault("title", "Смачна страва")
+        recipe_data.setdefault("protein", 0)
+        recipe_data.setdefault("fat", 0)
+        recipe_data.setdefault("carbs", 0)
+        return recipe_data
+
+    async def _generate_recipe_text(self, remaining_cal: int, preferences: list, goal: str):
+        recipe_res = await self.client.chat.completions.create(
+            model="gpt-4o",
+            response_format={"type": "json_object"},
+            messages=self._recipe_messages(remaining_cal, preferences, goal)
+        )
+        return self._finalize_recipe(json.loads(recipe_res.choices[0].message.content))
+
+    async def generate_recipe_image(self, dish_title: str):
+        """Зображення страви (DALL-E 3). Кількість одночасних генерацій обмежена окремо."""
+        async with self._image_semaphore:
             try:
-                dish_title = recipe_data.get("title", "Healthy meal")
                 # Оптимізація: quality="standard" дешевше і швидше, ніж HD
-                image_res = self.client.images.generate(
+                image_res = await self.client.images.generate(
                     model="dall-e-3",
                     prompt=f"Professional food photography of {dish_title}, soft lighting, top down view",
                     size="1024x1024",
                     quality="standard", 
                     n=1
                 )
-                recipe_data["image_url"] = image_res.data[0].url
+                return image_res.data[0].url
             except Exception as e:
                 logger.error(f"DALL-E error: {e}")
-                recipe_data["image_url"] = None
-            
-            return recipe_data
+                return None
 
-        except Exception as e:
-            logger.error(f"General Recipe AI Error: {e}")
-            return {
-                "title": "Помилка генерації",
-                "calories": 0,
-                "protein": 0, "fat": 0, "carbs": 0,
-                "ingredients": "Не вдалося отримати дані",
-                "instructions": "Спробуйте ще раз пізніше.",
-                "image_url": None
-            }
+    async def get_weekly_insights(self, user_id: str, days: list, target: int, goal: str):
+        """Аналізує тиждень та повертає поради; для тих самих даних протягом дня — з кешу."""
+        key = tips_key(user_id, days, target, goal)
+        cached = await ai_result_cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+        async with self.limiter.slot():
+            result = await self._get_weekly_insights(days, target, goal)
+        if result.get("tips"):
+            await ai_result_cache.set(key, result)
+        return {**result, "cached": False}
 
-    def get_weekly_insights(self, history: list, target: int, goal: str):
-        """Аналізує тиждень та повертає поради."""
-        history_str = str(history) 
+    @staticmethod
+    def _format_days(days: list) -> str:
+        # Рядок на день: "2026-10-12: 1850 ккал, Б/Ж/В 95/70/210 г (21/34/45%), страв: 4 (борщ, ...)"
+        if not days:
+            return "немає записів"
+        return "\n".join(
+            f"{d['date']}: {d['calories']} ккал, Б/Ж/В {d['protein']}/{d['fat']}/{d['carbs']} г "
+            f"({'/'.join(str(p) for p in d['pfc_pct'])}%), страв: {d['meal_count']} ({', '.join(d['top_meals'])})"
+            for d in days
+        )
 
+    @classmethod
+    def _tips_messages(cls, days: list, target: int, goal: str) -> list:
         prompt = f"""
         Ти — експерт-нутріціолог. ПИШИ ТІЛЬКИ УКРАЇНСЬКОЮ МОВОЮ.
-        Проаналізуй дані користувача за тиждень: {history_str}.
+        Проаналізуй дані користувача за тиждень (по днях):
+        {cls._format_days(days)}
         Денна норма: {target} ккал. Ціль: {goal}.
         
         Напиши 3 короткі, мотиваційні поради. Поверни ТІЛЬКИ JSON:
@@ -216,14 +362,17 @@ class AIService:
             ]
         }}
         """
+        return [
+            {"role": "system", "content": "Ти персональний дієтолог."},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def _get_weekly_insights(self, days: list, target: int, goal: str):
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-4o",
                 response_format={"type": "json_object"},
-                messages=[
-                    {"role": "system", "content": "Ти персональний дієтолог."},
-                    {"role": "user", "content": prompt}
-                ]
+                messages=self._tips_messages(days, target, goal)
             )
             return json.loads(response.choices[0].message.content)
         except Exception as e:
@@ -233,4 +382,74 @@ class AIService:
                 "tips": []
             }
 
+    # --- Стрімінгові варіанти (SSE) ---
+
+    async def _stream_json(self, messages: list):
+        """
+        stream=True + інкрементальний парсер: віддає ("field"/"item", ...) по мірі готовності полів,
+        наприкінці — ("result", повний об'єкт). Слот лімітера тримає викликач.
+        Закриття генератора (клієнт відключився) закриває й відповідь OpenAI.
+        """
+        parser = IncrementalJSONParser()
+        stream = await self.client.chat.completions.create(
+            model="gpt-4o",
+            response_format={"type": "json_object"},
+            messages=messages,
+            stream=True
+        )
+        async with stream:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    for event in parser.feed(delta):
+                        yield event
+        yield ("result", parser.result())
+
+    async def stream_food_text(self, text: str):
+        """Як analyze_food_text, але поля віддаються одразу; кешований результат — одним пакетом."""
+        key = text_key(text)
+        cached = await ai_result_cache.get(key)
+        if cached is not None:
+            for field, value in cached.items():
+                yield ("field", field, value)
+            yield ("result", {**cached, "cached": True})
+            return
+        async with self.limiter.slot(), aclosing(self._stream_json(self._food_text_messages(text))) as events:
+            async for event in events:
+                if event[0] == "result":
+                    result = self._finalize_food_text(event[1])
+                    await ai_result_cache.set(key, result)
+                    event = ("result", {**result, "cached": False})
+                yield event
+
+    async def stream_weekly_insights(self, user_id: str, days: list, target: int, goal: str):
+        key = tips_key(user_id, days, target, goal)
+        cached = await ai_result_cache.get(key)
+        if cached is not None:
+            for field, value in cached.items():
+                yield ("field", field, value)
+            yield ("result", {**cached, "cached": True})
+            return
+        async with self.limiter.slot(), aclosing(self._stream_json(self._tips_messages(days, target, goal))) as events:
+            async for event in events:
+                if event[0] == "result":
+                    if event[1].get("tips"):
+                        await ai_result_cache.set(key, event[1])
+                    event = ("result", {**event[1], "cached": False})
+                yield event
+
+    async def stream_recipe(self, remaining_cal: int, preferences: list, goal: str):
+        """Текст рецепту стрімиться, зображення додається до фінального об'єкта."""
+        # break нижче не закриває генератор сам — aclosing закриває стрім OpenAI одразу
+        async with self.limiter.slot(), aclosing(self._stream_json(self._recipe_messages(remaining_cal, preferences, goal))) as events:
+            async for event in events:
+                if event[0] == "result":
+                    recipe = self._finalize_recipe(event[1])
+                    break
+                yield event
+        recipe["image_url"] = await self.generate_recipe_image(recipe.get("title", "Healthy meal"))
+        yield ("result", recipe)
+
 ai_service_instance = AIService()
\ No newline at end of file
@@ -1,8 +1,9 @@
-from fastapi import HTTPException, Header
-from database import supabase
+import secrets
+from fastapi import HTTPException, Header, Depends
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from config import settings
-from jose import jwt
-from datetime import datetime
+from database import supabase
+from services.jwt_verifier import jwt_verifier
 
 def register_user(email: str, password: str, profile_data: dict = None) -> dict:
     try:
@@ -30,19 +31,25 @@ def login_user(email: str, password: str) -> dict:
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-def get_current_user(authorization: str = Header(...)) -> str:
-    """Декодування JWT токена для ідентифікації користувача в захищених запитах"""
+async def get_current_user(authorization: str = Header(...)) -> str:
+    """Перевірка JWT токена (локально, HS256/ES256/RS256) для ідентифікації користувача в захищених запитах"""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Відсутній або невірний заголовок авторизації")
         
     token = authorization.replace("Bearer ", "")
     try:
-        payload = jwt.decode(
-            token, 
-            settings.SUPABASE_JWT_SECRET, 
-            algorithms=["HS256"], 
-            audience="authenticated"
-        )
-        return payload["sub"] 
+        claims = await jwt_verifier.verify(token)
+        return claims["sub"]
     except Exception:
-        raise HTTPException(status_code=401, detail="Токен недійсний або термін дії закінчився")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Токен недійсний або термін дії закінчився")
+
+admin_basic = HTTPBasic(auto_error=False)
+
+def require_admin(credentials: HTTPBasicCredentials = Depends(admin_basic)) -> str:
+    """Доступ до JSON API адмінки: HTTP Basic з тими ж ADMIN_USERNAME / ADMIN_PASSWORD, що й форма входу."""
+    valid = credentials is not None \
+        and secrets.compare_digest(credentials.username.encode(), settings.ADMIN_USERNAME.encode()) \
+        and secrets.compare_digest(credentials.password.encode(), settings.ADMIN_PASSWORD.encode())
+    if not valid:
+        raise HTTPException(status_code=401, detail="Доступ заборонено", headers={"WWW-Authenticate": "Basic"})
+    return credentials.username
@@ -0,0 +1,30 @@
+import logging
+from repositories.food_repo import FoodRepository
+from postgrest import APIError as PostgrestAPIError
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class FoodService:
+    # Чи використовувати RPC search_food_products (вимикається, якщо функції немає в БД)
+    search_rpc = settings.USE_FOOD_SEARCH_RPC
+
+    def __init__(self, food_repo: FoodRepository):
+        self.food_repo = food_repo
+
+    async def search_local(self, query: str, limit: int) -> list:
+        """Продукти з food_products: спершу ранжований RPC, ilike — лише fallback."""
+        if FoodService.search_rpc:
+            try:
+                res = await self.food_repo.search_products(query, limit)
+                return res.data or []
+            except PostgrestAPIError as e:
+                # Функцію ще не створено (food_search.sql) — більше не пробуємо
+                if e.code == "PGRST202":
+                    FoodService.search_rpc = False
+                logger.warning(f"Food search RPC unavailable, fallback: {e.message}")
+            except Exception as e:
+                logger.warning(f"Food search RPC error, fallback: {e}")
+
+        res = await self.food_repo.search_products_ilike(query, limit)
+        return res.data or []
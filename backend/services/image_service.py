@@ -0,0 +1,57 @@
+import io
+import logging
+from PIL import Image, ImageOps
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class PreparedImage:
+    """Результат препроцесингу: стиснутий JPEG без метаданих + розміри до/після."""
+
+    def __init__(self, data: bytes, width: int, height: int, original_bytes: int, phash: str = None):
+        self.data = data
+        self.width = width
+        self.height = height
+        self.original_bytes = original_bytes
+        self.phash = phash
+
+    @property
+    def bytes_saved(self) -> int:
+        return max(0, self.original_bytes - len(self.data))
+
+def perceptual_hash(image: Image.Image, size: int = 8) -> str:
+    """dHash: 64-бітний відбиток, стійкий до перестиснення та зміни розміру."""
+    gray = image.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:0{size * size // 4}x}"
+
+def preprocess_image(contents: bytes, max_edge: int = None, quality: int = None) -> PreparedImage:
+    """
+    Готує фото до vision-запиту:
+    EXIF-поворот, зменшення до max_edge по довшій стороні, JPEG з заданою якістю.
+    EXIF/ICC не переносяться, тож метадані (зокрема GPS) відкидаються.
+    Виконується синхронно — викликати через пул (ai_service.run_image_task).
+    """
+    max_edge = max_edge or settings.IMAGE_MAX_EDGE
+    quality = quality or settings.IMAGE_JPEG_QUALITY
+
+    image = Image.open(io.BytesIO(contents))
+    image.draft("RGB", (max_edge, max_edge))  # швидке зменшення JPEG ще на етапі декодування
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    prepared = PreparedImage(buffer.getvalue(), image.width, image.height, len(contents), perceptual_hash(image))
+
+    logger.debug(
+        f"Image prepared: {prepared.original_bytes // 1024} KB -> {len(prepared.data) // 1024} KB "
+        f"({prepared.width}x{prepared.height}, saved {prepared.bytes_saved // 1024} KB)"
+    )
+    return prepared
@@ -0,0 +1,219 @@
+import logging
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+from cache import TTLCache
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# queued -> running -> text_ready -> done | failed
+FINAL_STATUSES = ("done", "failed")
+
+class JobQueueFull(Exception):
+    """Черга задач заповнена (JOB_MAX_QUEUE) — нову задачу не прийнято."""
+
+class MemoryJobStore:
+    def __init__(self, ttl: float):
+        self._jobs = TTLCache(maxsize=10000, ttl=ttl, name="jobs")
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def save(self, job: dict):
+        self._jobs.set(job["id"], dict(job))
+
+    async def fail_interrupted(self) -> int:
+        return 0
+
+class SQLiteJobStore:
+    """
+    Задачі на локальному диску: статус переживає перезапуск процесу.
+    Незавершені на момент зупинки задачі при старті позначаються як failed.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM jobs WHERE id = ? AND updated_at >= ?", (job_id, time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _save(self, job: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, payload, updated_at) VALUES (?, ?, ?, ?)",
+                (job["id"], job["status"], json.dumps(job, ensure_ascii=False, default=str), now)
+            )
+            self._conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - self.ttl,))
+            self._conn.commit()
+
+    def _fail_interrupted(self) -> int:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM jobs WHERE status NOT IN (?, ?)", FINAL_STATUSES
+            ).fetchall()
+            for (payload,) in rows:
+                job = json.loads(payload)
+                job.update(status="failed", error="Interrupted by restart")
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, payload = ? WHERE id = ?",
+                    ("failed", json.dumps(job, ensure_ascii=False, default=str), job["id"])
+                )
+            self._conn.commit()
+        return len(rows)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def save(self, job: dict):
+        await asyncio.to_thread(self._save, job)
+
+    async def fail_interrupted(self) -> int:
+        return await asyncio.to_thread(self._fail_interrupted)
+
+def create_job_store():
+    if settings.JOB_STORE_BACKEND == "sqlite":
+        return SQLiteJobStore(settings.JOB_STORE_PATH, settings.JOB_TTL)
+    return MemoryJobStore(settings.JOB_TTL)
+
+class JobQueue:
+    """
+    Внутрішньопроцесна черга фонових задач (генерація рецептів тощо).
+    Обробник отримує job та колбек update(**fields), яким публікує проміжні результати.
+    Черга обмежена max_queue; задачі, події та MemoryJobStore — у пам'яті процесу,
+    тому бекенд має працювати одним воркером uvicorn.
+    """
+
+    def __init__(self, store, workers: int, max_queue: int):
+        self.store = store
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rejected = 0
+        self._queue: asyncio.Queue = None
+        self._tasks = []
+        self._handlers = {}
+        # job_id -> Event і кількість очікувачів; запис живе лише поки хтось чекає
+        self._events = {}
+        self._waiters = {}
+
+    def register(self, kind: str, handler: Callable[..., Awaitable]):
+        self._handlers[kind] = handler
+
+    async def enqueue(self, kind: str, params: dict) -> dict:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._queue is None:
+            raise RuntimeError("JobQueue is not started")
+        if self._queue.full():
+            self.rejected += 1
+            raise JobQueueFull(f"Job queue is full ({self.max_queue})")
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "params": params,
+            "result": None,
+            "error": None,
+            "created_at": time.time()
+        }
+        await self.store.save(job)
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.store.get(job_id)
+
+    async def _update(self, job: dict, **fields):
+        job.update(fields)
+        job["updated_at"] = time.time()
+        await self.store.save(job)
+        event = self._events.pop(job["id"], None)
+        if event:
+            event.set()
+
+    async def wait_for_change(self, job_id: str, known_status: str, timeout: float) -> Optional[dict]:
+        """Чекає, доки статус задачі відрізнятиметься від known_status (для стрімінгу)."""
+        event = self._events.setdefault(job_id, asyncio.Event())
+        self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            job = await self.store.get(job_id)
+            if job is None or job["status"] != known_status:
+                return job
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return await self.store.get(job_id)
+        finally:
+            # Останній очікувач прибирає подію: задача завершилась, зникла за TTL або клієнт відключився
+            self._waiters[job_id] -= 1
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+                self._events.pop(job_id, None)
+
+    async def _run(self, job_id: str):
+        job = await self.store.get(job_id)
+        if not job:
+            return
+        handler = self._handlers[job["kind"]]
+        await self._update(job, status="running")
+
+        async def update(**fields):
+            await self._update(job, **fields)
+
+        try:
+            result = await handler(job["params"], update)
+            await self._update(job, status="done", result=result)
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job['kind']}) failed: {e}")
+            await self._update(job, status="failed", error=str(e))
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        interrupted = await self.store.fail_interrupted()
+        if interrupted:
+            logger.info(f"JOBS -> {interrupted} interrupted job(s) marked as failed")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected
+        }
+
+job_queue = JobQueue(create_job_store(), workers=settings.JOB_WORKERS, max_queue=settings.JOB_MAX_QUEUE)
@@ -0,0 +1,113 @@
+import json
+from typing import List, Optional, Tuple
+
+class IncrementalJSONParser:
+    """
+    Інкрементальний розбір JSON-об'єкта, що надходить частинами (stream=True у OpenAI).
+    feed(chunk) повертає події про поля верхнього рівня, що вже завершились:
+      ("field", key, value)        — значення поля повністю отримане;
+      ("item", key, index, value)  — черговий елемент масиву верхнього рівня (напр. tips).
+    Повний об'єкт після завершення потоку — result().
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._key = None
+        self._last_string = None
+        self._awaiting_value = False
+        self._value_start = None
+        self._array_key = None
+        self._item_start = None
+        self._item_index = 0
+
+    def feed(self, chunk: str) -> List[Tuple]:
+        self._text += chunk
+        events = []
+        text = self._text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._on_string_end(i, events)
+                continue
+
+            if c == '"':
+                self._mark_start(i)
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                self._mark_start(i)
+                self._depth += 1
+                if self._depth == 2 and c == "[":
+                    self._array_key = self._key
+                    self._item_index = 0
+            elif c in "}]":
+                self._complete_scalar(i, events)
+                self._depth -= 1
+                if self._depth == 2 and self._array_key is not None:
+                    self._emit_item(i + 1, events)
+                elif self._depth == 1:
+                    self._emit_field(i + 1, events)
+                    self._array_key = None
+            elif c == ",":
+                self._complete_scalar(i, events)
+            elif c == ":":
+                if self._depth == 1:
+                    self._key = self._last_string
+                    self._awaiting_value = True
+            elif not c.isspace():
+                self._mark_start(i)
+        self._pos = len(text)
+        return events
+
+    def result(self) -> Optional[dict]:
+        """Повний об'єкт (json.loads усього тексту); ValueError, якщо JSON неповний."""
+        return json.loads(self._text)
+
+    def _mark_start(self, i: int):
+        if self._depth == 1 and self._awaiting_value and self._value_start is None:
+            self._value_start = i
+        elif self._depth == 2 and self._array_key is not None and self._item_start is None:
+            self._item_start = i
+
+    def _on_string_end(self, i: int, events: list):
+        if self._depth == 1:
+            if self._awaiting_value and self._value_start == self._string_start:
+                self._emit_field(i + 1, events)
+            else:
+                self._last_string = json.loads(self._text[self._string_start:i + 1])
+        elif self._depth == 2 and self._array_key is not None and self._item_start == self._string_start:
+            self._emit_item(i + 1, events)
+
+    def _complete_scalar(self, i: int, events: list):
+        """Числа/true/false/null завершуються лише на ',' або закриваючій дужці."""
+        if self._depth == 1 and self._value_start is not None:
+            self._emit_field(i, events)
+        elif self._depth == 2 and self._array_key is not None and self._item_start is not None:
+            self._emit_item(i, events)
+
+    def _emit_field(self, end: int, events: list):
+        if self._value_start is None:
+            return
+        value = json.loads(self._text[self._value_start:end])
+        events.append(("field", self._key, value))
+        self._value_start = None
+        self._awaiting_value = False
+
+    def _emit_item(self, end: int, events: list):
+        if self._item_start is None:
+            return
+        value = json.loads(self._text[self._item_start:end])
+        events.append(("item", self._array_key, self._item_index, value))
+        self._item_start = None
+        self._item_index += 1
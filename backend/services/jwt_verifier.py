@@ -0,0 +1,98 @@
+import logging
+import asyncio
+import time
+from typing import Optional
+import httpx
+from jose import jwt, JWTError
+from cache import TTLCache
+from config import settings
+from metrics import instrumented_transport, classify_supabase
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ("ES256", "RS256")
+
+class JWTVerifier:
+    """
+    Локальна перевірка access-токенів Supabase без запиту до GoTrue.
+    HS256 — спільним секретом, ES256/RS256 — ключами з JWKS (кешується та періодично оновлюється).
+    Вже перевірені токени тримаються в LRU не довше, ніж до їх exp.
+    """
+
+    def __init__(self, secret: str, jwks_url: str, audience: str, jwks_refresh_interval: float,
+                 cache_size: int, cache_ttl: float):
+        self.secret = secret
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.jwks_refresh_interval = jwks_refresh_interval
+        self._keys = {}
+        self._jwks_loaded_at = 0.0
+        self._jwks_lock = asyncio.Lock()
+        self._claims = TTLCache(maxsize=cache_size, ttl=cache_ttl, name="jwt_claims")
+
+    async def _fetch_jwks(self):
+        async with httpx.AsyncClient(timeout=settings.SUPABASE_TIMEOUT, transport=instrumented_transport(classify_supabase)) as client:
+            res = await client.get(self.jwks_url, headers={"apikey": settings.SUPABASE_SERVICE_ROLE_KEY})
+            res.raise_for_status()
+        keys = {k.get("kid"): k for k in res.json().get("keys", [])}
+        self._keys, self._jwks_loaded_at = keys, time.monotonic()
+        logger.info(f"AUTH -> JWKS loaded ({len(keys)} keys)")
+
+    async def _get_key(self, kid: Optional[str]) -> dict:
+        """
+        Ключ за kid. JWKS перечитується, якщо застарів або kid невідомий (ротація ключів),
+        але не частіше ніж раз на 30 с — щоб токени з вигаданим kid не смикали GoTrue.
+        """
+        age = time.monotonic() - self._jwks_loaded_at
+        if (kid not in self._keys and age > 30) or age > self.jwks_refresh_interval:
+            async with self._jwks_lock:
+                age = time.monotonic() - self._jwks_loaded_at
+                if (kid not in self._keys and age > 30) or age > self.jwks_refresh_interval:
+                    try:
+                        await self._fetch_jwks()
+                    except Exception as e:
+                        # Лишаємо попередні ключі; без них перевірка просто не пройде
+                        logger.error(f"JWKS refresh error: {e}")
+        key = self._keys.get(kid)
+        if key is None and kid is None and len(self._keys) == 1:
+            key = next(iter(self._keys.values()))
+        if key is None:
+            raise JWTError(f"Unknown signing key: {kid}")
+        return key
+
+    async def verify(self, token: str) -> dict:
+        """Повертає claims або кидає JWTError."""
+        claims = self._claims.get(token)
+        if claims is not None:
+            return claims
+
+        header = jwt.get_unverified_header(token)
+        alg = header.get("alg")
+        if alg == "HS256":
+            key = self.secret
+        elif alg in ASYMMETRIC_ALGORITHMS:
+            key = await self._get_key(header.get("kid"))
+        else:
+            raise JWTError(f"Unsupported algorithm: {alg}")
+
+        claims = jwt.decode(token, key, algorithms=[alg], audience=self.audience)
+        if not claims.get("sub"):
+            raise JWTError("Token has no subject")
+
+        exp = claims.get("exp")
+        ttl = min(self._claims.ttl, exp - time.time()) if exp else self._claims.ttl
+        if ttl > 0:
+            self._claims.set(token, claims, ttl=ttl)
+        return claims
+
+    def stats(self) -> dict:
+        return {**self._claims.stats(), "jwks_keys": len(self._keys)}
+
+jwt_verifier = JWTVerifier(
+    secret=settings.SUPABASE_JWT_SECRET,
+    jwks_url=f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json",
+    audience=settings.JWT_AUDIENCE,
+    jwks_refresh_interval=settings.JWKS_REFRESH_INTERVAL,
+    cache_size=settings.JWT_CACHE_SIZE,
+    cache_ttl=settings.JWT_CACHE_TTL
+)
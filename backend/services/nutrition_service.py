@@ -1,12 +1,24 @@
+import logging
+import asyncio
 from repositories.meal_repo import MealRepository
 from repositories.user_repo import UserRepository
-from utils import clean_to_int, clean_to_float, get_now_poland
+from services.stories_service import stories_service_instance
+from utils import clean_to_int, clean_to_float, get_now_poland, safe_parse_datetime
 from datetime import timedelta
-from rich.console import Console
+from postgrest import APIError as PostgrestAPIError
+from config import settings
 
-console = Console()
+logger = logging.getLogger(__name__)
+
+# PostgREST / Postgres коди "relation does not exist"
+MISSING_RELATION_CODES = ("PGRST205", "42P01")
 
 class NutritionService:
+    # Чи використовувати SQL агрегат get_daily_status (вимикається, якщо функції немає в БД)
+    daily_status_rpc = settings.USE_DAILY_STATUS_RPC
+    # Чи читати аналітику з daily_nutrition_rollup (вимикається, якщо таблиці немає)
+    daily_rollup = settings.USE_DAILY_ROLLUP
+
     def __init__(self, meal_repo: MealRepository, user_repo: UserRepository):
         self.meal_repo = meal_repo
         self.user_repo = user_repo
@@ -48,37 +60,69 @@ class NutritionService:
             "carbs": int((calories * 0.4) / 4)
         }
 
-    def get_daily_status(self, user_id: str):
+    async def _get_day_totals(self, user_id: str, date_from: str):
+        """Профіль + суми за день. Спочатку RPC (один round trip), Python-сума — лише fallback."""
+        if NutritionService.daily_status_rpc:
+            try:
+                res = await self.meal_repo.get_daily_summary(user_id, date_from)
+                data = res.data or {}
+                return data.get("profile"), data.get("totals") or {}
+            except PostgrestAPIError as e:
+                # Функцію ще не створено (daily_status_rpc.sql) — більше не пробуємо
+                if e.code == "PGRST202":
+                    NutritionService.daily_status_rpc = False
+                logger.warning(f"Daily status RPC unavailable, fallback: {e.message}")
+            except Exception as e:
+                logger.warning(f"Daily status RPC error, fallback: {e}")
+
+        prof_response, meals_res, water_res = await asyncio.gather(
+            self.user_repo.get_profile(user_id),
+            self.meal_repo.get_meals_from_date(user_id, date_from),
+            self.meal_repo.get_water_logs(user_id, date_from)
+        )
+        prof = prof_response.data if prof_response else None
+        meals = meals_res.data or []
+        water = water_res.data or []
+
+        return prof, {
+            "eaten": sum(clean_to_int(m.get('calories', 0)) for m in meals),
+            "protein": sum(clean_to_float(m.get('protein')) for m in meals),
+            "fat": sum(clean_to_float(m.get('fat')) for m in meals),
+            "carbs": sum(clean_to_float(m.get('carbs')) for m in meals),
+            "water": sum(w['amount'] for w in water),
+            "meal_count": len(meals)
+        }
+
+    async def _get_stories(self):
+        try:
+            return await stories_service_instance.get_snapshot(self.meal_repo)
+        except Exception as e:
+            logger.error(f"Error fetching stories: {e}")
+            return [], None
+
+    async def get_daily_status(self, user_id: str):
         """Отримує повну статистику за сьогодні."""
-        console.print(f"[bold cyan]STATUS[/] -> Fetching daily summary for: [white]{user_id}[/]")
+        logger.debug(f"STATUS -> Fetching daily summary for: {user_id}")
         
         today = get_now_poland().replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
         
-        prof_response = self.user_repo.get_profile(user_id)
-        prof = prof_response.data if prof_response else None
+        (prof, totals), (stories, stories_etag) = await asyncio.gather(
+            self._get_day_totals(user_id, today),
+            self._get_stories()
+        )
         
         if not prof: 
-            console.print(f"   ┗━ [red]Profile not found![/]")
+            logger.warning(f"Profile not found: {user_id}")
             return {"error": "Profile not found"}
 
-        meals = self.meal_repo.get_meals_from_date(user_id, today).data or []
-        water = self.meal_repo.get_water_logs(user_id, today).data or []
-        
-        console.print(f"   ┗━ [dim]Meals today:[/dim] {len(meals)} | [dim]Water logs:[/dim] {len(water)}")
+        logger.debug(f"Meals today: {totals.get('meal_count', 0)}")
 
         target = max(1200, int(prof.get("daily_calories_target", 2000)))
-        eaten = sum(clean_to_int(m.get('calories', 0)) for m in meals)
-
-        try:
-            stories_response = self.meal_repo.get_stories()
-            stories = stories_response.data if stories_response.data else []
-        except Exception as e:
-            console.print(f"   ┗━ [red]Error fetching stories: {e}[/]")
-            stories = []
+        eaten = int(totals.get("eaten") or 0)
         
         macros = self.calculate_macros(target)
         
-        console.print(f"   ┗━ [green]Success[/] -> Eaten: {eaten}/{target} kcal")
+        logger.debug(f"Success -> Eaten: {eaten}/{target} kcal")
 
         return {
             "user_id": user_id,
@@ -88,12 +132,13 @@ class NutritionService:
             "target": target, 
             "remaining": max(0, target - eaten),
             "goal": prof.get("goal"),
-            "protein": sum(clean_to_float(m.get('protein')) for m in meals),
-            "fat": sum(clean_to_float(m.get('fat')) for m in meals),
-            "carbs": sum(clean_to_float(m.get('carbs')) for m in meals),
-            "water": sum(w['amount'] for w in water), 
+            "protein": float(totals.get("protein") or 0),
+            "fat": float(totals.get("fat") or 0),
+            "carbs": float(totals.get("carbs") or 0),
+            "water": int(totals.get("water") or 0), 
             "water_target": int(prof.get("weight", 70) * 35),
             "stories": stories,
+            "stories_etag": stories_etag,
             "weight": prof.get("weight"),
             "avatar_url": prof.get("avatar_url"),
             "target_p": macros["protein"], 
@@ -101,29 +146,56 @@ class NutritionService:
             "target_c": macros["carbs"]
         }
 
-    def get_weekly_analytics(self, user_id: str):
-        """Повертає статистику всіх метрик за останні 7 днів."""
-        week_ago = (get_now_poland().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=7)).isoformat()
-        
-        console.print(f"[bold cyan]ANALYTICS[/] -> Fetching for user: [white]{user_id}[/]")
-        console.print(f"   ┗━ [dim]Date range start:[/dim] {week_ago}")
+    async def get_weekly_analytics(self, user_id: str, days: int = 7):
+        """Повертає статистику всіх метрик за останні `days` днів (за замовчуванням тиждень)."""
+        day_start = get_now_poland().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
         
-        meals_res = self.meal_repo.get_meals_from_date(user_id, week_ago)
-        water_res = self.meal_repo.get_water_logs(user_id, week_ago)
+        logger.debug(f"ANALYTICS -> Fetching for user: {user_id}")
+        logger.debug(f"Date range start: {day_start.isoformat()}")
+
+        if NutritionService.daily_rollup:
+            try:
+                rollup_res = await self.meal_repo.get_daily_rollup(user_id, day_start.date().isoformat())
+                rows = rollup_res.data or []
+                logger.debug(f"Rollup days: {len(rows)}")
+                return [{
+                    "day": row["local_day"],
+                    "calories": int(row.get("calories") or 0),
+                    "protein": round(float(row.get("protein") or 0), 1),
+                    "fat": round(float(row.get("fat") or 0), 1),
+                    "carbs": round(float(row.get("carbs") or 0), 1),
+                    "water": int(row.get("water") or 0)
+                } for row in rows]
+            except PostgrestAPIError as e:
+                # Таблицю ще не створено (daily_nutrition_rollup.sql) — рахуємо з сирих рядків
+                if e.code in MISSING_RELATION_CODES:
+                    NutritionService.daily_rollup = False
+                logger.warning(f"Rollup unavailable, fallback: {e.message}")
+            except Exception as e:
+                logger.warning(f"Rollup error, fallback: {e}")
+
+        return await self._aggregate_raw_days(user_id, day_start.isoformat())
+
+    async def _aggregate_raw_days(self, user_id: str, week_ago: str):
+        """Fallback: агрегація сирих meal_history / water_logs по днях у Python."""
+        meals_res, water_res = await asyncio.gather(
+            self.meal_repo.get_meals_from_date(user_id, week_ago),
+            self.meal_repo.get_water_logs(user_id, week_ago)
+        )
         
         if meals_res.data:
-            console.print(f"   ┗━ [green]Found {len(meals_res.data)} meals[/]")
+            logger.debug(f"Found {len(meals_res.data)} meals")
         else:
-            console.print(f"   ┗━ [yellow]NO MEALS FOUND[/] via query")
-            console.print(f"      [dim]Query: user_id={user_id}, created_at >= {week_ago}[/]")
+            logger.info(f"NO MEALS FOUND via query")
+            logger.debug(f"Query: user_id={user_id}, created_at >= {week_ago}")
             
             # --- DEBUG CHECK: Check if ANY meals exist for this user ---
             try:
-                all_meals = self.meal_repo.supabase.table("meal_history").select("count").eq("user_id", user_id).execute()
+                all_meals = await self.meal_repo.supabase.table("meal_history").select("count").eq("user_id", user_id).execute()
                 count = all_meals.data[0]['count'] if all_meals.data else 0
-                console.print(f"      [dim]Total meals (all time): {count}[/]")
+                logger.debug(f"Total meals (all time): {count}")
             except Exception as e:
-                console.print(f"      [red]Check failed: {e}[/]")
+                logger.error(f"Check failed: {e}")
             # -----------------------------------------------------------
 
         meals_data = meals_res.data or []
@@ -182,15 +254,52 @@ class NutritionService:
         
         return result
         
-    def get_data_for_tips(self, user_id: str):
-        """Збирає дані (історія + профіль) для генерації порад."""
-        console.print(f"[bold cyan]AI TIPS[/] -> Fetching context for: [white]{user_id}[/]")
+    @staticmethod
+    def summarize_days(meals: list, top_meals: int = 3) -> list:
+        """
+        Компактний контекст для порад: по дню — суми, частки БЖВ у калоріях (%), кількість страв
+        та кілька найкалорійніших назв. Замість сирих рядків з id, фото та food_items.
+        """
+        days = {}
+        for meal in meals:
+            day = safe_parse_datetime(meal.get("created_at") or "").date().isoformat()
+            totals = days.setdefault(day, {"calories": 0, "protein": 0.0, "fat": 0.0, "carbs": 0.0, "meals": []})
+            calories = clean_to_int(meal.get("calories"))
+            totals["calories"] += calories
+            totals["protein"] += clean_to_float(meal.get("protein"))
+            totals["fat"] += clean_to_float(meal.get("fat"))
+            totals["carbs"] += clean_to_float(meal.get("carbs"))
+            totals["meals"].append((calories, meal.get("meal_name") or "?"))
+
+        summary = []
+        for day, t in sorted(days.items()):
+            macro_kcal = t["protein"] * 4 + t["fat"] * 9 + t["carbs"] * 4
+            ratio = [round(v * 100 / macro_kcal) if macro_kcal else 0 for v in (t["protein"] * 4, t["fat"] * 9, t["carbs"] * 4)]
+            summary.append({
+                "date": day,
+                "calories": t["calories"],
+                "protein": round(t["protein"]),
+                "fat": round(t["fat"]),
+                "carbs": round(t["carbs"]),
+                "pfc_pct": ratio,
+                "meal_count": len(t["meals"]),
+                "top_meals": [name for _, name in sorted(t["meals"], key=lambda m: -m[0])[:top_meals]]
+            })
+        return summary
+
+    async def get_data_for_tips(self, user_id: str):
+        """Збирає дані (підсумок тижня по днях + профіль) для генерації порад."""
+        logger.debug(f"AI TIPS -> Fetching context for: {user_id}")
         
         week_ago = (get_now_poland().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=7)).isoformat()
         
-        history = self.meal_repo.get_meals_from_date(user_id, week_ago).data or []
-        profile = self.user_repo.get_profile(user_id).data or {}
+        history_res, profile_res = await asyncio.gather(
+            self.meal_repo.get_meals_for_tips(user_id, week_ago),
+            self.user_repo.get_profile(user_id)
+        )
+        meals = history_res.data or []
+        profile = profile_res.data or {}
         
-        console.print(f"   ┗━ [green]Found[/] {len(history)} recent meals")
+        logger.debug(f"Found {len(meals)} recent meals")
         
-        return history, profile
\ No newline at end of file
+        return self.summarize_days(meals), profile
@@ -0,0 +1,198 @@
+import logging
+import asyncio
+import re
+import time
+from typing import Optional
+import httpx
+from cache import TTLCache
+from config import settings
+from metrics import instrumented_transport, classify_by_path
+
+logger = logging.getLogger(__name__)
+
+def normalize_query(query: str) -> str:
+    """Ключ кешу: "Гречка ", "гречка!" та "ГРЕЧКА" — один запит."""
+    return re.sub(r"[^\w]+", " ", query.lower()).strip()
+
+def normalize_product(p: dict) -> Optional[dict]:
+    """
+    Продукт OFF -> рядок для /search_food (назва uk/pl/default + бренд, ккал та БЖВ на 100 г).
+    None, якщо немає назви або калорійності. Спільне для живого пошуку та імпорту дампу.
+    """
+    name = p.get('product_name_uk') or p.get('product_name_pl') or p.get('product_name')
+    if not name: return None
+    nutri = p.get('nutriments') or {}
+    cal = nutri.get('energy-kcal_100g', 0)
+    if not cal and name.lower() not in ['water', 'вода', 'woda']: return None
+
+    brands = p.get('brands', '')
+    full_name = f"{name} ({brands})".strip() if brands else name
+
+    return {
+        "name": full_name,
+        "calories": int(float(cal or 0)),
+        "protein": round(float(nutri.get('proteins_100g', 0) or 0), 1),
+        "fat": round(float(nutri.get('fat_100g', 0) or 0), 1),
+        "carbs": round(float(nutri.get('carbohydrates_100g', 0) or 0), 1),
+        "source": "global"
+    }
+
+class CircuitBreaker:
+    """
+    closed -> open після failure_threshold помилок/повільних відповідей поспіль;
+    через reset_timeout пропускає один пробний запит (half-open).
+    Поки open, віддалений виклик не робиться взагалі.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, slow_threshold: float, name: str = "breaker"):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_threshold = slow_threshold
+        self.name = name
+        self.failures = 0
+        self.opened_at = None
+        self.short_circuited = 0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self, elapsed: float):
+        if elapsed > self.slow_threshold:
+            self.record_failure()
+            return
+        self._probe_in_flight = False
+        if self.opened_at is not None:
+            logger.info(f"{self.name.upper()} -> circuit closed")
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"{self.name.upper()} -> circuit open ({self.failures} failures)")
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "short_circuited": self.short_circuited
+        }
+
+class OpenFoodFactsClient:
+    """
+    Глобальний пошук продуктів в OpenFoodFacts.
+    Один httpx пул на процес (створюється в lifespan), кеш за нормалізованим запитом
+    (порожні відповіді та збої — коротші TTL), circuit breaker та один запит на однакові паралельні пошуки.
+    """
+
+    SEARCH_PATH = "/cgi/search.pl"
+    FIELDS = "product_name,product_name_uk,product_name_pl,nutriments,brands"
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.cache = TTLCache(maxsize=settings.OFF_CACHE_SIZE, ttl=settings.OFF_CACHE_TTL, name="off_search")
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.OFF_BREAKER_FAILURES,
+            reset_timeout=settings.OFF_BREAKER_RESET,
+            slow_threshold=settings.OFF_SLOW_THRESHOLD,
+            name="off"
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight = {}
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                transport=instrumented_transport(classify_by_path("openfoodfacts"), httpx.Limits(
+                    max_connections=settings.OFF_POOL_SIZE,
+                    max_keepalive_connections=settings.OFF_POOL_SIZE
+                )),
+                timeout=httpx.Timeout(settings.OFF_TIMEOUT),
+                headers={"User-Agent": "NutritionApp/1.0"}
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def parse_products(data: dict) -> list:
+        return [product for product in map(normalize_product, data.get('products', [])) if product]
+
+    async def _fetch(self, query: str) -> Optional[list]:
+        """None — OFF недоступний (кешується на OFF_FAILURE_TTL), [] — справді нічого не знайдено."""
+        if not self.breaker.allow():
+            return None
+        if self._client is None:
+            await self.start()
+        params = {
+            "search_terms": query,
+            "search_simple": 1,
+            "action": "process",
+            "json": 1,
+            "page_size": 10,
+            "fields": self.FIELDS
+        }
+        started = time.monotonic()
+        try:
+            resp = await self._client.get(self.SEARCH_PATH, params=params)
+            if resp.status_code != 200:
+                raise httpx.HTTPStatusError(f"OFF status {resp.status_code}", request=resp.request, response=resp)
+            results = self.parse_products(resp.json())
+        except Exception as e:
+            self.breaker.record_failure()
+            if isinstance(e, httpx.TimeoutException):
+                logger.warning(f"OpenFoodFacts TimeOut")
+            else:
+                logger.error(f"Global Search Error: {e}")
+            return None
+        self.breaker.record_success(time.monotonic() - started)
+        return results
+
+    async def search(self, query: str) -> list:
+        key = normalize_query(query)
+        if not key:
+            return []
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Однакові паралельні запити (набір тексту) чекають на один виклик
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        results = await asyncio.shield(task)
+
+        if results is None:
+            self.cache.set(key, [], ttl=settings.OFF_FAILURE_TTL)
+            return []
+        self.cache.set(key, results, ttl=None if results else settings.OFF_NEGATIVE_TTL)
+        return results
+
+    def stats(self) -> dict:
+        return {"cache": self.cache.stats(), "breaker": self.breaker.stats()}
+
+off_client = OpenFoodFactsClient(settings.OFF_BASE_URL)
@@ -0,0 +1,129 @@
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+from config import settings
+from utils import food_search_key
+
+class OffProductIndex:
+    """
+    Локальний індекс продуктів OpenFoodFacts (SQLite FTS5), наповнюється import_off_dump.py.
+    products — рядки для /search_food, products_fts — повнотекстовий індекс за food_search_key(name).
+    Upsert за штрихкодом (code), тож дельта-файли можна імпортувати поверх повного дампу.
+    Запис — одне з'єднання під локом; пошук — окреме read-only з'єднання на кожен потік,
+    тож паралельні пошуки не чекають один на одного (WAL дозволяє читати під час імпорту).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS products (
+                id INTEGER PRIMARY KEY,
+                code TEXT NOT NULL UNIQUE,
+                name TEXT NOT NULL,
+                calories INTEGER NOT NULL,
+                protein REAL NOT NULL,
+                fat REAL NOT NULL,
+                carbs REAL NOT NULL,
+                search_key TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                search_key, content='products', content_rowid='id', prefix='2 3'
+            );
+            CREATE TRIGGER IF NOT EXISTS products_ai AFTER INSERT ON products BEGIN
+                INSERT INTO products_fts (rowid, search_key) VALUES (new.id, new.search_key);
+            END;
+            CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products BEGIN
+                INSERT INTO products_fts (products_fts, rowid, search_key) VALUES ('delete', old.id, old.search_key);
+            END;
+            CREATE TRIGGER IF NOT EXISTS products_au AFTER UPDATE ON products BEGIN
+                INSERT INTO products_fts (products_fts, rowid, search_key) VALUES ('delete', old.id, old.search_key);
+                INSERT INTO products_fts (rowid, search_key) VALUES (new.id, new.search_key);
+            END;
+        """)
+        self._conn.commit()
+
+    # --- Імпорт ---
+
+    def upsert_many(self, products: Iterable[dict]) -> int:
+        """products — результати off_client.normalize_product з полем code."""
+        rows = [
+            (p["code"], p["name"], p["calories"], p["protein"], p["fat"], p["carbs"], food_search_key(p["name"]))
+            for p in products
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO products (code, name, calories, protein, fat, carbs, search_key)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(code) DO UPDATE SET name = excluded.name, calories = excluded.calories,"
+                " protein = excluded.protein, fat = excluded.fat, carbs = excluded.carbs,"
+                " search_key = excluded.search_key",
+                rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def delete_codes(self, codes: Iterable[str]) -> int:
+        codes = [(code,) for code in codes]
+        with self._lock:
+            self._conn.executemany("DELETE FROM products WHERE code = ?", codes)
+            self._conn.commit()
+        return len(codes)
+
+    def optimize(self):
+        """Злиття сегментів FTS5 після великого імпорту."""
+        with self._lock:
+            self._conn.execute("INSERT INTO products_fts (products_fts) VALUES ('optimize')")
+            self._conn.commit()
+
+    def count(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"{Path(self.path).resolve().as_uri()}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    # --- Пошук ---
+
+    @staticmethod
+    def _match_expression(query: str) -> Optional[str]:
+        # Кожне слово — префіксний токен: "kurch" знаходить "kurchak"
+        tokens = food_search_key(query).split()
+        return " ".join(f'"{token}"*' for token in tokens) if tokens else None
+
+    def _search(self, query: str, limit: int) -> list:
+        """
+        bm25 по всіх збігах частого слова ("milk") коштує десятки мс, тому ранжуються лише
+        перші OFF_INDEX_CANDIDATES збігів: спершу збіг з початку назви, далі bm25 та коротші назви.
+        """
+        match = self._match_expression(query)
+        if not match:
+            return []
+        rows = self._reader().execute(
+            "SELECT p.name, p.calories, p.protein, p.fat, p.carbs"
+            " FROM (SELECT rowid, rank FROM products_fts WHERE products_fts MATCH ? LIMIT ?) f"
+            " JOIN products p ON p.id = f.rowid"
+            " ORDER BY p.search_key LIKE ? || '%' DESC, f.rank, length(p.name) LIMIT ?",
+            (match, settings.OFF_INDEX_CANDIDATES, food_search_key(query), limit)
+        ).fetchall()
+        return [
+            {"name": name, "calories": calories, "protein": protein, "fat": fat, "carbs": carbs, "source": "global"}
+            for name, calories, protein, fat, carbs in rows
+        ]
+
+    async def search(self, query: str, limit: int = 10) -> list:
+        return await asyncio.to_thread(self._search, query, limit)
+
+def create_off_index() -> Optional[OffProductIndex]:
+    return OffProductIndex(settings.OFF_INDEX_PATH) if settings.OFF_INDEX_PATH else None
+
+off_index = create_off_index()
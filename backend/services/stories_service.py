@@ -0,0 +1,81 @@
+import logging
+import asyncio
+import hashlib
+import json
+import time
+from config import settings
+from database import get_async_supabase
+from repositories.meal_repo import MealRepository
+
+logger = logging.getLogger(__name__)
+
+class StoriesService:
+    """
+    Спільний для всіх користувачів знімок app_stories.
+    Оновлюється у фоні кожні STORIES_REFRESH_INTERVAL секунд і скидається
+    адмін-роутами після змін, тож /user_status не ходить у БД за сторіз.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._stories = None
+        self._etag = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    @staticmethod
+    def _make_etag(stories: list) -> str:
+        payload = json.dumps(stories, sort_keys=True, ensure_ascii=False, default=str)
+        return '"' + hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16] + '"'
+
+    async def refresh(self, meal_repo: MealRepository = None):
+        """Перечитує сторіз з БД. Паралельні виклики чекають на один запит."""
+        started = time.monotonic()
+        async with self._lock:
+            if self._stories is not None and self._loaded_at >= started:
+                return
+            generation = self._generation
+            repo = meal_repo or MealRepository(get_async_supabase())
+            res = await repo.get_stories()
+            stories = res.data if res.data else []
+            etag = self._make_etag(stories)
+            if etag != self._etag:
+                logger.info(f"STORIES -> Snapshot updated ({len(stories)} active)")
+            self._stories, self._etag = stories, etag
+            # Якщо під час запиту прийшов invalidate — знімок одразу вважається застарілим
+            self._loaded_at = time.monotonic() if generation == self._generation else 0.0
+
+    async def get_snapshot(self, meal_repo: MealRepository = None) -> tuple:
+        """Повертає (stories, etag); перечитує, якщо знімок скинуто або застарів."""
+        if self._stories is None or time.monotonic() - self._loaded_at > self.refresh_interval:
+            await self.refresh(meal_repo)
+        return self._stories or [], self._etag
+
+    def invalidate(self):
+        """Викликається адмін-роутами після add/edit/delete/reorder."""
+        self._generation += 1
+        self._stories = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Stories refresh error: {e}")
+
+    async def start(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"Stories initial load error: {e}")
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+stories_service_instance = StoriesService(refresh_interval=settings.STORIES_REFRESH_INTERVAL)
@@ -0,0 +1,131 @@
+import logging
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from config import settings
+from repositories.sync_repo import SyncRepository
+from utils import encode_cursor, decode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Таблиці, що віддаються дельтами (див. sync_protocol.sql)
+SYNC_TABLES = ("meal_history", "water_logs", "saved_recipes", "user_vitamins", "weight_history")
+# Куди клієнт може писати через push; вага — лише через /weight/add (оновлює user_nutrition)
+PUSH_TABLES = ("meal_history", "water_logs", "saved_recipes", "user_vitamins")
+# Поля, які клієнт не задає: власник та службовий час
+PROTECTED_COLUMNS = ("user_id", "updated_at")
+
+class SyncService:
+    """
+    Дельта-синхронізація для офлайн-клієнтів.
+    pull: по кожній таблиці рядки з (updated_at, id) після курсора клієнта + tombstones видалень.
+    push: записи клієнта з ключами ідемпотентності (повтор після обриву зв'язку не дублює рядок).
+    """
+
+    def __init__(self, sync_repo: SyncRepository):
+        self.sync_repo = sync_repo
+
+    @staticmethod
+    def _next_cursor(rows: list, until: str) -> str:
+        # Порожня сторінка: до until змін немає — курсор рухається до until, а не лишається старим
+        # (інакше tombstone-курсор користувача без видалень старіє і через 30 днів дає reset)
+        return encode_cursor(rows[-1]["updated_at"], rows[-1]["id"]) if rows else encode_cursor(until)
+
+    async def _pull_table(self, table: str, user_id: str, cursor: Optional[str], until: str, limit: int) -> dict:
+        res = await self.sync_repo.get_changes(table, user_id, decode_cursor(cursor), until, limit + 1)
+        rows = res.data or []
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {"rows": rows, "cursor": self._next_cursor(rows, until), "has_more": has_more}
+
+    async def _pull_tombstones(self, user_id: str, cursor: Optional[str], until: str, limit: int) -> dict:
+        if not cursor:
+            # Новий клієнт і так отримує повний стан — старі видалення йому не потрібні
+            return {"rows": [], "cursor": encode_cursor(until), "has_more": False}
+        res = await self.sync_repo.get_tombstones(user_id, decode_cursor(cursor), until, limit + 1)
+        rows = res.data or []
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "rows": [{"table": r["table_name"], "id": r["row_id"], "deleted_at": r["updated_at"]} for r in rows],
+            "cursor": self._next_cursor(rows, until),
+            "has_more": has_more
+        }
+
+    @staticmethod
+    def validate_cursors(cursors: dict):
+        """ValueError на пошкоджений курсор — до push, щоб запит з битим курсором нічого не записав."""
+        for cursor in cursors.values():
+            decode_cursor(cursor)
+
+    @staticmethod
+    def _needs_reset(tombstone_cursor: Optional[str]) -> bool:
+        """Tombstones старші за SYNC_TOMBSTONE_RETENTION_DAYS прибираються — такий клієнт мусить почати з нуля."""
+        position = decode_cursor(tombstone_cursor)
+        if not position:
+            return False
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        return datetime.fromisoformat(position[0]) < cutoff
+
+    async def pull(self, user_id: str, cursors: dict, limit: int) -> dict:
+        tombstone_cursor = cursors.get("deleted")
+        if self._needs_reset(tombstone_cursor):
+            return {"reset": True, "tables": {}, "deleted": {"rows": [], "cursor": None, "has_more": False}}
+
+        # Рядки новіші за until ще можуть бути в незавершених транзакціях — їх віддамо наступного разу
+        until = (datetime.now(timezone.utc) - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)).isoformat()
+        results = await asyncio.gather(
+            *(self._pull_table(table, user_id, cursors.get(table), until, limit) for table in SYNC_TABLES),
+            self._pull_tombstones(user_id, tombstone_cursor, until, limit)
+        )
+        return {
+            "reset": False,
+            "tables": dict(zip(SYNC_TABLES, results[:-1])),
+            "deleted": results[-1]
+        }
+
+    async def _apply(self, user_id: str, op) -> dict:
+        data = {k: v for k, v in (op.data or {}).items() if k not in PROTECTED_COLUMNS}
+        if op.op == "insert":
+            res = await self.sync_repo.insert_row(op.table, {**data, "user_id": user_id})
+        elif op.op == "update":
+            data.pop("id", None)
+            res = await self.sync_repo.update_row(op.table, user_id, op.id, data)
+        else:
+            res = await self.sync_repo.delete_row(op.table, user_id, op.id)
+        if op.op != "insert" and not res.data:
+            return {"status": "not_found"}
+        return {"status": "success", "data": res.data[0] if res.data else None}
+
+    async def push_one(self, user_id: str, op) -> dict:
+        base = {"idempotency_key": op.idempotency_key}
+        if op.table not in PUSH_TABLES:
+            return {**base, "status": "error", "detail": f"Table '{op.table}' is not writable via sync"}
+        if op.op in ("update", "delete") and not op.id:
+            return {**base, "status": "error", "detail": "id is required for update/delete"}
+
+        if not await self.sync_repo.claim_idempotency_key(user_id, op.idempotency_key):
+            existing = await self.sync_repo.get_idempotency_result(user_id, op.idempotency_key)
+            row = existing.data[0] if existing.data else {}
+            if row.get("status") == "done":
+                return {**base, **(row.get("response") or {}), "replayed": True}
+            # "pending" довше за lease — процес, що його взяв, упав до запису результату; забираємо ключ
+            stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.SYNC_IDEMPOTENCY_LEASE_SECONDS)
+            if not await self.sync_repo.take_over_idempotency_key(user_id, op.idempotency_key, stale_before.isoformat()):
+                return {**base, "status": "pending"}
+            logger.warning(f"Sync push: took over stale idempotency key {op.idempotency_key}")
+
+        try:
+            result = await self._apply(user_id, op)
+        except Exception as e:
+            # Ключ звільняємо, щоб клієнт міг повторити той самий запис
+            await self.sync_repo.release_idempotency_key(user_id, op.idempotency_key)
+            logger.error(f"Sync push error ({op.table}/{op.op}): {e}")
+            return {**base, "status": "error", "detail": str(e)}
+
+        await self.sync_repo.save_idempotency_result(user_id, op.idempotency_key, result)
+        return {**base, **result}
+
+    async def push(self, user_id: str, ops: list) -> list:
+        # Послідовно: insert і наступний update того ж рядка мають іти в порядку клієнта
+        return [await self.push_one(user_id, op) for op in ops]
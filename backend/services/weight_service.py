@@ -0,0 +1,150 @@
+import logging
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from postgrest import APIError as PostgrestAPIError
+from config import settings
+from repositories.weight_repo import WeightRepository
+from repositories.user_repo import UserRepository
+from utils import clean_to_float, safe_parse_datetime, encode_cursor, decode_cursor
+
+logger = logging.getLogger(__name__)
+
+class WeightService:
+    # Чи агрегувати історію для графіків через RPC get_weight_buckets (вимикається, якщо функції немає)
+    buckets_rpc = settings.USE_WEIGHT_BUCKETS_RPC
+    # Чи записувати вагу через RPC record_weight (вимикається, якщо функції немає)
+    record_rpc = settings.USE_WEIGHT_RECORD_RPC
+
+    def __init__(self, weight_repo: WeightRepository, user_repo: UserRepository):
+        self.weight_repo = weight_repo
+        self.user_repo = user_repo
+
+    async def _get_start_weight(self, user_id: str) -> Optional[float]:
+        res = await self.weight_repo.get_first_entry(user_id)
+        return clean_to_float(res.data[0]["weight"]) if res.data else None
+
+    @staticmethod
+    def _bucket_rows(rows: list, bucket: str) -> list:
+        """Python-аналог get_weight_buckets: групування за тижнем/місяцем за польським часом."""
+        groups = {}
+        for row in rows:
+            day = safe_parse_datetime(row["created_at"]).date()
+            start = day.replace(day=1) if bucket == "month" else day - timedelta(days=day.weekday())
+            groups.setdefault(start, []).append(clean_to_float(row["weight"]))
+        return [
+            {
+                "bucket_start": start.isoformat(),
+                "avg_weight": round(sum(weights) / len(weights), 2),
+                "min_weight": min(weights),
+                "max_weight": max(weights),
+                "entries": len(weights)
+            }
+            for start, weights in sorted(groups.items())
+        ]
+
+    async def get_buckets(self, user_id: str, bucket: str, date_from: Optional[str], date_to: Optional[str]) -> list:
+        if WeightService.buckets_rpc:
+            try:
+                res = await self.weight_repo.get_buckets(user_id, bucket, date_from, date_to)
+                return res.data or []
+            except PostgrestAPIError as e:
+                # Функцію ще не створено (weight_history.sql) — більше не пробуємо
+                if e.code == "PGRST202":
+                    WeightService.buckets_rpc = False
+                logger.warning(f"Weight buckets RPC unavailable, fallback: {e.message}")
+            except Exception as e:
+                logger.warning(f"Weight buckets RPC error, fallback: {e}")
+
+        res = await self.weight_repo.get_weights_in_range(user_id, date_from, date_to)
+        return self._bucket_rows(res.data or [], bucket)
+
+    async def get_history(
+        self, user_id: str, cursor: Optional[str], limit: int,
+        bucket: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None
+    ) -> dict:
+        """
+        Сторінка сирих записів (keyset за created_at, id) або, з bucket, агрегати для графіка.
+        start_weight — перший запис історії окремим індексованим запитом.
+        """
+        before = decode_cursor(cursor)
+
+        async def history_page():
+            if bucket:
+                return [], None
+            res = await self.weight_repo.get_history_page(user_id, before, limit + 1)
+            rows = res.data or []
+            next_cursor = encode_cursor(rows[limit - 1]["created_at"], rows[limit - 1]["id"]) if len(rows) > limit else None
+            return rows[:limit], next_cursor
+
+        async def buckets():
+            return await self.get_buckets(user_id, bucket, date_from, date_to) if bucket else None
+
+        prof_res, (history, next_cursor), start_weight, bucket_rows = await asyncio.gather(
+            self.user_repo.get_profile(user_id),
+            history_page(),
+            self._get_start_weight(user_id),
+            buckets()
+        )
+        profile = prof_res.data if prof_res and prof_res.data else {}
+        current_weight = clean_to_float(profile.get("weight"))
+
+        return {
+            "history": history,
+            "next_cursor": next_cursor,
+            "buckets": bucket_rows,
+            "current_weight": current_weight,
+            "start_weight": start_weight if start_weight is not None else current_weight,
+            "target_weight": profile.get("target_weight"),
+            "weekly_change_goal": profile.get("weekly_change_goal"),
+            "estimated_end_date": profile.get("estimated_end_date")
+        }
+
+    async def _record_weight_fallback(self, user_id: str, weight: float, created_at: str) -> dict:
+        """Та сама логіка, що й record_weight, але кількома запитами (без транзакції)."""
+        prev_res, next_res = await asyncio.gather(
+            self.weight_repo.get_neighbour(user_id, created_at, after=False),
+            self.weight_repo.get_neighbour(user_id, created_at, after=True)
+        )
+        difference = weight - clean_to_float(prev_res.data[0]["weight"]) if prev_res.data else 0.0
+        res = await self.weight_repo.add_entry({
+            "user_id": user_id,
+            "weight": weight,
+            "difference": difference,
+            "created_at": created_at
+        })
+
+        current_weight = weight
+        if next_res.data:
+            # Запис "заднім числом": наступний тепер рахується від нього, поточна вага не змінюється
+            nxt = next_res.data[0]
+            await self.weight_repo.set_difference(nxt["id"], clean_to_float(nxt["weight"]) - weight)
+            latest = await self.weight_repo.get_history_page(user_id, None, 1)
+            current_weight = clean_to_float(latest.data[0]["weight"]) if latest.data else weight
+        await self.weight_repo.set_current_weight(user_id, current_weight)
+
+        return {
+            "id": res.data[0]["id"] if res.data else None,
+            "difference": difference,
+            "current_weight": current_weight
+        }
+
+    async def record_weight(self, user_id: str, weight: float, created_at: Optional[str] = None) -> dict:
+        """Новий запис ваги (created_at у минулому — запис заднім числом); повертає id, difference, current_weight."""
+        result = None
+        if WeightService.record_rpc:
+            try:
+                res = await self.weight_repo.record_weight(user_id, weight, created_at)
+                result = res.data
+            except PostgrestAPIError as e:
+                # Функцію ще не створено (weight_history.sql) — більше не пробуємо
+                if e.code != "PGRST202":
+                    raise
+                WeightService.record_rpc = False
+                logger.warning(f"Record weight RPC unavailable, fallback: {e.message}")
+
+        if result is None:
+            result = await self._record_weight_fallback(user_id, weight, created_at or datetime.now(timezone.utc).isoformat())
+
+        UserRepository.invalidate_profile(user_id)
+        return result
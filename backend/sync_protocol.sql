@@ -0,0 +1,96 @@
+-- Офлайн-синхронізація (POST /sync): updated_at на синхронізованих таблицях,
+-- tombstones для видалень та ключі ідемпотентності для записів з клієнта.
+-- Виконайте у Supabase SQL Editor.
+
+-- 1. updated_at: DEFAULT для insert, тригер для update.
+--    clock_timestamp(), а не now(): у межах транзакції кожен рядок отримує власний час.
+CREATE OR REPLACE FUNCTION public.touch_updated_at()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.updated_at := clock_timestamp();
+  RETURN NEW;
+END;
+$$;
+
+-- 2. Tombstones: кожне видалення лишає (table_name, row_id) для клієнтів з курсором.
+CREATE TABLE IF NOT EXISTS public.sync_tombstones (
+  id          bigserial   PRIMARY KEY,
+  table_name  text        NOT NULL,
+  row_id      text        NOT NULL,
+  user_id     uuid        NOT NULL,
+  updated_at  timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_user_updated
+  ON public.sync_tombstones (user_id, updated_at, id);
+
+CREATE OR REPLACE FUNCTION public.record_sync_tombstone()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public.sync_tombstones (table_name, row_id, user_id)
+  VALUES (TG_TABLE_NAME, OLD.id::text, OLD.user_id);
+  RETURN NULL;
+END;
+$$;
+
+DO $$
+DECLARE
+  t text;
+BEGIN
+  FOREACH t IN ARRAY ARRAY['meal_history', 'water_logs', 'saved_recipes', 'user_vitamins', 'weight_history'] LOOP
+    -- Спершу стабільний DEFAULT now() (без перезапису таблиці), далі — clock_timestamp() для нових рядків
+    EXECUTE format(
+      'ALTER TABLE public.%I ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now()', t);
+    EXECUTE format('ALTER TABLE public.%I ALTER COLUMN updated_at SET DEFAULT clock_timestamp()', t);
+    -- Keyset-курсор (updated_at, id) по користувачу
+    EXECUTE format(
+      'CREATE INDEX IF NOT EXISTS %I ON public.%I (user_id, updated_at, id)', 'idx_' || t || '_user_updated', t);
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', 'trg_' || t || '_touch', t);
+    EXECUTE format(
+      'CREATE TRIGGER %I BEFORE UPDATE ON public.%I FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at()',
+      'trg_' || t || '_touch', t);
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', 'trg_' || t || '_tombstone', t);
+    EXECUTE format(
+      'CREATE TRIGGER %I AFTER DELETE ON public.%I FOR EACH ROW EXECUTE FUNCTION public.record_sync_tombstone()',
+      'trg_' || t || '_tombstone', t);
+  END LOOP;
+END;
+$$;
+
+-- 3. Ідемпотентність push-записів: (user_id, key) -> збережена відповідь.
+--    status = 'pending', поки запис виконується; повтор з тим самим ключем отримує збережений результат.
+--    created_at — час захоплення ключа: 'pending' старший за SYNC_IDEMPOTENCY_LEASE_SECONDS
+--    (процес упав до запису результату) повтор перезахоплює і виконує запис сам.
+CREATE TABLE IF NOT EXISTS public.sync_idempotency (
+  user_id     uuid        NOT NULL,
+  key         text        NOT NULL,
+  status      text        NOT NULL DEFAULT 'pending',
+  response    jsonb,
+  created_at  timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (user_id, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_idempotency_created
+  ON public.sync_idempotency (created_at);
+
+-- 4. Прибирання: tombstones старші за p_days (клієнт з курсором, старшим за це, отримує reset
+--    і робить повну синхронізацію) та ключі ідемпотентності. Запускати періодично (pg_cron).
+CREATE OR REPLACE FUNCTION public.purge_sync_metadata(p_days integer DEFAULT 30)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  removed integer;
+  removed_keys integer;
+BEGIN
+  DELETE FROM public.sync_tombstones WHERE updated_at < now() - make_interval(days => p_days);
+  GET DIAGNOSTICS removed = ROW_COUNT;
+  DELETE FROM public.sync_idempotency WHERE created_at < now() - make_interval(days => p_days);
+  GET DIAGNOSTICS removed_keys = ROW_COUNT;
+  RETURN removed + removed_keys;
+END;
+$$;
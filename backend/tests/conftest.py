@@ -0,0 +1,17 @@
+import os
+import sys
+
+# Тести запускаються з директорії backend: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test-service-key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "test-secret")
+os.environ.setdefault("OPENAI_API_KEY", "test-openai-key")
+
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
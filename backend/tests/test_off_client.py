@@ -0,0 +1,105 @@
+"""OpenFoodFactsClient проти benchmarks.off_stub (в процесі, через ASGITransport)."""
+import asyncio
+import httpx
+import pytest
+from benchmarks.off_stub import OffStub
+from config import settings
+from services.off_client import OpenFoodFactsClient
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def stub_client():
+    stub = OffStub(latency=0.0)
+    client = OpenFoodFactsClient("http://off.test")
+    client._client = httpx.AsyncClient(base_url="http://off.test", transport=httpx.ASGITransport(app=stub.app()))
+    yield stub, client
+    await client.close()
+
+
+async def test_breaker_opens_half_opens_and_closes(stub_client):
+    stub, client = stub_client
+    client.breaker.failure_threshold = 3
+    client.breaker.reset_timeout = 0.1
+    stub.status = 500
+
+    for i in range(3):
+        assert await client.search(f"fail {i}") == []
+    assert client.breaker.state == "open"
+    assert stub.request_count == 3
+
+    # Поки open — до OFF не ходимо
+    assert await client.search("while open") == []
+    assert stub.request_count == 3
+    assert client.breaker.stats()["short_circuited"] == 1
+
+    await asyncio.sleep(0.15)
+    assert client.breaker.state == "half_open"
+    stub.status = 200
+    results = await client.search("probe")
+    assert len(results) == 5
+    assert stub.request_count == 4
+    assert client.breaker.state == "closed"
+    assert client.breaker.failures == 0
+
+
+async def test_failed_probe_reopens_breaker(stub_client):
+    stub, client = stub_client
+    client.breaker.failure_threshold = 1
+    client.breaker.reset_timeout = 0.1
+    stub.status = 503
+
+    await client.search("first")
+    assert client.breaker.state == "open"
+    await asyncio.sleep(0.15)
+    await client.search("probe")
+    assert stub.request_count == 2
+    assert client.breaker.state == "open"
+
+
+async def test_empty_result_cached_for_negative_ttl(stub_client, monkeypatch):
+    stub, client = stub_client
+    monkeypatch.setattr(settings, "OFF_NEGATIVE_TTL", 0.1)
+    stub.results = 0
+
+    assert await client.search("нічого") == []
+    assert await client.search("НІЧОГО!") == []
+    assert stub.request_count == 1
+
+    await asyncio.sleep(0.15)
+    stub.results = 5
+    assert len(await client.search("нічого")) == 5
+    assert stub.request_count == 2
+
+
+async def test_failed_lookup_cached_for_failure_ttl(stub_client, monkeypatch):
+    stub, client = stub_client
+    monkeypatch.setattr(settings, "OFF_FAILURE_TTL", 0.1)
+    stub.status = 500
+
+    assert await client.search("гречка") == []
+    assert await client.search("гречка") == []
+    assert stub.request_count == 1
+
+    await asyncio.sleep(0.15)
+    stub.status = 200
+    assert len(await client.search("гречка")) == 5
+    assert stub.request_count == 2
+
+
+async def test_found_results_cached_for_full_ttl(stub_client):
+    stub, client = stub_client
+    first = await client.search("Гречка")
+    assert await client.search("гречка ") == first
+    assert stub.request_count == 1
+
+
+async def test_concurrent_identical_queries_share_one_request(stub_client):
+    stub, client = stub_client
+    stub.latency = 0.05
+
+    results = await asyncio.gather(*(client.search(q) for q in ["гречка", "Гречка", "гречка!"] * 5))
+    assert stub.request_count == 1
+    assert all(r == results[0] and len(r) == 5 for r in results)
+    assert client._in_flight == {}
@@ -1,7 +1,9 @@
+import base64
+import json
 import re
 import pytz
 from datetime import datetime
-from typing import Any
+from typing import Any, Optional
 
 POLAND_TZ = pytz.timezone('Europe/Warsaw')
 
@@ -32,4 +34,40 @@ def clean_to_float(val) -> float:
 def is_invalid_user(user_id: Any) -> bool:
     if not user_id: return True
     s_id = str(user_id).lower().strip()
-    return s_id in ["null", "undefined", "none", ""]
\ No newline at end of file
+    return s_id in ["null", "undefined", "none", ""]
+# Непрозорі keyset-курсори (час, id) для /sync та пагінації історії ваги
+def encode_cursor(ts: str, row_id=None) -> str:
+    raw = json.dumps([ts, None if row_id is None else str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    """Курсор клієнта -> (ts, id); ValueError, якщо курсор пошкоджено або час без часового поясу."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, row_id = json.loads(raw)
+        # Сервер завжди видає час з поясом; без нього порівняння з aware-датами падає з TypeError
+        if datetime.fromisoformat(ts).tzinfo is None:
+            raise ValueError("naive timestamp")
+        return ts, row_id
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+# Спільний пошуковий ключ для назв продуктів (дзеркало public.food_search_key у food_search.sql):
+# польські диграфи -> кирилиця -> латиниця, тож "курчак" і "kurczak" дають "kurchak".
+_SEARCH_KEY_STEPS = [
+    ("sz", "ш"), ("cz", "ч"), ("rz", "ж"), ("ch", "х"), ("ż", "ж"), ("ź", "з"),
+    ("щ", "shch"), ("ж", "zh"), ("ч", "ch"), ("ш", "sh"), ("ю", "ju"), ("я", "ja"), ("є", "je"), ("ї", "ji"), ("й", "j"),
+]
+_SEARCH_KEY_TABLE = str.maketrans(
+    "абвгґдезиіклмнопрстуфхцыэёąćęłńóśw",
+    "abvhgdezyiklmnoprstufhcyeeacelnosv",
+    "ьъ"
+)
+
+def food_search_key(val: str) -> str:
+    key = (val or "").lower()
+    for src, dst in _SEARCH_KEY_STEPS:
+        key = key.replace(src, dst)
+    return re.sub(r'[^a-z0-9]+', ' ', key.translate(_SEARCH_KEY_TABLE)).strip()
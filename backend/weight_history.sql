@@ -0,0 +1,100 @@
+-- Історія ваги (GET /weight/history/{user_id}): індекс для keyset-пагінації та start_weight
+-- і RPC з тижневими/місячними агрегатами для графіків за довгий період.
+-- Виконайте у Supabase SQL Editor. Агрегація в WeightService лишається як fallback.
+
+-- Обслуговує і сторінки (created_at DESC, id DESC), і перший запис (start_weight) — backward scan
+CREATE INDEX IF NOT EXISTS idx_weight_history_user_created
+  ON public.weight_history (user_id, created_at DESC, id DESC);
+
+-- Один рядок на тиждень/місяць (за часом Europe/Warsaw): середня, мінімальна, максимальна вага
+CREATE OR REPLACE FUNCTION public.get_weight_buckets(
+  p_user_id uuid,
+  p_bucket text DEFAULT 'week',
+  p_from timestamptz DEFAULT NULL,
+  p_to timestamptz DEFAULT NULL
+)
+RETURNS TABLE (
+  bucket_start date,
+  avg_weight   numeric,
+  min_weight   numeric,
+  max_weight   numeric,
+  entries      integer
+)
+LANGUAGE sql STABLE
+AS $$
+  SELECT
+    date_trunc(p_bucket, w.created_at AT TIME ZONE 'Europe/Warsaw')::date AS bucket_start,
+    round(AVG(w.weight)::numeric, 2),
+    MIN(w.weight)::numeric,
+    MAX(w.weight)::numeric,
+    COUNT(*)::int
+  FROM public.weight_history w
+  WHERE w.user_id = p_user_id
+    AND (p_from IS NULL OR w.created_at >= p_from)
+    AND (p_to IS NULL OR w.created_at < p_to)
+  GROUP BY 1
+  ORDER BY 1;
+$$;
+
+-- Запис ваги однією транзакцією (RPC для POST /weight/add): difference від попереднього запису,
+-- insert, перерахунок difference наступного запису (для записів "заднім числом")
+-- та user_nutrition.weight = найновіший запис. Advisory lock на користувача серіалізує
+-- одночасні запити, тож difference не рахується від застарілого "останнього" рядка.
+CREATE OR REPLACE FUNCTION public.record_weight(
+  p_user_id uuid,
+  p_weight numeric,
+  p_created_at timestamptz DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_created_at timestamptz := COALESCE(p_created_at, now());
+  v_prev       numeric;
+  v_next_id    public.weight_history.id%TYPE;
+  v_next       numeric;
+  v_id         public.weight_history.id%TYPE;
+  v_difference numeric;
+  v_current    numeric;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtextextended('weight:' || p_user_id::text, 0));
+
+  SELECT w.weight INTO v_prev
+  FROM public.weight_history w
+  WHERE w.user_id = p_user_id AND w.created_at <= v_created_at
+  ORDER BY w.created_at DESC, w.id DESC
+  LIMIT 1;
+
+  v_difference := CASE WHEN v_prev IS NULL THEN 0 ELSE p_weight - v_prev END;
+
+  INSERT INTO public.weight_history (user_id, weight, difference, created_at)
+  VALUES (p_user_id, p_weight, v_difference, v_created_at)
+  RETURNING id INTO v_id;
+
+  SELECT w.id, w.weight INTO v_next_id, v_next
+  FROM public.weight_history w
+  WHERE w.user_id = p_user_id AND w.created_at > v_created_at
+  ORDER BY w.created_at, w.id
+  LIMIT 1;
+
+  IF v_next_id IS NOT NULL THEN
+    UPDATE public.weight_history SET difference = v_next - p_weight WHERE id = v_next_id;
+    v_current := (
+      SELECT w.weight FROM public.weight_history w
+      WHERE w.user_id = p_user_id
+      ORDER BY w.created_at DESC, w.id DESC
+      LIMIT 1
+    );
+  ELSE
+    v_current := p_weight;
+  END IF;
+
+  UPDATE public.user_nutrition SET weight = v_current WHERE user_id = p_user_id;
+
+  RETURN jsonb_build_object(
+    'id', v_id,
+    'difference', v_difference,
+    'current_weight', v_current
+  );
+END;
+$$;